@@ -50,6 +50,11 @@ setup(name="transientNamer",
       packages=find_packages(exclude=["*tests*"]),
       include_package_data=True,
       install_requires=install_requires,
+      extras_require={
+          'async': ['aiohttp'],
+          'index': ['scipy'],
+          'columnar': ['pyarrow'],
+      },
       test_suite='nose2.collector.collector',
       tests_require=['nose2', 'cov-core'],
       entry_points={
@@ -4,3 +4,10 @@ from . import utKit
 from .search import search
 from . import cl_utils
 from .astronotes import astronotes
+from .batch_conesearch import batch_conesearch
+from .name_resolver import name_resolver
+from .async_search import async_search
+from .async_astronotes import async_astronotes
+from .mirror import mirror
+from .crossmatch import crossmatch
+from .objects_dump import objects_dump
@@ -19,6 +19,8 @@ from pprint import pprint
 import json
 import requests
 from fundamentals import tools
+from transientNamer.commonutils import tnssession
+from transientNamer.commonutils.stats import run_stats
 from builtins import object
 import sys
 import re
@@ -34,6 +36,7 @@ class astronotes(object):
         - ``log`` -- logger
         - ``dbConn`` -- database connection. Default *False*
         - ``settings`` -- the settings dictionary
+        - ``statsCallback`` -- a function passed each stage timing and counter as it is recorded (see `an.stats`). Default *None*
 
     **Usage:**
 
@@ -49,6 +52,8 @@ class astronotes(object):
         settings=settings
     )
     ```
+
+    The time spent waiting on the TNS (`http`), parsing the notes (`extract`) and importing them (`database`), and counters of the `requests` sent, `bytes` downloaded, `pages` and `rows` (notes) read and `cache hits` (notes already cached), are recorded in `an.stats` (see `search`).
     """
 
     def __init__(
@@ -56,12 +61,14 @@ class astronotes(object):
             log,
             dbConn=False,
             settings=False,
+            statsCallback=None
 
     ):
         self.log = log
         log.debug("instansiating a new 'astronotes' object")
         self.settings = settings
         self.dbConn = dbConn
+        self.stats = run_stats(log=log, callback=statsCallback)
 
         return None
 
@@ -100,32 +107,77 @@ class astronotes(object):
         noteCount = paginationSets + 1
         if not inLastDays:
             inLastDays = 30000
+        session = tnssession(self.settings)
 
         # PAGINATE THROUGH RESULTS UNTIL WE HIT THE END
         while noteCount >= paginationSets:
             try:
-                response = requests.get(
-                    url="https://www.wis-tns.org/astronotes",
+                response = self._get(
+                    session,
+                    url=session.baseUrl + "/astronotes",
                     params={
                         "posted_period_value": inLastDays,
                         "posted_period_units": "days",
                         "num_page": paginationSets,
                         "page": page,
                         "format": "json"
-                    },
-                    headers={
-                        'User-Agent': self.settings["user-agent"]
                     }
                 )
                 searchPage = response.content.decode("utf-8")
             except requests.exceptions.RequestException:
                 print('HTTP Request failed')
             page += 1
-            data = json.loads(searchPage)
+            with self.stats.timer("extract"):
+                data = json.loads(searchPage)
             noteCount = len(data)
+            self.stats.count("pages")
+            self.stats.count("rows", noteCount)
             if noteCount:
                 allNotes = dict(list(allNotes.items()) + list(data.items()))
 
+        downloadCount, noteIds = self._cache_json_notes(allNotes)
+        self.stats.count("cache hits", len(noteIds) - downloadCount)
+
+        # NOW DOWNLOAD REQUIRED HTML NOTES
+        uncached = self._uncached_html_notes(noteIds)
+        self.stats.count("cache hits", len(noteIds) - len(uncached))
+        for n in uncached:
+            try:
+                response = self._get(
+                    session,
+                    url=session.baseUrl + f"/astronotes/astronote/{n}"
+                )
+                noteContent = response.content.decode("utf-8")
+            except requests.exceptions.RequestException:
+                print('HTTP Request failed')
+            self._cache_html_note(n, noteContent)
+
+        self.log.debug('completed the ``download`` method')
+        return downloadCount
+
+    def _get(
+            self,
+            session,
+            **kwargs):
+        """*send a GET request through the TNS session, recording the time waited and the bytes downloaded*"""
+        self.stats.count("requests")
+        with self.stats.timer("http"):
+            response = session.get(**kwargs)
+        self.stats.count("bytes", len(response.content))
+        return response
+
+    def _cache_json_notes(
+            self,
+            allNotes):
+        """*cache each astronote's json to its own file (notes already cached are left untouched)*
+
+        **Key Arguments:**
+            - `allNotes` -- dictionary of astronote json keyed by note ID
+
+        **Return:**
+            - `downloadCount` -- number of new files cached
+            - `noteIds` -- the IDs of all the notes
+        """
         # RECURSIVELY CREATE MISSING DIRECTORIES FOR CACHE
         if not os.path.exists(self.settings["astronote-cache"]):
             os.makedirs(self.settings["astronote-cache"])
@@ -147,29 +199,24 @@ class astronotes(object):
                 myFile.write(vJson)
                 myFile.close()
                 downloadCount += 1
+        return downloadCount, noteIds
 
-        # NOW DOWNLOAD REQUIRED HTML NOTES
-        for n in noteIds:
-            filepath = self.settings["astronote-cache"] + f"/{n}.html"
-            if not os.path.exists(filepath):
-                time.sleep(1)
-                try:
-                    response = requests.get(
-                        url=f"https://www.wis-tns.org/astronotes/astronote/{n}",
-                        headers={
-                            'User-Agent': self.settings["user-agent"]
-                        }
-
-                    )
-                    noteContent = response.content.decode("utf-8")
-                except requests.exceptions.RequestException:
-                    print('HTTP Request failed')
-                myFile = open(filepath, 'w')
-                myFile.write(noteContent)
-                myFile.close()
+    def _uncached_html_notes(
+            self,
+            noteIds):
+        """*the IDs of the notes whose HTML has not been cached yet*"""
+        return [n for n in noteIds if not os.path.exists(
+            self.settings["astronote-cache"] + f"/{n}.html")]
 
-        self.log.debug('completed the ``download`` method')
-        return downloadCount
+    def _cache_html_note(
+            self,
+            noteId,
+            noteContent):
+        """*cache the HTML of an astronote*"""
+        filepath = self.settings["astronote-cache"] + f"/{noteId}.html"
+        myFile = open(filepath, 'w')
+        myFile.write(noteContent)
+        myFile.close()
 
     def get_all_noteids(
             self,
@@ -204,20 +251,19 @@ class astronotes(object):
         noteCount = paginationSets + 1
         if not inLastDays:
             inLastDays = 30000
+        session = tnssession(self.settings)
 
         # PAGINATE THROUGH RESULTS UNTIL WE HIT THE END
         while noteCount >= paginationSets:
             try:
-                response = requests.get(
-                    url="https://www.wis-tns.org/astronotes",
+                response = self._get(
+                    session,
+                    url=session.baseUrl + "/astronotes",
                     params={
                         "posted_period_value": inLastDays,
                         "posted_period_units": "days",
                         "num_page": paginationSets,
                         "page": page
-                    },
-                    headers={
-                        'User-Agent': self.settings["user-agent"]
                     }
                 )
                 searchPage = response.content.decode("utf-8")
@@ -225,14 +271,18 @@ class astronotes(object):
                 print('HTTP Request failed')
             page += 1
 
-            # GET NOTES WRAPPER
-            getpage_soup = BeautifulSoup(searchPage, 'html.parser')
-            noteswrapper = getpage_soup.find(
-                'div', {'id': 'notes-wrapper'})
+            with self.stats.timer("extract"):
+                # GET NOTES WRAPPER
+                getpage_soup = BeautifulSoup(searchPage, 'html.parser')
+                noteswrapper = getpage_soup.find(
+                    'div', {'id': 'notes-wrapper'})
 
-            # NOW GET INDIVIDUAL NOTES
-            notelinks = noteswrapper.findAll('a', {'class': 'note-link'})
+                # NOW GET INDIVIDUAL NOTES
+                notelinks = noteswrapper.findAll(
+                    'a', {'class': 'note-link'})
             noteCount = len(notelinks)
+            self.stats.count("pages")
+            self.stats.count("rows", noteCount)
 
             for link in notelinks:
                 noteId = link.attrs['href'].split("/astronote/")[-1]
@@ -274,8 +324,9 @@ class astronotes(object):
         astronoteIds = []
         astronoteIds[:] = [l["astronote"] for l in rows]
 
-        self._parse_json_to_database(skipAstronoteIds=astronoteIds)
-        self._parse_html_to_database(skipAstronoteIds=astronoteIds)
+        with self.stats.timer("database"):
+            self._parse_json_to_database(skipAstronoteIds=astronoteIds)
+            self._parse_html_to_database(skipAstronoteIds=astronoteIds)
 
         self.log.debug('completed the ``notes_to_database`` method')
         return None
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Download astronotes from asyncio code without blocking the event loop*
+
+:Author:
+    David Young
+"""
+import asyncio
+import json
+import time
+from transientNamer.astronotes import astronotes
+from transientNamer.commonutils.aiotnssession import aiotnssession
+from transientNamer.commonutils.retrypolicy import retry_policy
+
+
+class async_astronotes(astronotes):
+    """
+    *Download astronotes from asyncio code without blocking the event loop*
+
+    The same as `astronotes`, except that `download` is a coroutine that uses non-blocking HTTP (this requires the optional `aiohttp` package) and downloads the HTML of the notes concurrently. Failed and throttled requests are retried as the `tns retries` settings allow, and a note whose download never succeeds is left uncached for the next download. Parsing and ingesting the cached notes into the database is unchanged.
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``dbConn`` -- database connection. Default *False*
+        - ``settings`` -- the settings dictionary
+        - ``session`` -- an `aiotnssession` to send the requests through. Default *None* (open, and close, one per download)
+
+    **Usage:**
+
+    ```python
+    from transientNamer import async_astronotes
+    an = async_astronotes(
+        log=log,
+        dbConn=dbConn,
+        settings=settings
+    )
+    downloadCount = await an.download(
+        cache_dir=settings["astronote-cache"], inLastDays=30)
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            dbConn=False,
+            settings=False,
+            session=None
+    ):
+        astronotes.__init__(self, log=log, dbConn=dbConn, settings=settings)
+        self._session = session
+        return None
+
+    async def download(
+            self,
+            cache_dir,
+            inLastDays=False,
+            concurrentNotes=4):
+        """*Download astronotes reported in the last N days. Check cache for notes already downloaded.*
+
+        **Key Arguments:**
+            - `cache_dir` -- the directory to cache the json notes to.
+            - `inLastDays` -- download only notes reported in the last N days. Default *False*. (Download all)
+            - `concurrentNotes` -- the number of note HTML pages to download at once. Default *4*
+
+        **Return:**
+            - `downloadCount` -- number of new files cached
+        """
+        self.log.debug('starting the ``download`` method')
+
+        session = self._session or aiotnssession(self.settings)
+        try:
+            paginationSets = 50
+            page = 0
+            allNotes = {}
+            noteCount = paginationSets + 1
+            if not inLastDays:
+                inLastDays = 30000
+
+            # PAGINATE THROUGH RESULTS UNTIL WE HIT THE END
+            while noteCount >= paginationSets:
+                searchPage = await self._get(
+                    session,
+                    session.baseUrl + "/astronotes",
+                    params={
+                        "posted_period_value": inLastDays,
+                        "posted_period_units": "days",
+                        "num_page": paginationSets,
+                        "page": page,
+                        "format": "json"
+                    }
+                )
+                # KEEP THE NOTES LISTED SO FAR - THE REST ARE PICKED UP BY THE
+                # NEXT DOWNLOAD
+                if searchPage is None:
+                    self.log.error(
+                        f'could not download page {page} of the astronotes listing')
+                    break
+                page += 1
+                with self.stats.timer("extract"):
+                    data = json.loads(searchPage)
+                noteCount = len(data)
+                self.stats.count("pages")
+                self.stats.count("rows", noteCount)
+                if noteCount:
+                    allNotes = dict(list(allNotes.items()) +
+                                    list(data.items()))
+
+            downloadCount, noteIds = await self._file_io(self._cache_json_notes, allNotes)
+
+            # NOW DOWNLOAD REQUIRED HTML NOTES, A FEW AT A TIME
+            semaphore = asyncio.Semaphore(max(1, int(concurrentNotes)))
+
+            async def download_note(n):
+                async with semaphore:
+                    noteContent = await self._get(
+                        session, session.baseUrl + f"/astronotes/astronote/{n}")
+                    # AN ERROR PAGE IS NEVER CACHED AS THE NOTE, SO THE NOTE IS
+                    # TRIED AGAIN BY THE NEXT DOWNLOAD
+                    if noteContent is None:
+                        self.log.warning(
+                            f'could not download astronote {n}')
+                        return
+                    await self._file_io(self._cache_html_note, n, noteContent)
+
+            uncached = await self._file_io(self._uncached_html_notes, noteIds)
+            await asyncio.gather(*[download_note(n) for n in uncached])
+        finally:
+            if self._session is None:
+                await session.close()
+
+        self.log.debug('completed the ``download`` method')
+        return downloadCount
+
+    async def _file_io(
+            self,
+            func,
+            *args):
+        """*call a method that reads or writes the astronote cache in a worker thread, so that the file I/O does not block the event loop*
+
+        **Key Arguments:**
+            - ``func`` -- the method to call
+            - ``args`` -- its arguments
+
+        **Return:**
+            - the value returned by ``func``
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _get(
+            self,
+            session,
+            url,
+            params=None):
+        """*send a GET request through the asyncio TNS session, retrying failed and throttled requests as the `tns retries` settings allow*
+
+        **Key Arguments:**
+            - `session` -- the `aiotnssession` to send the request through
+            - `url` -- the URL to request
+            - `params` -- dictionary of query parameters. Default *None*
+
+        **Return:**
+            - `content` -- the decoded response body, or *None* if the request never succeeded
+        """
+        policy = retry_policy(self.settings)
+        attempt = 0
+        while True:
+            status = None
+            retryAfter = None
+            self.stats.count("requests")
+            # ONLY WALL-CLOCK TIME IS MEANINGFUL FOR AN AWAITED REQUEST
+            start = time.perf_counter()
+            try:
+                status, content, responseUrl, retryAfter = await session.get(url, params=params)
+                self.stats.count("bytes", len(content.encode("utf-8")))
+            except session.requestErrors as e:
+                self.log.warning(f'astronote request failed: {e}')
+            self.stats.add_time("http", time.perf_counter() - start)
+            if status == 200:
+                return content
+
+            # IF FAILED TOO MANY TIMES - GIVE UP
+            if not policy.should_retry(attempt):
+                self.log.error(
+                    f'could not get {url} from the TNS, HTML error code {status}')
+                return None
+            delay = policy.delay(attempt, retryAfter=retryAfter)
+            self.stats.count("retries")
+            if status == 429:
+                # THROTTLED - HOLD BACK ALL OTHER TNS REQUESTS TOO
+                session.rateLimiter.pause(delay)
+            self.log.warning(
+                f'astronote request failed (HTML error code {status}). Retrying in {delay:0.1f}s')
+            await asyncio.sleep(delay)
+            attempt += 1
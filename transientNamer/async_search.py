@@ -0,0 +1,300 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Search the Transient Name Server from asyncio code without blocking the event loop*
+
+:Author:
+    David Young
+"""
+from __future__ import print_function
+import asyncio
+import collections
+import time
+from contextlib import asynccontextmanager
+from transientNamer.search import search
+from transientNamer.commonutils.retrypolicy import retry_policy
+from transientNamer.commonutils.aiotnssession import aiotnssession
+
+
+class async_search(search):
+    """
+    *Search the Transient Name Server from asyncio code without blocking the event loop*
+
+    An `async_search` accepts the same search constraints as `search` and parses the results in exactly the same way, but the TNS is queried with non-blocking HTTP (this requires the optional `aiohttp` package). With `concurrentPages` set, the remaining result pages are downloaded concurrently once the first page shows there are more to come. The on-disk cache, retries and the process-wide TNS rate limit all apply as for `search`.
+
+    Cancelling the task awaiting `run()` (or abandoning `iter_sources()`) cancels any page downloads still in flight.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``session`` -- an `aiotnssession` to send the requests through, e.g. to share one connection pool between many searches. Default *None* (each search opens, and closes, its own)
+    - all other keyword arguments are the same as for `search`
+
+    **Usage**
+
+    ```python
+    from transientNamer import async_search
+    tns = async_search(
+        log=log,
+        ra="06:50:36.74",
+        dec="+31:06:44.7",
+        radiusArcsec=5,
+        settings=settings
+    )
+    await tns.run()
+    print(tns.sources)
+    ```
+
+    The results (`sources`, `photometry`, `csv()` etc.) are only available once `run()` has been awaited. To handle the transients as each page of results arrives:
+
+    ```python
+    async for source, photometry, spectra, files in tns.iter_sources():
+        print(source["TNSId"])
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            session=None,
+            **kwargs
+    ):
+        search.__init__(self, log=log, **kwargs)
+        self._session = session
+        return None
+
+    async def run(self):
+        """
+        *send the search to the TNS and parse the transients found*
+
+        Awaiting `run()` again has no effect.
+        """
+        # A LOCAL MIRROR ANSWERS WITHOUT ANY NETWORK TRAFFIC
+        if self._mirror is not None:
+            return search.run(self)
+        if self._sourceResultsList is None:
+            sourceTable = []
+            resultPages = []
+            async for content, sources, transients in self._aiter_parsed_pages():
+                sourceTable += sources
+                resultPages.append((content, [t[1] for t in transients]))
+            self._sourceResultsList, self._resultPages = self._sort_sources(
+                sourceTable), resultPages
+        return None
+
+    async def iter_sources(
+            self):
+        """
+        *stream the transients found by the search, one at a time, as soon as each results page is parsed*
+
+        **Return**
+
+        - ``source``, ``photometry``, ``spectra``, ``files`` -- an async generator with one tuple per transient (see `search.iter_sources`)
+        """
+        self.log.debug('starting the ``iter_sources`` method')
+
+        if self._mirror is not None:
+            for transient in search.iter_sources(self):
+                yield transient
+            return
+
+        pages = self._aiter_parsed_pages()
+        try:
+            async for content, sources, transients in pages:
+                for source, transient in zip(sources, transients):
+                    photometry, spectra, files = self._report_rows(
+                        content, [transient])
+                    yield dict(source), photometry, spectra, files
+        finally:
+            await pages.aclose()
+
+        self.log.debug('completed the ``iter_sources`` method')
+
+    def _require_results(
+            self):
+        if self._sourceResultsList is None:
+            raise RuntimeError(
+                "the results of an `async_search` are only available once `await tns.run()` has completed")
+
+    def _iter_source_pages(
+            self):
+        """*the transients found in a local mirror, one list per page (see `search._iter_source_pages`)*
+
+        The TNS itself is never crawled here: `records()`, `columns()`, `to_files()` and `to_mysql()` stream an unrun `search` with blocking HTTP, so for an `async_search` they instead need `await tns.run()` to have completed first.
+        """
+        if self._mirror is None:
+            raise RuntimeError(
+                "the results of an `async_search` are only available once `await tns.run()` has completed")
+        return search._iter_source_pages(self)
+
+    @asynccontextmanager
+    async def _http(
+            self):
+        """*the session to send requests through - the caller's, or one opened (and closed) for this search*"""
+        if self._session is not None:
+            yield self._session
+            return
+        session = aiotnssession(self.settings)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    async def _aiter_parsed_pages(
+            self):
+        """*download the TNS search results page by page and parse the discovery data of the transients on each (see `search._iter_parsed_pages`)*"""
+        self.log.debug('starting the ``_aiter_parsed_pages`` method')
+
+        self._resumeToken = None
+        self._queried = True
+        async with self._http() as session:
+            pages = self._aiter_result_pages(session)
+            try:
+                async for page, content, self._searchURL in pages:
+                    parsed = self._read_results_page(page, content)
+                    if parsed is None:
+                        return
+                    sources, transients, more = parsed
+                    await self._cache_io(self._invalidate_negative_cache, sources)
+                    yield content, sources, transients
+                    if not more:
+                        return
+            finally:
+                await pages.aclose()
+                self.log.debug(
+                    'completed the ``_aiter_parsed_pages`` method')
+
+    async def _aiter_result_pages(
+            self,
+            session):
+        """*generate the TNS search result pages in page order*
+
+        The first page is downloaded alone. If the caller asks for more, the following pages are downloaded one at a time, or with ``concurrentPages`` downloads in flight at once. Pages are always yielded in page order. Closing the generator cancels any pages not yet downloaded.
+
+        **Key Arguments**
+
+        - ``session`` -- the `aiotnssession` to send the requests through
+
+        **Return**
+
+        - ``page``, ``content``, ``url`` -- the page number, the HTML content of the page and the URL it was downloaded from
+        """
+        page = self._firstPage
+        content, url = await self._download_results_page_async(session, page)
+        yield page, content, url
+        page += 1
+
+        workers = 1
+        if self.concurrentPages and int(self.concurrentPages) > 1:
+            workers = int(self.concurrentPages)
+        pending = collections.deque()
+        try:
+            while True:
+                while len(pending) < workers:
+                    pending.append((page, asyncio.ensure_future(
+                        self._download_results_page_async(session, page))))
+                    page += 1
+                thisPage, task = pending.popleft()
+                content, url = await task
+                yield thisPage, content, url
+        finally:
+            for thisPage, task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*[task for thisPage, task in pending], return_exceptions=True)
+
+    async def _download_results_page_async(
+            self,
+            session,
+            page):
+        """*download a single page of TNS search results, retrying on failure (see `search._download_results_page`)*
+
+        **Key Arguments**
+
+        - ``session`` -- the `aiotnssession` to send the request through
+        - ``page`` -- the index of the results page to download
+
+        **Return**
+
+        - ``content``, ``url`` -- the HTML content of the results page (*None* if it could not be downloaded) and the search URL for the page
+        """
+        self.log.debug('starting the ``_download_results_page_async`` method')
+
+        # TRY THE ON-DISK CACHE FIRST
+        cached, cacheParams = await self._cache_io(self._cached_results_page, page)
+        if cached:
+            return cached
+
+        policy = retry_policy(self.settings)
+        attempt = 0
+        while True:
+            status_code, content, url, retryAfter = await self._get_tns_search_results_async(
+                session, page)
+            if status_code == 200:
+                break
+            delay = self._retry_delay(
+                policy, attempt, page, status_code, url, retryAfter)
+            if delay is None:
+                content = None
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        await self._cache_io(self._cache_results_page, page, cacheParams, content, url)
+
+        self.log.debug(
+            'completed the ``_download_results_page_async`` method')
+        return content, url
+
+    async def _cache_io(
+            self,
+            func,
+            *args):
+        """*call a method that reads or writes the on-disk response cache in a worker thread, so that the file I/O (and any eviction scan) does not block the event loop*
+
+        **Key Arguments**
+
+        - ``func`` -- the method to call
+        - ``args`` -- its arguments
+
+        **Return**
+
+        - the value returned by ``func``
+        """
+        # WITHOUT A CACHE THERE IS NO DISK I/O - SKIP THE THREAD HOP
+        if not self._cache.enabled:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _get_tns_search_results_async(
+            self,
+            session,
+            page):
+        """
+        *query the tns and return the response*
+
+        **Key Arguments**
+
+        - ``session`` -- the `aiotnssession` to send the request through
+        - ``page`` -- the index of the results page to request
+
+        **Return**
+
+        - ``status_code``, ``content``, ``url``, ``retryAfter`` -- the HTTP status (*None* if the request itself failed), the page content, the search URL and any `Retry-After` header sent by the TNS
+        """
+        # THE SAME URL AS THE BLOCKING CLIENT REQUESTS
+        url = self._search_url(self._search_params(page))
+        self.stats.count("requests")
+        # ONLY WALL-CLOCK TIME IS MEANINGFUL FOR AN AWAITED REQUEST: THE THREAD'S
+        # CPU TIME WOULD INCLUDE THE WORK OF THE OTHER COROUTINES
+        start = time.perf_counter()
+        try:
+            response = await session.get(url)
+        except session.requestErrors as e:
+            print('HTTP Request failed')
+            self.log.warning(f'TNS search request failed: {e}')
+            return None, "", url, None
+        finally:
+            self.stats.add_time("http", time.perf_counter() - start)
+        self.stats.count("bytes", len(response[1].encode("utf-8")))
+        return response
@@ -0,0 +1,478 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Conesearch the Transient Name Server for many positions at once*
+
+:Author:
+    David Young
+"""
+from __future__ import print_function
+import csv
+import math
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from builtins import object
+import numpy as np
+from transientNamer.search import search, _with_separations
+from transientNamer.commonutils.coordinates import sexagesimal_to_decimal, separations
+from transientNamer.commonutils.stats import run_stats
+
+
+class batch_conesearch(object):
+    """
+    *Conesearch the Transient Name Server for many positions at once*
+
+    Duplicate positions are searched once and overlapping cones are merged into a single, larger cone (as long as the merged cone is no larger than ``maxMergedRadiusArcsec``). The resulting cones are searched concurrently; all requests share the process-wide TNS rate limit. Matches are then assigned back to every input position that lies within its own search radius of them, with separations measured from that input position.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``ra`` -- list of RAs (sexagesimal or decimal degrees). Default *[]*
+    - ``dec`` -- list of DECs (sexagesimal or decimal degrees). Default *[]*
+    - ``radiusArcsec`` -- a single search radius for all positions, or a list with one radius per position. Default *5*
+    - ``csvPath`` -- path to a CSV file of positions to use instead of ``ra``/``dec``. The file needs `ra` and `dec` columns and may have a `radiusArcsec` column. Default *False*
+    - ``settings`` -- the settings dictionary
+    - ``comments`` -- return the comments from the TNS. Default *False*
+    - ``concurrentCones`` -- the number of cones to search at once. Default *4*
+    - ``maxMergedRadiusArcsec`` -- overlapping cones are only merged if the merged cone radius is no larger than this. Default *60*
+    - ``mirror`` -- answer the conesearches from a local TNS mirror instead of the TNS. Either *True* (use the mirror database in the `tns mirror` settings) or a `mirror` object. Default *False*
+
+    **Usage**
+
+    ```python
+    from transientNamer import batch_conesearch
+    bc = batch_conesearch(
+        log=log,
+        ra=["06:50:36.74", 101.264],
+        dec=["+31:06:44.7", 35.7416],
+        radiusArcsec=5,
+        settings=settings
+    )
+    matches = bc.get()
+    for m in matches:
+        print(m["inputIndex"], m["TNSId"], m["separationArcsec"])
+    ```
+
+    or to read the positions from a CSV file:
+
+    ```python
+    bc = batch_conesearch(
+        log=log,
+        csvPath="/path/to/positions.csv",
+        settings=settings
+    )
+    matches = bc.get()
+    ```
+
+    The timings and counters of all the TNS conesearches sent are added up in `bc.stats` (see `search`).
+
+    A cone whose results pages could not all be downloaded (even after retrying) returns only the matches read before the failure. The input positions it covers are listed in `incompleteInputIndexes` (and logged as errors), so they can be searched again:
+
+    ```python
+    matches = bc.get()
+    if bc.incompleteInputIndexes:
+        print(f"retry positions {bc.incompleteInputIndexes}")
+    ```
+
+    With a local mirror of the TNS (see `mirror`), all positions are matched against the mirror's spatial index in one pass and the TNS is never contacted; large batches take seconds:
+
+    ```python
+    bc = batch_conesearch(
+        log=log,
+        csvPath="/path/to/positions.csv",
+        settings=settings,
+        mirror=True
+    )
+    matches = bc.get()
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            ra=[],
+            dec=[],
+            radiusArcsec=5,
+            csvPath=False,
+            settings=False,
+            comments=False,
+            concurrentCones=4,
+            maxMergedRadiusArcsec=60,
+            mirror=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'batch_conesearch' object")
+        self.settings = settings
+        self.comments = comments
+        self.concurrentCones = concurrentCones
+        self.maxMergedRadiusArcsec = maxMergedRadiusArcsec
+
+        self._mirror = None
+        if mirror:
+            if mirror is True:
+                from transientNamer.mirror import mirror as tns_mirror
+                mirror = tns_mirror(log=log, settings=settings)
+            self._mirror = mirror
+
+        if csvPath:
+            ra, dec, radiusArcsec = self._read_csv(csvPath, radiusArcsec)
+
+        if len(ra) != len(dec):
+            raise ValueError(
+                "the `ra` and `dec` lists must be the same length")
+        if not isinstance(radiusArcsec, (list, tuple, np.ndarray)):
+            radiusArcsec = [radiusArcsec] * len(ra)
+
+        # CONVERT ALL INPUT POSITIONS TO DECIMAL DEGREES
+        raDeg, decDeg = sexagesimal_to_decimal(
+            log=self.log,
+            ra=list(ra),
+            dec=list(dec)
+        )
+        self.raDeg = np.array(raDeg, dtype=float)
+        self.decDeg = np.array(decDeg, dtype=float)
+        self.radiusArcsec = np.array(radiusArcsec, dtype=float)
+
+        self.sourceResultsList = []
+        self.matches = collections.OrderedDict()
+        self.incompleteInputIndexes = []
+        self.stats = run_stats(log=log)
+        self._searches = []
+        self._matchedIds = set()
+        self._associatedResultsLists = None
+
+        return None
+
+    def get(self):
+        """
+        *search the TNS for all input positions*
+
+        **Return**
+
+        - ``matches`` -- a list of dictionaries, one for each (input position, matched transient) pair. Each carries the transient's source data plus the `inputIndex` of the input position and the separations from it. The list is ordered by `inputIndex` and then separation.
+        """
+        self.log.debug('starting the ``get`` method')
+
+        # CALLING `get` AGAIN STARTS AFRESH
+        self.matches = collections.OrderedDict()
+        self.incompleteInputIndexes = []
+        matchedIds = set()
+        if self._mirror is not None:
+            # EVERY POSITION IS A SINGLE QUERY OF THE MIRROR'S SPATIAL INDEX
+            searches = []
+            candidates = self._mirror.conesearches(
+                self.raDeg, self.decDeg, self.radiusArcsec)
+            for i, sources in enumerate(candidates):
+                self._assign_matches(sources, [i], matchedIds)
+        else:
+            cones, members = self._merge_cones()
+            self.log.info(
+                f'{len(self.raDeg)} input positions searched with {len(cones)} TNS conesearches')
+
+            # SEARCH ALL CONES CONCURRENTLY - THE RATE LIMIT IS SHARED
+            with ThreadPoolExecutor(max_workers=max(1, int(self.concurrentCones))) as executor:
+                searches = list(executor.map(self._conesearch, cones))
+
+            for tns, inputIndexes in zip(searches, members):
+                self._assign_matches(tns.sources, inputIndexes, matchedIds)
+                self.stats.merge(tns.stats)
+                # A RESUME TOKEN MEANS A PAGE OF THE CONESEARCH NEVER DOWNLOADED
+                if tns.resumeToken is not None:
+                    self.incompleteInputIndexes += inputIndexes
+            self.incompleteInputIndexes.sort()
+            if self.incompleteInputIndexes:
+                self.log.error(
+                    f'the TNS conesearches of {len(self.incompleteInputIndexes)} input positions could not be completed, so their matches may be incomplete: inputIndex {self.incompleteInputIndexes}')
+
+        # ORDER BY INPUT ROW, THEN SEPARATION
+        self.sourceResultsList = []
+        for i in sorted(self.matches):
+            self.matches[i].sort(key=lambda m: float(m["separationArcsec"]))
+            self.sourceResultsList += self.matches[i]
+        self.matches = collections.OrderedDict(
+            (i, self.matches[i]) for i in sorted(self.matches))
+
+        # THE ASSOCIATED DATA IS ONLY PARSED WHEN FIRST ASKED FOR
+        self._searches = searches
+        self._matchedIds = matchedIds
+        self._associatedResultsLists = None
+
+        self.log.debug('completed the ``get`` method')
+        return self.sourceResultsList
+
+    @property
+    def photometry(
+            self):
+        """*The photometry of all matched transients*
+        """
+        return [dict(l) for l in self._associated_results()[0]]
+
+    @property
+    def spectra(
+            self):
+        """*The spectral data of all matched transients*
+        """
+        return [dict(l) for l in self._associated_results()[1]]
+
+    @property
+    def files(
+            self):
+        """*The files associated with all matched transients*
+        """
+        return [dict(l) for l in self._associated_results()[2]]
+
+    def columns(
+            self):
+        """
+        *the matches and the photometry, spectra and files of the matched transients as column-oriented stores backed by NumPy arrays (see `search.columns`)*
+
+        **Return**
+
+        - ``matches``, ``photometry``, ``spectra``, ``files`` -- a `column_store` for each flavour of results
+        """
+        from transientNamer.commonutils.columnstore import column_store
+        return tuple(column_store(self.log, rows) for rows in ((self.sourceResultsList,) + tuple(self._associated_results())))
+
+    def _assign_matches(
+            self,
+            sources,
+            inputIndexes,
+            matchedIds):
+        """*record the transients found by a conesearch as matches of the input positions they lie within the search radius of*
+
+        **Key Arguments**
+
+        - ``sources`` -- list of dictionaries of discovery data returned by the conesearch
+        - ``inputIndexes`` -- the indexes of the input positions the conesearch covers
+        - ``matchedIds`` -- set of the TNSIds matched so far, updated in place
+        """
+        if not sources:
+            return
+        srcRa = np.array([s["raDeg"] for s in sources], dtype=float)
+        srcDec = np.array([s["decDeg"] for s in sources], dtype=float)
+        for i in inputIndexes:
+            within = _angular_separation(
+                self.raDeg[i], self.decDeg[i], srcRa, srcDec) <= self.radiusArcsec[i]
+            within = np.nonzero(within)[0]
+            angularSeparation, north, east = separations(
+                log=self.log,
+                ra1=float(self.raDeg[i]),
+                dec1=float(self.decDeg[i]),
+                ra2=srcRa[within],
+                dec2=srcDec[within]
+            )
+            for s, a, n, e in zip(within, angularSeparation, north, east):
+                match = _with_separations(sources[s], a, n, e)
+                match["inputIndex"] = int(i)
+                self.matches.setdefault(int(i), []).append(match)
+                matchedIds.add(match["TNSId"])
+
+    def _associated_results(
+            self):
+        """*collect the photometry, spectra and files of all matched transients (once each) the first time they are needed*"""
+        if self._associatedResultsLists is None and self._mirror is not None:
+            TNSIds = list(collections.OrderedDict.fromkeys(
+                m["TNSId"] for m in self.sourceResultsList))
+            self._associatedResultsLists = self._mirror.reports(
+                TNSIds, comments=self.comments)
+        if self._associatedResultsLists is None:
+            photResultsList = []
+            specResultsList = []
+            relatedFilesResultsList = []
+            for tns in self._searches:
+                photResultsList += [p for p in tns.photometry
+                                    if p["TNSId"] in self._matchedIds]
+                specResultsList += [p for p in tns.spectra
+                                    if p["TNSId"] in self._matchedIds]
+                relatedFilesResultsList += [p for p in tns.files
+                                            if p["TNSId"] in self._matchedIds]
+            self._associatedResultsLists = (
+                _unique_rows(photResultsList),
+                _unique_rows(specResultsList),
+                _unique_rows(relatedFilesResultsList)
+            )
+        return self._associatedResultsLists
+
+    def _read_csv(
+            self,
+            csvPath,
+            radiusArcsec):
+        """*read input positions from a CSV file*
+
+        **Key Arguments**
+
+        - ``csvPath`` -- path to the CSV file
+        - ``radiusArcsec`` -- the radius to use for rows without a `radiusArcsec` column
+
+        **Return**
+
+        - ``ra``, ``dec``, ``radiusArcsec`` -- lists of positions and radii
+        """
+        self.log.debug('starting the ``_read_csv`` method')
+
+        ra = []
+        dec = []
+        radii = []
+        with open(csvPath, newline='') as f:
+            reader = csv.DictReader(f)
+            raCol, decCol, radiusCol = _position_columns(
+                reader.fieldnames, csvPath)
+            for row in reader:
+                ra.append(row[raCol])
+                dec.append(row[decCol])
+                if radiusCol and row[radiusCol]:
+                    radii.append(float(row[radiusCol]))
+                else:
+                    radii.append(float(radiusArcsec))
+
+        self.log.debug('completed the ``_read_csv`` method')
+        return ra, dec, radii
+
+    def _merge_cones(
+            self):
+        """*deduplicate the input positions and merge overlapping cones*
+
+        **Return**
+
+        - ``cones`` -- list of (raDeg, decDeg, radiusArcsec) cones to search
+        - ``members`` -- for each cone, the list of input indexes it covers
+        """
+        self.log.debug('starting the ``_merge_cones`` method')
+
+        # DEDUPLICATE IDENTICAL CONES
+        unique = collections.OrderedDict()
+        for i, (r, d, rad) in enumerate(zip(self.raDeg, self.decDeg, self.radiusArcsec)):
+            unique.setdefault((round(r, 7), round(d, 7), rad), []).append(i)
+        keys = list(unique.keys())
+        ra = np.array([k[0] for k in keys])
+        dec = np.array([k[1] for k in keys])
+        rad = np.array([k[2] for k in keys])
+
+        # UNION OVERLAPPING CONES - SWEEP IN DECLINATION ORDER
+        parent = list(range(len(keys)))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        order = np.argsort(dec)
+        maxRad = rad.max() if len(rad) else 0.
+        for a, i in enumerate(order):
+            for j in order[a + 1:]:
+                if (dec[j] - dec[i]) * 3600. > rad[i] + maxRad:
+                    break
+                if _angular_separation(ra[i], dec[i], ra[j], dec[j]) <= rad[i] + rad[j]:
+                    parent[find(j)] = find(i)
+
+        groups = collections.OrderedDict()
+        for i in range(len(keys)):
+            groups.setdefault(find(i), []).append(i)
+
+        cones = []
+        members = []
+        for group in groups.values():
+            if len(group) > 1:
+                cone = _enclosing_cone(ra[group], dec[group], rad[group])
+                if cone[2] <= self.maxMergedRadiusArcsec:
+                    cones.append(cone)
+                    members.append(
+                        [m for g in group for m in unique[keys[g]]])
+                    continue
+            # TOO LARGE TO MERGE (OR A SINGLE CONE) - SEARCH INDIVIDUALLY
+            for g in group:
+                cones.append((ra[g], dec[g], rad[g]))
+                members.append(unique[keys[g]])
+
+        self.log.debug('completed the ``_merge_cones`` method')
+        return cones, members
+
+    def _conesearch(
+            self,
+            cone):
+        """*run a single TNS conesearch*
+
+        **Key Arguments**
+
+        - ``cone`` -- (raDeg, decDeg, radiusArcsec)
+        """
+        ra, dec, radius = cone
+        tns = search(
+            log=self.log,
+            ra=float(ra),
+            dec=float(dec),
+            radiusArcsec=float(radius),
+            comments=self.comments,
+            settings=self.settings
+        )
+        tns.run()
+        return tns
+
+
+def _position_columns(
+        fieldnames,
+        csvPath):
+    """*the names of the RA, DEC and (optional) radius columns of a CSV file of positions*
+
+    **Return**
+
+    - ``raCol``, ``decCol``, ``radiusCol`` -- the column names (``radiusCol`` is *None* if there is no radius column)
+    """
+    columns = {c.strip().lower(): c for c in fieldnames or []}
+    raCol = columns.get("ra") or columns.get("radeg")
+    decCol = columns.get("dec") or columns.get(
+        "decdeg") or columns.get("decl")
+    radiusCol = columns.get("radiusarcsec") or columns.get("radius")
+    if not raCol or not decCol:
+        raise IOError(
+            f"could not find `ra` and `dec` columns in {csvPath}")
+    return raCol, decCol, radiusCol
+
+
+def _angular_separation(
+        ra1,
+        dec1,
+        ra2,
+        dec2):
+    """*haversine angular separation in arcsec (numpy arrays accepted)*"""
+    ra1, dec1, ra2, dec2 = map(np.radians, (ra1, dec1, ra2, dec2))
+    a = np.sin((dec2 - dec1) / 2.) ** 2 + np.cos(dec1) * \
+        np.cos(dec2) * np.sin((ra2 - ra1) / 2.) ** 2
+    return np.degrees(2. * np.arcsin(np.minimum(1., np.sqrt(a)))) * 3600.
+
+
+def _enclosing_cone(
+        ra,
+        dec,
+        rad):
+    """*a cone centred on the mean position of the input cones that encloses all of them*
+
+    **Return**
+
+    - ``raDeg``, ``decDeg``, ``radiusArcsec``
+    """
+    # MEAN UNIT VECTOR GIVES A CENTRE THAT IS SAFE ACROSS RA=0
+    r = np.radians(ra)
+    d = np.radians(dec)
+    x = np.mean(np.cos(d) * np.cos(r))
+    y = np.mean(np.cos(d) * np.sin(r))
+    z = np.mean(np.sin(d))
+    raC = math.degrees(math.atan2(y, x)) % 360.
+    decC = math.degrees(math.atan2(z, math.hypot(x, y)))
+    radius = np.max(_angular_separation(raC, decC, ra, dec) + rad)
+    # ROUND UP SO NO INPUT CONE IS CLIPPED BY FLOATING POINT ERRORS
+    return raC, decC, math.ceil(radius * 100.) / 100. + 0.01
+
+
+def _unique_rows(
+        rows):
+    """*drop repeated rows (the same transient can be returned by several cones)*"""
+    seen = set()
+    unique = []
+    for r in rows:
+        key = tuple(sorted((k, str(v)) for k, v in r.items()))
+        if key not in seen:
+            seen.add(key)
+            unique.append(r)
+    return unique
@@ -4,27 +4,30 @@
 Documentation for transientNamer can be found here: http://transientNamer.readthedocs.org/en/stable
 
 Usage:
-    transientNamer [-c] cone <ra> <dec> <arcsecRadius> [<render> | mysql <tableNamePrefix>] [-o directory] [-s pathToSettingsFile]
-    transientNamer [-c] search <name> [<render> | mysql <tableNamePrefix>] [-o directory] [-s pathToSettingsFile]
-    transientNamer [-c] new <reportedInLastDays> [<render> | mysql <tableNamePrefix>] [-o directory] [-s pathToSettingsFile]
-    transientNamer [-i] notes <reportedInLastDays> [-s pathToSettingsFile]
+    transientNamer [-c] cone <ra> <dec> <arcsecRadius> [<render> | mysql <tableNamePrefix> [-d]] [-o directory [-z]] [--stats] [-s pathToSettingsFile]
+    transientNamer [-c] search <name> [<render> | mysql <tableNamePrefix> [-d]] [-o directory [-z]] [--stats] [-s pathToSettingsFile]
+    transientNamer [-c] new <reportedInLastDays> [<render> | mysql <tableNamePrefix> [-d]] [-o directory [-z]] [--stats] [-s pathToSettingsFile]
+    transientNamer [-i] notes <reportedInLastDays> [--stats] [-s pathToSettingsFile]
+    transientNamer [-m] crossmatch <pathToCatalogue> [<arcsecRadius>] [-o directory] [--stats] [-s pathToSettingsFile]
 
 Commands:
     cone                  perform a conesearch on the TNS
     search                perform a name search on the TNS
     new                   list newly reported TNS objects
     notes                 download astronotes amd cache in local directory
+    crossmatch            cross-match a CSV catalogue of positions (`ra`, `dec` and optional `radiusArcsec` columns) against the TNS
     
 Arguments:
     ra
     dec
     arcsecRadius
     name                  the name of the object the search for (TNS or survey name)
-    render                output format for results. Options include json, csv, table, markdown, yaml
+    render                output format for results. Options include json, ndjson, csv, table, markdown, yaml, parquet, arrow (parquet and arrow are always saved to files)
     tableNamePrefix       the prefix for the tables to write the mysql insert statements for
     directory             path to the directory to save the output to
     reportedInLastDays    download and parse data reported within the last <n> days
     mysql                 generate mysql insert scripts
+    pathToCatalogue       path to the CSV catalogue to cross-match (may be gzipped)
 
 Options:
     -h, --help                                              show this help message
@@ -33,6 +36,10 @@ Options:
     -c, --withComments                                      return TNS comments in result sets
     -i, --import                                            parse and import the content of the astronotes into a MySQL database
     -o directory, --output=directory                        output to files in the directory path
+    -z, --gzip                                              gzip-compress csv, json, ndjson and yaml output files
+    -d, --database                                          write mysql results straight into the database in the settings file instead of generating insert scripts
+    -m, --mirror                                            match against the local TNS mirror (see the `tns mirror` settings)
+    --stats                                                 print where the time went (per-stage timings and counters) when finished
 """
 from __future__ import print_function
 import sys
@@ -102,12 +109,18 @@ def main(arguments=None):
     render = a["render"]
     tableNamePrefix = a["tableNamePrefix"]
     notes = a["notes"]
+    crossmatch = a["crossmatch"]
+    pathToCatalogue = a["pathToCatalogue"]
+    mirrorFlag = a["mirrorFlag"]
 
     parse = a["importFlag"]
     mysql = a["mysql"]
     reportedInLastDays = a["reportedInLastDays"]
     withCommentsFlag = a["withCommentsFlag"]
     outputFlag = a["outputFlag"]
+    databaseFlag = a["databaseFlag"]
+    gzipFlag = a["gzipFlag"]
+    statsFlag = a["statsFlag"]
 
     # set options interactively if user requests
     if "interactiveFlag" in a and a["interactiveFlag"]:
@@ -183,7 +196,17 @@ def main(arguments=None):
         if outputFlag and not os.path.exists(outputFlag):
             os.makedirs(outputFlag)
 
-        if tableNamePrefix:
+        if outputFlag and render in ("csv", "json", "yaml", "ndjson"):
+            # STREAM THE RESULTS STRAIGHT TO DISK
+            counts, paths = tns.to_files(
+                outputFlag, render=render, compress=gzipFlag)
+            numSources = counts[0]
+        elif tableNamePrefix and databaseFlag:
+            numSources, numPhot, numSpec, numFiles = tns.to_mysql(
+                dbConn=dbConn, tableNamePrefix=tableNamePrefix)
+            print(
+                f"{numPhot} photometry, {numSpec} spectra and {numFiles} file rows written to the `{tableNamePrefix}_*` database tables")
+        elif tableNamePrefix:
             sources, phot, spec, files = tns.mysql(
                 tableNamePrefix=tableNamePrefix, dirPath=outputFlag)
             numSources = len(sources.split("\n")) - 1
@@ -196,19 +219,27 @@ def main(arguments=None):
         elif render == "json":
             sources, phot, spec, files = tns.json(dirPath=outputFlag)
             numSources = len(sources.split("{")) - 1
+        elif render == "ndjson":
+            sources, phot, spec, files = tns.ndjson()
+            numSources = len(sources.split("\n")) if sources else 0
         elif render == "yaml":
             sources, phot, spec, files = tns.yaml(dirPath=outputFlag)
             numSources = len(sources.split("\n-"))
         elif render == "markdown":
             sources, phot, spec, files = tns.markdown(dirPath=outputFlag)
             numSources = len(sources.split("\n")) - 2
+        elif render in ("parquet", "arrow"):
+            outputFlag = outputFlag or "."
+            sources, phot, spec, files = getattr(tns, render)(
+                dirPath=outputFlag)
+            numSources = sources.num_rows
 
         if numSources == 1:
             print("%(numSources)s transient found" % locals())
         elif numSources > 1:
             print("%(numSources)s transients found" % locals())
 
-        if not outputFlag:
+        if not outputFlag and not databaseFlag:
             print("\n# Matched Transients")
             print(sources)
             print("\n# Transient Photometry")
@@ -220,6 +251,39 @@ def main(arguments=None):
             print("\n# Original TNS Search URL")
             print(tns.url)
 
+        if statsFlag:
+            print(tns.stats.summary(), file=sys.stderr)
+
+    if crossmatch:
+        if not arcsecRadius:
+            arcsecRadius = 5
+        if outputFlag and not os.path.exists(outputFlag):
+            os.makedirs(outputFlag)
+        catalogueName = os.path.basename(pathToCatalogue).split(".")[0]
+        pathToOutput = os.path.join(
+            outputFlag or ".", f"{catalogueName}_tns_crossmatch.csv")
+
+        def progress(rowCount, matchCount, rowsPerSecond):
+            print(
+                f"{rowCount} catalogue rows cross-matched, {matchCount} matches ({rowsPerSecond:0.0f} rows/s)")
+        xm = transientNamer.crossmatch(
+            log=log,
+            pathToCatalogue=pathToCatalogue,
+            radiusArcsec=float(arcsecRadius),
+            settings=settings,
+            mirror=mirrorFlag,
+            progressCallback=progress
+        )
+        rowCount, matchCount = xm.to_csv(pathToOutput)
+        print(
+            f"{rowCount} catalogue rows cross-matched ({xm.rowsPerSecond:0.0f} rows/s). {matchCount} matches written to {pathToOutput}")
+        if xm.incompleteRows:
+            print(
+                f"WARNING: the TNS conesearches of {len(xm.incompleteRows)} catalogue rows could not be completed, so their matches may be missing. Rows (counting from 0): {xm.incompleteRows}")
+
+        if statsFlag:
+            print(xm.stats.summary(), file=sys.stderr)
+
     if notes:
         an = astronotes.astronotes(
             log=log,
@@ -234,6 +298,9 @@ def main(arguments=None):
             print(f"importing notes into database tables")
             an.notes_to_database()
 
+        if statsFlag:
+            print(an.stats.summary(), file=sys.stderr)
+
     if "dbConn" in locals() and dbConn:
         dbConn.commit()
         dbConn.close()
@@ -3,3 +3,5 @@
 """
 from __future__ import absolute_import
 from .getpackagepath import getpackagepath
+from .ratelimiter import ratelimiter
+from .tnssession import tnssession
@@ -0,0 +1,116 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*An asyncio HTTP session for TNS traffic (requires the optional `aiohttp` package)*
+
+:Author:
+    David Young
+"""
+import asyncio
+from urllib.parse import urlparse
+from .tnssession import http_settings
+from .ratelimiter import ratelimiter
+
+
+class aiotnssession(object):
+    """
+    *an aiohttp session that applies the TNS HTTP settings and the process-wide TNS rate limit to every request*
+
+    The connection pool, keep-alive, timeouts and user-agent are read from the same settings as the blocking `tnssession`, and requests draw on the same rate limit budget, so blocking and asyncio clients in one process share the TNS allowance. The underlying `aiohttp.ClientSession` is created on first use, inside the running event loop.
+
+    **Key Arguments**
+
+    - ``settings`` -- the settings dictionary
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.aiotnssession import aiotnssession
+    async with aiotnssession(settings) as session:
+        status, content, url, retryAfter = await session.get(session.baseUrl + "/astronotes")
+    ```
+    """
+
+    def __init__(
+            self,
+            settings=False):
+        try:
+            import aiohttp
+            import yarl
+        except ImportError:
+            raise ImportError(
+                "the asyncio TNS client requires the `aiohttp` package - install it with `pip install transientNamer[async]`")
+        self._aiohttp = aiohttp
+        self._yarl = yarl
+        httpSettings = http_settings(settings)
+        self.baseUrl = httpSettings["base url"].rstrip("/")
+        self.httpSettings = httpSettings
+        self.userAgent = settings.get("user-agent") if settings else None
+        self.rateLimiter = ratelimiter(settings)
+        self.requestErrors = (aiohttp.ClientError, asyncio.TimeoutError)
+        self._session = None
+
+    async def get(
+            self,
+            url,
+            params=None):
+        """*send a GET request once the rate limit allows it*
+
+        **Key Arguments**
+
+        - ``url`` -- the URL to request
+        - ``params`` -- dictionary of query parameters. Default *None*
+
+        **Return**
+
+        - ``status``, ``content``, ``url``, ``retryAfter`` -- the HTTP status, the decoded response body, the final URL and any `Retry-After` header
+        """
+        # THE ENDPOINT IS THE FIRST PATH SEGMENT, E.G. `search`
+        endpoint = urlparse(url).path.strip("/").split("/")[0]
+        wait = self.rateLimiter.reserve(endpoint)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        # A URL WITHOUT SEPARATE PARAMETERS IS SENT EXACTLY AS GIVEN (AIOHTTP
+        # WOULD OTHERWISE RE-NORMALISE ITS ENCODING)
+        if params is None:
+            url = self._yarl.URL(url, encoded=True)
+        async with self._client().get(url, params=params) as response:
+            content = await response.read()
+            return response.status, content.decode("utf-8"), str(response.url), response.headers.get("Retry-After")
+
+    def _client(
+            self):
+        if self._session is None:
+            aiohttp = self._aiohttp
+            headers = {
+                "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive" if self.httpSettings["keep-alive"] else "close"
+            }
+            if self.userAgent:
+                headers["User-Agent"] = self.userAgent
+            self._session = aiohttp.ClientSession(
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=float(self.httpSettings["connect timeout"]),
+                    sock_read=float(self.httpSettings["read timeout"])
+                ),
+                connector=aiohttp.TCPConnector(
+                    limit=int(self.httpSettings["pool maxsize"]),
+                    force_close=not self.httpSettings["keep-alive"]
+                )
+            )
+        return self._session
+
+    async def close(
+            self):
+        """*close the session and release its pooled connections*"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
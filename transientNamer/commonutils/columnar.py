@@ -0,0 +1,136 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Convert TNS results to typed Apache Arrow tables and save them as Parquet or Arrow IPC files (requires the optional `pyarrow` package)*
+
+:Author:
+    David Young
+"""
+from datetime import datetime
+
+# THE TYPES OF THE NUMERIC AND DATE COLUMNS (ALL OTHER COLUMNS ARE STRINGS)
+columnTypes = {
+    "raDeg": "float",
+    "decDeg": "float",
+    "transRedshift": "float",
+    "hostRedshift": "float",
+    "discMag": "float",
+    "separationArcsec": "float",
+    "separationNorthArcsec": "float",
+    "separationEastArcsec": "float",
+    "mag": "float",
+    "magErr": "float",
+    "exptime": "float",
+    "limitingMag": "int",
+    "spec1phot2": "int",
+    "inputIndex": "int",
+    "discDate": "datetime",
+    "obsdate": "datetime",
+    "reportAddedDate": "datetime",
+    "dateObs": "datetime"
+}
+
+
+def to_arrow_table(
+        log,
+        rows):
+    """*convert a list of dictionaries of TNS results to an Arrow table with numeric and datetime columns*
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``rows`` -- list of dictionaries (sources, photometry, spectra or files)
+
+    **Return**
+
+    - ``table`` -- a `pyarrow.Table`. Empty strings in numeric and date columns become nulls, as do values that cannot be read (which are logged)
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.columnar import to_arrow_table
+    table = to_arrow_table(log=log, rows=tns.photometry)
+    ```
+    """
+    pa = _pyarrow()
+
+    # THE COLUMNS, IN THE ORDER THEY ARE FIRST SEEN
+    columns = {}
+    for row in rows:
+        for k in row:
+            columns.setdefault(k, None)
+
+    arrays = []
+    fields = []
+    for column in columns:
+        kind = columnTypes.get(column, "string")
+        values = [_convert(log, column, kind, row.get(column))
+                  for row in rows]
+        if kind == "float":
+            arrowType = pa.float64()
+        elif kind == "int":
+            arrowType = pa.int32()
+        elif kind == "datetime":
+            arrowType = pa.timestamp("ms")
+        else:
+            arrowType = pa.string()
+        arrays.append(pa.array(values, type=arrowType))
+        fields.append(pa.field(column, arrowType))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def write_arrow_table(
+        table,
+        filepath):
+    """*save an Arrow table as a Parquet file (`.parquet`) or an uncompressed Arrow IPC file that can be memory-mapped (any other extension)*
+
+    **Key Arguments**
+
+    - ``table`` -- a `pyarrow.Table`
+    - ``filepath`` -- the path to save the table to
+    """
+    pa = _pyarrow()
+    if filepath.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        pq.write_table(table, filepath)
+        return None
+    with pa.OSFile(filepath, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return None
+
+
+def _convert(
+        log,
+        column,
+        kind,
+        value):
+    """*a value read from the TNS as the type of its column*"""
+    if kind == "string" or value is None:
+        return value
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+    try:
+        if kind == "float":
+            return float(value)
+        if kind == "int":
+            return int(value)
+        if isinstance(value, datetime):
+            return value
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        log.warning(
+            f'could not read the `{column}` value {value!r} as a {kind}, it is stored as null')
+        return None
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError(
+            "columnar output requires the `pyarrow` package - install it with `pip install transientNamer[columnar]`")
+    return pyarrow
@@ -0,0 +1,293 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*A column-oriented, in-memory store of TNS results backed by NumPy arrays*
+
+:Author:
+    David Young
+"""
+import sys
+from datetime import datetime, date
+import numpy as np
+from transientNamer.commonutils.columnar import columnTypes, _convert
+
+
+class column_store(object):
+    """
+    *a column-oriented, in-memory store of TNS results backed by NumPy arrays*
+
+    Rather than a list of dictionaries of strings, each column is held as one array: numeric columns (e.g. `mag`, `magErr`, `limitingMag`, `raDeg`) as floats with `nan` for missing values, date columns (`obsdate`, `discDate` etc.) as `datetime64[ms]` with `NaT` for missing values, and string columns as categoricals (integer codes into one list of interned strings, so a value repeated on thousands of rows is stored once). Rows can be filtered on any column with `where` without building a dictionary per row; dictionaries (with typed values) are only built when the store is iterated.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``rows`` -- list of dictionaries of results (sources, photometry, spectra or files). Default *[]*
+
+    **Usage**
+
+    ```python
+    sources, photometry, spectra, files = tns.columns()
+
+    # DETECTIONS IN THE G-BAND IN MARCH 2016
+    detections = photometry.where(
+        filter="g", limitingMag=0, obsdate=("2016-03-01", "2016-04-01"))
+    print(len(detections), detections["mag"].mean())
+
+    # THE PHOTOMETRY OF THE CLASSIFIED TYPE IA SUPERNOVAE
+    ia = photometry.where(TNSId=set(sources.where(specType="SN Ia")["TNSId"]))
+    for row in ia:
+        print(row["TNSId"], row["obsdate"], row["mag"])
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            rows=[]):
+        self.log = log
+        builder = column_builder(log)
+        builder.add(rows)
+
+        # NAME -> (KIND, ARRAY, CATEGORIES). CATEGORIES ARE ONLY SET FOR
+        # STRING COLUMNS, WHOSE ARRAY HOLDS THE CODES (-1 FOR NONE)
+        self._columns = builder.columns()
+        self._length = builder.length
+        return None
+
+    def keys(
+            self):
+        """*the column names*"""
+        return list(self._columns)
+
+    def categories(
+            self,
+            name):
+        """*the distinct values of a string column*"""
+        return list(self._column(name)[2] or [])
+
+    def where(
+            self,
+            **conditions):
+        """
+        *the rows matching all of a set of conditions, as a new store*
+
+        **Key Arguments**
+
+        - ``**conditions`` -- one condition per column, by column name. A condition is a single value (rows equal to it), a list or set of values (rows equal to any of them), a ``(low, high)`` tuple (rows between the two values, inclusive; either may be *None* for an open range; not for string columns) or *None* (rows missing a value). Dates may be given as `datetime` objects or ISO format strings.
+
+        **Return**
+
+        - ``store`` -- a `column_store` of the matching rows
+
+        **Usage**
+
+        ```python
+        limits = photometry.where(limitingMag=1, mag=(None, 19.5))
+        ```
+        """
+        return self[self.mask(**conditions)]
+
+    def mask(
+            self,
+            **conditions):
+        """*a boolean array flagging the rows that match all of a set of conditions (see `where`)*"""
+        mask = np.ones(self._length, dtype=bool)
+        for name, condition in conditions.items():
+            mask &= self._matches(name, condition)
+        return mask
+
+    def rows(
+            self):
+        """*a generator of the rows as dictionaries (with typed values)*"""
+        columns = [(name, self[name], kind)
+                   for name, (kind, array, categories) in self._columns.items()]
+        for i in range(self._length):
+            row = {}
+            for name, values, kind in columns:
+                row[name] = _python_value(values[i], kind)
+            yield row
+
+    def __getitem__(self, key):
+        """*a column as an array (by name), or a new store of the rows selected by a boolean mask or array of indexes*"""
+        if isinstance(key, str):
+            kind, array, categories = self._column(key)
+            if categories is None:
+                return array
+            # CODE -1 (NONE) INDEXES THE NONE APPENDED TO THE CATEGORIES
+            return np.array(categories + [None], dtype=object)[array]
+
+        subset = column_store.__new__(column_store)
+        subset.log = self.log
+        subset._columns = {name: (kind, array[key], categories)
+                           for name, (kind, array, categories) in self._columns.items()}
+        subset._length = len(np.arange(self._length)[key])
+        return subset
+
+    def __iter__(self):
+        return self.rows()
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return f"column_store({self._length} rows: {', '.join(self._columns)})"
+
+    def _column(
+            self,
+            name):
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise KeyError(f"`{name}` is not a column of these results")
+
+    def _matches(
+            self,
+            name,
+            condition):
+        """*a boolean array flagging the rows whose value in a column meets a condition*"""
+        kind, array, categories = self._column(name)
+
+        if categories is not None:
+            if condition is None:
+                return array == -1
+            if isinstance(condition, tuple):
+                raise ValueError(
+                    f"a range cannot be used to filter the string column `{name}`")
+            lookup = {v: i for i, v in enumerate(categories)}
+            if isinstance(condition, (list, set, frozenset)):
+                return np.isin(array, [lookup[c] for c in condition if c in lookup])
+            return array == lookup.get(condition, -2)
+
+        missing = np.isnat(array) if kind == "datetime" else np.isnan(array)
+        if condition is None:
+            return missing
+        if isinstance(condition, tuple):
+            low, high = (_array_value(c, kind) for c in condition)
+            match = ~missing
+            if low is not None:
+                match &= array >= low
+            if high is not None:
+                match &= array <= high
+            return match
+        if isinstance(condition, (list, set, frozenset)):
+            return np.isin(array, [_array_value(c, kind) for c in condition]) & ~missing
+        return (array == _array_value(condition, kind)) & ~missing
+
+
+class column_builder(object):
+    """
+    *build a `column_store` from rows added a batch at a time*
+
+    Each batch of rows is converted to typed arrays as it is added, so only the arrays (and not the dictionaries) are held between batches. Columns first seen in a later batch are filled with missing values for the earlier rows.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+
+    **Usage**
+
+    ```python
+    builder = column_builder(log)
+    for page in pages:
+        builder.add(page)
+    store = builder.store()
+    ```
+    """
+
+    def __init__(
+            self,
+            log):
+        self.log = log
+        self.length = 0
+        # NAME -> (KIND, LIST OF ARRAY CHUNKS, CODES OF A STRING COLUMN)
+        self._chunks = {}
+        return None
+
+    def add(
+            self,
+            rows):
+        """*convert a batch of rows (a list of dictionaries) and add it to the columns*"""
+        if not rows:
+            return None
+        for row in rows:
+            for name in row:
+                if name not in self._chunks:
+                    kind = columnTypes.get(name, "string")
+                    codes = {} if kind not in (
+                        "float", "int", "datetime") else None
+                    chunks = []
+                    if self.length:
+                        chunks.append(self._array(
+                            kind, [None] * self.length, codes))
+                    self._chunks[name] = (kind, chunks, codes)
+        for name, (kind, chunks, codes) in self._chunks.items():
+            values = [_convert(self.log, name, kind, row.get(name))
+                      for row in rows]
+            chunks.append(self._array(kind, values, codes))
+        self.length += len(rows)
+        return None
+
+    def columns(
+            self):
+        """*the columns built so far, as held by a `column_store`*"""
+        columns = {}
+        for name, (kind, chunks, codes) in self._chunks.items():
+            array = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+            categories = None
+            if codes is not None:
+                categories = [sys.intern(v) if isinstance(
+                    v, str) else v for v in codes]
+            columns[name] = (kind, array, categories)
+        return columns
+
+    def store(
+            self):
+        """*a `column_store` of the rows added so far*"""
+        store = column_store.__new__(column_store)
+        store.log = self.log
+        store._columns = self.columns()
+        store._length = self.length
+        return store
+
+    def _array(
+            self,
+            kind,
+            values,
+            codes):
+        """*the typed array of a batch of converted values (string values are coded, adding new values to ``codes``)*"""
+        if kind in ("float", "int"):
+            return np.array([np.nan if v is None else v for v in values], dtype=float)
+        if kind == "datetime":
+            return np.array([np.datetime64("NaT") if v is None else np.datetime64(v, "ms") for v in values], dtype="datetime64[ms]")
+        for v in values:
+            if v is not None and v not in codes:
+                codes[v] = len(codes)
+        return np.array([-1 if v is None else codes[v] for v in values], dtype=np.int32)
+
+
+def _array_value(
+        value,
+        kind):
+    """*a value given in a filter condition in the type of the column array*"""
+    if value is None:
+        return None
+    if kind == "datetime":
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.strip())
+        if isinstance(value, (datetime, date)):
+            return np.datetime64(value, "ms")
+        return value
+    return float(value)
+
+
+def _python_value(
+        value,
+        kind):
+    """*a value read from a column array as a python object*"""
+    if kind == "datetime":
+        return None if np.isnat(value) else value.astype(datetime)
+    if kind in ("float", "int"):
+        if np.isnan(value):
+            return None
+        return int(value) if kind == "int" else float(value)
+    return value
@@ -0,0 +1,229 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Batch coordinate conversion and separations for whole pages of TNS results*
+
+:Author:
+    David Young
+"""
+import re
+import math
+import numpy as np
+
+# THE SEXAGESIMAL FORMATS ACCEPTED BY ASTROCALC'S `unit_conversion`
+_raSexagesimal = re.compile(
+    r'^(\+?(\d|[0-1]\d|2[0-3]))\D+([0-5]\d)\D+([0-6]?\d(\.\d*?)?)(s)?\s*?$')
+_decSexagesimal = re.compile(
+    r'^([\+\-]?(\d|[0-8]\d))\D+([0-5]\d)\D+([0-6]?\d(\.\d+)?)$')
+
+# AS DEFINED IN ASTROCALC'S `separations`
+_pi = (4 * math.atan(1.0))
+_degToRad = _pi / 180.0
+_radToDeg = 180.0 / _pi
+
+
+def _decimals(
+        values):
+    """*the number of decimal places in the shortest repr of each value*"""
+    return [len(repr(v).split(".")[-1]) for v in values]
+
+
+def _round(
+        values,
+        precisions):
+    """*round each value to its own number of decimal places, as astrocalc does*"""
+    return [float("%0.*f" % (p, v)) for v, p in zip(values, precisions)]
+
+
+def sexagesimal_to_decimal(
+        log,
+        ra,
+        dec):
+    """*convert lists of RA and DEC (sexagesimal or decimal) to decimal degrees in one pass*
+
+    The numeric conversion is done on whole arrays; each value is then rounded to the precision of its input exactly as astrocalc's `unit_conversion` does, so the results are identical to converting the values one at a time. Values that are not in a recognised sexagesimal format are handed to astrocalc.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``ra`` -- list of RAs
+    - ``dec`` -- list of DECs
+
+    **Return**
+
+    - ``raDeg``, ``decDeg`` -- lists of decimal degrees
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.coordinates import sexagesimal_to_decimal
+    raDeg, decDeg = sexagesimal_to_decimal(
+        log=log,
+        ra=["06:50:36.74", "17:29:02.80"],
+        dec=["+31:06:44.7", "+08:08:37.4"]
+    )
+    ```
+    """
+    raDeg = _convert(log, ra, _raSexagesimal, _ra_values,
+                     "ra_sexegesimal_to_decimal")
+    decDeg = _convert(log, dec, _decSexagesimal, _dec_values,
+                      "dec_sexegesimal_to_decimal")
+    return raDeg, decDeg
+
+
+def decimal_to_sexagesimal(
+        log,
+        raDeg,
+        decDeg):
+    """*convert lists of RA and DEC in decimal degrees to sexagesimal, in the format the TNS displays them*
+
+    RAs are given to 0.01 seconds of time and DECs to 0.1 arcsec (e.g. `06:50:36.74`, `+31:06:44.7`), rounded rather than truncated.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``raDeg`` -- list of RAs in decimal degrees
+    - ``decDeg`` -- list of DECs in decimal degrees
+
+    **Return**
+
+    - ``raSex``, ``decSex`` -- lists of sexagesimal strings
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.coordinates import decimal_to_sexagesimal
+    raSex, decSex = decimal_to_sexagesimal(
+        log=log,
+        raDeg=[102.65308, 262.2616667],
+        decDeg=[31.11242, 8.1437222]
+    )
+    ```
+    """
+    # ROUND TO WHOLE UNITS OF THE LAST DIGIT FIRST SO 59.996s CARRIES INTO THE
+    # NEXT MINUTE
+    ra = np.rint(np.mod(np.asarray(raDeg, dtype=float), 360.)
+                 * 240. * 100.).astype(np.int64) % (24 * 360000)
+    dec = np.asarray(decDeg, dtype=float)
+    negative = dec < 0
+    dec = np.rint(np.abs(dec) * 3600. * 10.).astype(np.int64)
+    sign = np.where(negative & (dec > 0), "-", "+")
+
+    raSex = ["%02d:%02d:%05.2f" % (h, m, s) for h, m, s in zip(
+        (ra // 360000).tolist(), (ra // 6000 % 60).tolist(), (ra % 6000 / 100.).tolist())]
+    decSex = ["%s%02d:%02d:%04.1f" % (g, d, m, s) for g, d, m, s in zip(
+        sign.tolist(), (dec // 36000).tolist(), (dec // 600 % 60).tolist(), (dec % 600 / 10.).tolist())]
+    return raSex, decSex
+
+
+def _convert(
+        log,
+        values,
+        regex,
+        arrayConversion,
+        fallback):
+    """*convert the values that match the sexagesimal ``regex`` with ``arrayConversion`` in one pass, and hand the rest to the astrocalc ``fallback`` method one at a time*"""
+    matches = [regex.match(str(v).strip()) for v in values]
+    converted = [None] * len(values)
+    parsed = [i for i, m in enumerate(matches) if m]
+    if parsed:
+        groups = [matches[i].groups() for i in parsed]
+        for i, v in zip(parsed, arrayConversion(groups)):
+            converted[i] = v
+
+    # ANYTHING ELSE (DECIMAL DEGREES, UNUSUAL FORMATS, BAD VALUES) IS LEFT TO
+    # ASTROCALC
+    if len(parsed) < len(values):
+        from astrocalc.coords import unit_conversion
+        converter = unit_conversion(
+            log=log
+        )
+        for i, v in enumerate(values):
+            if converted[i] is None:
+                converted[i] = getattr(converter, fallback)(v)
+    return converted
+
+
+def _ra_values(
+        groups):
+    """*the decimal degrees of the (hours, minutes, seconds) groups of sexagesimal RAs*"""
+    degrees = np.abs(np.array([g[0] for g in groups], dtype=float)) * 15.0
+    minutes = np.array([g[2] for g in groups], dtype=float) * 15.0
+    seconds = np.array([g[3] for g in groups], dtype=float) * 15.0
+    precisions = [d + 5 for d in _decimals(seconds.tolist())]
+    decimalDegrees = degrees + (minutes / 60.0) + (seconds / 3600.0)
+    return _round(decimalDegrees.tolist(), precisions)
+
+
+def _dec_values(
+        groups):
+    """*the decimal degrees of the (degrees, minutes, seconds) groups of sexagesimal DECs*"""
+    sgn = np.array([-1 if g[0][0] == "-" else 1 for g in groups], dtype=float)
+    degrees = np.abs(np.array([g[0] for g in groups], dtype=float))
+    minutes = np.array([g[2] for g in groups], dtype=float)
+    seconds = np.array([g[3] for g in groups], dtype=float)
+    precisions = [d + 4 for d in _decimals(seconds.tolist())]
+    decDeg = (degrees + (minutes / 60.0) + (seconds / 3600.0)) * sgn
+    return _round(decDeg.tolist(), precisions)
+
+
+def separations(
+        log,
+        ra1,
+        dec1,
+        ra2,
+        dec2):
+    """*the angular, north and east separations of many positions from one position*
+
+    Uses the same formulae and output precision as astrocalc's `separations`, applied to whole arrays.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``ra1``, ``dec1`` -- the reference position (sexagesimal or decimal degrees)
+    - ``ra2``, ``dec2`` -- lists of positions in decimal degrees
+
+    **Return**
+
+    - ``angularSeparation``, ``north``, ``east`` -- lists of separations in arcsec, formatted as strings to the precision of the input coordinates
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.coordinates import separations
+    angularSeparation, north, east = separations(
+        log=log,
+        ra1="06:50:36.74",
+        dec1="+31:06:44.7",
+        ra2=[102.65309, 102.6531],
+        dec2=[31.11241, 31.1125]
+    )
+    ```
+    """
+    if not len(ra2):
+        return [], [], []
+    (ra1,), (dec1,) = sexagesimal_to_decimal(log, [ra1], [dec1])
+    ra2 = np.array(ra2, dtype=float)
+    dec2 = np.array(dec2, dtype=float)
+
+    # OUTPUT PRECISION IS THE SMALLEST NUMBER OF DECIMAL PLACES IN THE INPUTS
+    # (IN ARCSEC)
+    precision = min(_decimals([dec1 * 3600., ra1 * 3600.]))
+    precisions = [min(precision, d, r) for d, r in zip(
+        _decimals((dec2 * 3600.).tolist()), _decimals((ra2 * 3600.).tolist()))]
+
+    aa = (90.0 - dec1) * _degToRad
+    bb = (90.0 - dec2) * _degToRad
+    cc = (ra1 - ra2) * _degToRad
+    one = math.cos(aa) * np.cos(bb)
+    two = math.sin(aa) * np.sin(bb) * np.cos(cc)
+    three = np.clip(one + two, -1.0, 1.0)
+    angularSeparation = np.arccos(three) * _radToDeg * 3600.0
+    north = -(dec1 - dec2) * 3600.0
+    east = -(ra1 - ra2) * np.cos((dec1 + dec2) * _degToRad / 2.) * 3600.0
+
+    return (
+        ["%0.*f" % (p, v) for v, p in zip(angularSeparation.tolist(), precisions)],
+        ["%0.*f" % (p, v) for v, p in zip(north.tolist(), precisions)],
+        ["%0.*f" % (p, v) for v, p in zip(east.tolist(), precisions)]
+    )
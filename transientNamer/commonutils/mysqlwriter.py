@@ -0,0 +1,262 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Write TNS results straight into MySQL database tables with batched, upserting inserts*
+
+:Author:
+    David Young
+"""
+
+# THE SCHEMAS OF THE FOUR TNS TABLES (`%(tableNamePrefix)s` IS REPLACED WITH
+# THE TABLE NAME PREFIX)
+tableSchemas = {}
+tableSchemas["sources"] = """
+CREATE TABLE `%(tableNamePrefix)s_sources` (
+  `primaryId` bigint(20) NOT NULL AUTO_INCREMENT COMMENT 'An internal counter',
+  `TNSId` varchar(20) NOT NULL,
+  `TNSName` varchar(20) DEFAULT NULL,
+  `dateCreated` datetime DEFAULT NULL,
+  `decDeg` double DEFAULT NULL,
+  `decSex` varchar(45) DEFAULT NULL,
+  `discDate` datetime DEFAULT NULL,
+  `discMag` double DEFAULT NULL,
+  `discMagFilter` varchar(45) DEFAULT NULL,
+  `discSurvey` varchar(100) DEFAULT NULL,
+  `discoveryName` varchar(100) DEFAULT NULL,
+  `objectUrl` varchar(200) DEFAULT NULL,
+  `raDeg` double DEFAULT NULL,
+  `raSex` varchar(45) DEFAULT NULL,
+  `specType` varchar(100) DEFAULT NULL,
+  `transRedshift` double DEFAULT NULL,
+  `updated` tinyint(4) DEFAULT '0',
+  `dateLastModified` datetime DEFAULT NULL,
+  `hostName` VARCHAR(100) NULL DEFAULT NULL,
+  `hostRedshift` DOUBLE NULL DEFAULT NULL,
+  `survey` VARCHAR(100) NULL DEFAULT NULL,
+  PRIMARY KEY (`primaryId`),
+  UNIQUE KEY `tnsid` (`TNSId`)
+) ENGINE=InnoDB AUTO_INCREMENT=0 DEFAULT CHARSET=latin1;
+            """
+
+tableSchemas["photometry"] = """
+CREATE TABLE `%(tableNamePrefix)s_photometry` (
+  `primaryId` bigint(20) NOT NULL AUTO_INCREMENT COMMENT 'An internal counter',
+  `TNSId` varchar(20) NOT NULL,
+  `dateCreated` datetime DEFAULT CURRENT_TIMESTAMP,
+  `exptime` double DEFAULT NULL,
+  `filter` varchar(100) DEFAULT NULL,
+  `limitingMag` tinyint(4) DEFAULT NULL,
+  `mag` double DEFAULT NULL,
+  `magErr` double DEFAULT NULL,
+  `magUnit` varchar(100) DEFAULT NULL,
+  `objectName` varchar(100) DEFAULT NULL,
+  `obsdate` datetime DEFAULT NULL,
+  `reportAddedDate` datetime DEFAULT NULL,
+  `suggestedType` varchar(100) DEFAULT NULL,
+  `survey` varchar(100) DEFAULT NULL,
+  `telescope` varchar(100) DEFAULT NULL,
+  `updated` tinyint(4) DEFAULT '0',
+  `dateLastModified` datetime DEFAULT NULL,
+  `remarks` VARCHAR(800) NULL DEFAULT NULL,
+  `sourceComment` VARCHAR(800) NULL DEFAULT NULL,
+  PRIMARY KEY (`primaryId`),
+  UNIQUE KEY `tnsid_survey_obsdate` (`TNSId`,`survey`,`obsdate`),
+  UNIQUE INDEX `u_tnsid_survey_obsdate` (`TNSId` ASC, `survey` ASC, `obsdate` ASC),
+  UNIQUE INDEX `u_tnsid_obsdate_objname` (`TNSId` ASC, `obsdate` ASC, `objectName` ASC)
+) ENGINE=InnoDB AUTO_INCREMENT=0 DEFAULT CHARSET=latin1;
+            """
+
+tableSchemas["spectra"] = """
+CREATE TABLE `%(tableNamePrefix)s_spectra` (
+  `primaryId` bigint(20) NOT NULL AUTO_INCREMENT COMMENT 'An internal counter',
+  `TNSId` varchar(45) NOT NULL,
+  `TNSuser` varchar(45) DEFAULT NULL,
+  `dateCreated` datetime DEFAULT CURRENT_TIMESTAMP,
+  `exptime` double DEFAULT NULL,
+  `obsdate` datetime DEFAULT NULL,
+  `reportAddedDate` datetime DEFAULT NULL,
+  `specType` varchar(100) DEFAULT NULL,
+  `survey` varchar(100) DEFAULT NULL,
+  `telescope` varchar(100) DEFAULT NULL,
+  `transRedshift` double DEFAULT NULL,
+  `updated` tinyint(4) DEFAULT '0',
+  `dateLastModified` datetime DEFAULT NULL,
+  `remarks` VARCHAR(800) NULL DEFAULT NULL,
+  `sourceComment` VARCHAR(800) NULL DEFAULT NULL,
+  PRIMARY KEY (`primaryId`),
+  UNIQUE KEY `u_tnsid_survey_obsdate` (`TNSId`,`survey`,`obsdate`),
+  UNIQUE KEY `u_id_user_obsdate` (`TNSId`,`TNSuser`,`obsdate`)
+) ENGINE=InnoDB AUTO_INCREMENT=0 DEFAULT CHARSET=latin1;
+            """
+
+tableSchemas["files"] = """
+CREATE TABLE `%(tableNamePrefix)s_files` (
+  `primaryId` bigint(20) NOT NULL AUTO_INCREMENT COMMENT 'An internal counter',
+  `TNSId` varchar(100) NOT NULL,
+  `dateCreated` datetime DEFAULT CURRENT_TIMESTAMP,
+  `dateObs` datetime DEFAULT NULL,
+  `filename` varchar(200) DEFAULT NULL,
+  `spec1phot2` tinyint(4) DEFAULT NULL,
+  `url` varchar(800) DEFAULT NULL,
+  `updated` tinyint(4) DEFAULT '0',
+  `dateLastModified` datetime DEFAULT NULL,
+  `comment` VARCHAR(800) NULL DEFAULT NULL,
+  PRIMARY KEY (`primaryId`),
+  UNIQUE KEY `tnsid_url` (`TNSId`,`url`)
+) ENGINE=InnoDB AUTO_INCREMENT=0 DEFAULT CHARSET=latin1;
+            """
+
+# THE COLUMNS MAINTAINED BY THE DATABASE RATHER THAN READ FROM THE RESULTS
+_managedColumns = ("primaryId", "updated", "dateLastModified")
+
+
+class mysql_writer(object):
+    """
+    *write TNS results straight into the four TNS MySQL tables with batched, upserting inserts*
+
+    Rows are sent with `executemany` (one multi-row `INSERT ... ON DUPLICATE KEY UPDATE` statement per batch) over a single connection, and each batch is committed as its own transaction, so nothing is rendered to SQL text first and a failed batch is rolled back whole. Rows that match an existing row on a unique key (`TNSId` for sources, `TNSId` and `url` for files etc.) update that row in place. Keys that are not columns of a table (e.g. the separations of a conesearch, which depend on the query) are not stored.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``dbConn`` -- database connection. Default *False* (connect with the `database settings` in the settings file)
+    - ``tableNamePrefix`` -- the prefix of the table names. Default *TNS*
+    - ``settings`` -- the settings dictionary
+    - ``batchSize`` -- the number of rows to send and commit at a time. Default *2500*
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.mysqlwriter import mysql_writer
+    writer = mysql_writer(
+        log=log,
+        dbConn=dbConn,
+        tableNamePrefix="TNS"
+    )
+    writer.create_tables()
+    counts = writer.write(
+        sources=tns.sources,
+        photometry=tns.photometry,
+        spectra=tns.spectra,
+        files=tns.files
+    )
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            dbConn=False,
+            tableNamePrefix="TNS",
+            settings=False,
+            batchSize=2500):
+        self.log = log
+        if not dbConn:
+            from fundamentals.mysql import database
+            dbConn = database(
+                log=log,
+                dbSettings=settings["database settings"]
+            ).connect()
+        self.dbConn = dbConn
+        self.tableNamePrefix = tableNamePrefix
+        self.batchSize = int(batchSize)
+
+        # THE COLUMNS OF EACH TABLE, READ ON FIRST USE
+        self._columns = {}
+        return None
+
+    def create_tables(
+            self):
+        """*create the four TNS tables if they don't yet exist*"""
+        self.log.debug('starting the ``create_tables`` method')
+
+        tableNamePrefix = self.tableNamePrefix
+        with self.dbConn.cursor() as cursor:
+            for schema in tableSchemas.values():
+                cursor.execute((schema % locals()).replace(
+                    "CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1).strip())
+        self.dbConn.commit()
+
+        self.log.debug('completed the ``create_tables`` method')
+        return None
+
+    def write(
+            self,
+            sources=[],
+            photometry=[],
+            spectra=[],
+            files=[]):
+        """
+        *add or update rows in the four TNS tables*
+
+        **Key Arguments**
+
+        - ``sources``, ``photometry``, ``spectra``, ``files`` -- lists of dictionaries of results (as returned by `search`)
+
+        **Return**
+
+        - ``counts`` -- the number of sources, photometry, spectra and files rows written
+        """
+        self.log.debug('starting the ``write`` method')
+
+        counts = []
+        for flavour, rows in (("sources", sources), ("photometry", photometry), ("spectra", spectra), ("files", files)):
+            rows = list(rows)
+            for i in range(0, len(rows), self.batchSize):
+                self._write_batch(flavour, rows[i:i + self.batchSize])
+            counts.append(len(rows))
+
+        self.log.debug('completed the ``write`` method')
+        return tuple(counts)
+
+    def _write_batch(
+            self,
+            flavour,
+            rows):
+        """*upsert one batch of rows into a table inside a single transaction*"""
+        tableName = f"{self.tableNamePrefix}_{flavour}"
+        tableColumns = self._table_columns(tableName)
+
+        # THE COLUMNS FILLED BY THE BATCH, IN THE ORDER THEY ARE FIRST SEEN
+        columns = []
+        for row in rows:
+            for k in row:
+                if k not in columns and k in tableColumns and k not in _managedColumns:
+                    columns.append(k)
+        if not columns:
+            return None
+
+        names = ", ".join(f"`{c}`" for c in columns)
+        placeholders = ", ".join(["%s"] * len(columns))
+        updates = ", ".join(f"`{c}`=VALUES(`{c}`)" for c in columns)
+        sqlQuery = f"INSERT INTO `{tableName}` ({names}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {updates}, updated=1, dateLastModified=NOW()"
+        values = [tuple(row.get(c) for c in columns) for row in rows]
+
+        self.dbConn.begin()
+        try:
+            with self.dbConn.cursor() as cursor:
+                cursor.executemany(sqlQuery, values)
+            self.dbConn.commit()
+        except Exception:
+            self.dbConn.rollback()
+            raise
+        return None
+
+    def _table_columns(
+            self,
+            tableName):
+        """*the column names of a table*"""
+        if tableName not in self._columns:
+            with self.dbConn.cursor() as cursor:
+                cursor.execute(f"SHOW COLUMNS FROM `{tableName}`")
+                self._columns[tableName] = set(
+                    _first(r) for r in cursor.fetchall())
+        return self._columns[tableName]
+
+
+def _first(
+        row):
+    """*the first value of a row from either a tuple or a dictionary cursor*"""
+    if isinstance(row, dict):
+        return next(iter(row.values()))
+    return row[0]
@@ -0,0 +1,190 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*A process-wide token-bucket rate limiter for all traffic to the TNS*
+
+:Author:
+    David Young
+"""
+import threading
+import time
+
+# ONE LIMITER PER DISTINCT CONFIGURATION - SHARED ACROSS THE WHOLE PROCESS
+_limiters = {}
+_limitersLock = threading.Lock()
+
+# DEFAULTS USED WHEN THE `tns rate limit` SETTINGS BLOCK IS ABSENT
+defaultRateLimitSettings = {
+    "requests per second": 1.0,
+    "burst": 1,
+    "endpoints": {}
+}
+
+
+class token_bucket(object):
+    """
+    *a thread-safe token bucket*
+
+    Tokens refill continuously at ``rate`` per second up to ``burst``. Each request takes one token; when the bucket is empty the request reserves a future token and is told how long to wait for it, so concurrent callers are served in the order they asked.
+
+    **Key Arguments**
+
+    - ``rate`` -- tokens added per second
+    - ``burst`` -- the maximum number of tokens the bucket can hold
+    """
+
+    def __init__(
+            self,
+            rate,
+            burst=1):
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(
+            self):
+        """*take a token from the bucket*
+
+        **Return**
+
+        - ``wait`` -- the number of seconds the caller must wait before the token is theirs
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens +
+                              (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1.
+            if self.tokens >= 0:
+                return 0.
+            return -self.tokens / self.rate
+
+    def pause(
+            self,
+            seconds):
+        """*empty the bucket so that no token is available for at least ``seconds``*
+
+        **Key Arguments**
+
+        - ``seconds`` -- how long to hold back all callers
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens +
+                              (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens = min(self.tokens, -float(seconds) * self.rate)
+
+
+class rate_limiter(object):
+    """
+    *a global token bucket plus optional per-endpoint token buckets*
+
+    A request must obtain a token from the global bucket and from the bucket of its endpoint (the first path segment of the TNS URL, e.g. `search` or `astronotes`), if that endpoint has its own budget.
+
+    **Key Arguments**
+
+    - ``rateLimitSettings`` -- dictionary with `requests per second`, `burst` and an optional `endpoints` dictionary of per-endpoint `requests per second` and `burst`
+    """
+
+    def __init__(
+            self,
+            rateLimitSettings):
+        self.bucket = token_bucket(
+            rate=rateLimitSettings["requests per second"],
+            burst=rateLimitSettings["burst"]
+        )
+        self.endpoints = {}
+        for endpoint, budget in (rateLimitSettings.get("endpoints") or {}).items():
+            self.endpoints[endpoint] = token_bucket(
+                rate=budget["requests per second"],
+                burst=budget.get("burst", 1)
+            )
+
+    def acquire(
+            self,
+            endpoint=None):
+        """*block until a request to the endpoint is allowed*
+
+        **Key Arguments**
+
+        - ``endpoint`` -- the TNS endpoint about to be requested. Default *None* (global budget only)
+
+        **Return**
+
+        - ``wait`` -- the number of seconds spent waiting
+        """
+        wait = self.reserve(endpoint)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def reserve(
+            self,
+            endpoint=None):
+        """*claim the next request slot for the endpoint without blocking (e.g. to wait with `asyncio.sleep` instead)*
+
+        **Key Arguments**
+
+        - ``endpoint`` -- the TNS endpoint about to be requested. Default *None* (global budget only)
+
+        **Return**
+
+        - ``wait`` -- the number of seconds the caller must wait before making the request
+        """
+        wait = self.bucket.reserve()
+        if endpoint in self.endpoints:
+            wait = max(wait, self.endpoints[endpoint].reserve())
+        return wait
+
+    def pause(
+            self,
+            seconds,
+            endpoint=None):
+        """*hold back every caller (or every caller of one endpoint) for ``seconds``, e.g. after the TNS replies 429 Too Many Requests*
+
+        **Key Arguments**
+
+        - ``seconds`` -- how long to hold back callers
+        - ``endpoint`` -- pause only this endpoint's budget. Default *None* (pause all TNS traffic)
+        """
+        if endpoint in self.endpoints:
+            self.endpoints[endpoint].pause(seconds)
+        else:
+            self.bucket.pause(seconds)
+
+
+def ratelimiter(
+        settings=False):
+    """*return the process-wide rate limiter for TNS traffic*
+
+    **Key Arguments**
+
+    - ``settings`` -- the settings dictionary. Budgets are read from the optional `tns rate limit` block.
+
+    **Return**
+
+    - ``limiter`` -- a `rate_limiter` shared by every caller with the same budgets
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils import ratelimiter
+    limiter = ratelimiter(settings)
+    limiter.acquire("search")
+    ```
+    """
+    rateLimitSettings = dict(defaultRateLimitSettings)
+    if settings and settings.get("tns rate limit"):
+        rateLimitSettings.update(settings["tns rate limit"])
+
+    endpoints = rateLimitSettings.get("endpoints") or {}
+    key = (float(rateLimitSettings["requests per second"]), float(rateLimitSettings["burst"]), tuple(sorted(
+        (k, float(v["requests per second"]), float(v.get("burst", 1))) for k, v in endpoints.items())))
+
+    with _limitersLock:
+        if key not in _limiters:
+            _limiters[key] = rate_limiter(rateLimitSettings)
+        return _limiters[key]
@@ -0,0 +1,124 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Compact, typed records of TNS results*
+
+:Author:
+    David Young
+"""
+from transientNamer.commonutils.columnar import columnTypes, _convert
+
+
+class _record(object):
+    """
+    *a compact record of one row of TNS results, with numeric and date values parsed*
+
+    Each record holds its values in `__slots__` rather than a dictionary, so a large set of results takes a fraction of the memory. Numeric columns are floats (or integers) and date columns `datetime` objects, as in the columnar renderers. Values are read as attributes (`record.mag`) or, so code written for the dictionaries returned by `search` keeps working, by key (`record["mag"]`, `record.get("mag")`, `dict(record)`). Keys absent from the original row are absent from the record.
+    """
+    __slots__ = ()
+    fields = ()
+
+    def __init__(
+            self,
+            **values):
+        for k, v in values.items():
+            setattr(self, k, v)
+
+    @classmethod
+    def from_dict(
+            cls,
+            log,
+            row):
+        """*a typed record from a dictionary of results returned by `search`*
+
+        **Key Arguments**
+
+        - ``log`` -- logger
+        - ``row`` -- dictionary of one row of results
+
+        **Return**
+
+        - ``record`` -- the record
+        """
+        return cls(**{k: _convert(log, k, columnTypes.get(k, "string"), v) for k, v in row.items()})
+
+    def as_dict(
+            self):
+        """*the record as a dictionary (with typed values)*"""
+        return {k: getattr(self, k) for k in self.keys()}
+
+    def keys(
+            self):
+        return [k for k in self.fields if hasattr(self, k)]
+
+    def values(
+            self):
+        return [getattr(self, k) for k in self.keys()]
+
+    def items(
+            self):
+        return [(k, getattr(self, k)) for k in self.keys()]
+
+    def get(
+            self,
+            key,
+            default=None):
+        return getattr(self, key, default) if key in self.fields else default
+
+    def __getitem__(self, key):
+        if key in self.fields and hasattr(self, key):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.fields and hasattr(self, key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, _record):
+            other = other.as_dict()
+        return self.as_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.as_dict()!r})"
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+
+class source(_record):
+    """*the discovery data of a transient*"""
+    fields = ("objectUrl", "TNSName", "raSex", "decSex", "specType", "transRedshift", "hostName", "hostRedshift", "reportingSurvey", "discSurvey", "discoveryName",
+              "discMag", "discMagFilter", "discDate", "raDeg", "decDeg", "separationArcsec", "separationNorthArcsec", "separationEastArcsec", "TNSId", "survey")
+    __slots__ = fields
+
+
+class photometry(_record):
+    """*a photometry measurement from an AT report*"""
+    fields = ("TNSId", "survey", "obsdate", "filter", "limitingMag", "mag", "magErr", "magUnit", "suggestedType",
+              "telescope", "exptime", "reportAddedDate", "remarks", "reportingGroup", "objectName", "sourceComment")
+    __slots__ = fields
+
+
+class spectrum(_record):
+    """*a spectrum from a classification report*"""
+    fields = ("TNSId", "survey", "obsdate", "specType", "transRedshift", "telescope",
+              "exptime", "reportAddedDate", "TNSuser", "remarks", "sourceComment")
+    __slots__ = fields
+
+
+class related_file(_record):
+    """*a file attached to an AT or classification report*"""
+    fields = ("TNSId", "filename", "url", "comment", "dateObs", "spec1phot2")
+    __slots__ = fields
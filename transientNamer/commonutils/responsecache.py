@@ -0,0 +1,471 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*A persistent, size-bounded on-disk cache of TNS search result pages*
+
+:Author:
+    David Young
+"""
+import os
+import json
+import time
+import gzip
+import hashlib
+import math
+import tempfile
+import threading
+
+# DEFAULTS USED FOR ANY KEYS MISSING FROM THE `tns cache` SETTINGS BLOCK
+defaultCacheSettings = {
+    "enabled": False,
+    "directory": "~/.cache/transientNamer/tns-search",
+    "max size mb": 200,
+    "offline": False,
+    "ttl seconds": {
+        "cone": 3600,
+        "name": 86400,
+        "internal name": 86400,
+        "recent": 300
+    },
+    "negative ttl seconds": 21600
+}
+
+_evictionLock = threading.Lock()
+
+# THE RUNNING TOTAL SIZE (BYTES) OF EACH CACHE DIRECTORY USED IN THIS PROCESS.
+# THE DIRECTORY IS MEASURED ONCE, THEN THE TOTAL IS KEPT UP TO DATE AS ENTRIES
+# ARE WRITTEN AND REMOVED (AND RE-MEASURED WHENEVER ENTRIES ARE EVICTED)
+_cacheSizes = {}
+_sizeLock = threading.Lock()
+_negativeLock = threading.Lock()
+
+
+class response_cache(object):
+    """
+    *a persistent, content-addressed cache of TNS search result pages*
+
+    Each page is stored (gzipped) under the SHA-256 hash of the full set of request parameters. Entries expire after a time-to-live that depends on the type of query (`cone`, `name`, `internal name` or `recent` for `discInLastDays` searches). Reading an entry marks it as recently used; when the cache grows beyond `max size mb` the least recently used entries are evicted until it is back under 90% of that size. The size of the cache is kept as a running total, so the cache directory is only walked when entries need evicting (writes by other processes are picked up at the next eviction). In `offline` mode the TNS is never contacted and only cached pages are served.
+
+    Searches that return "No results found" are remembered separately as *negative* entries with their own time-to-live (`negative ttl seconds`). Along with the request parameters, a negative entry records the search constraints (cone centre and radius, or name) in an index so that it can be invalidated as soon as the TNS reports an object that would now match it (see `invalidate_negative`). Negative entries count towards `max size mb` like any other.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``settings`` -- the settings dictionary. The cache is configured by the optional `tns cache` block and is disabled if that block is absent.
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.responsecache import response_cache
+    cache = response_cache(log=log, settings=settings)
+    if cache.enabled:
+        hit = cache.get(params, queryType="name")
+        if not hit:
+            cache.put(params, queryType="name", content=content, url=url)
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            settings=False):
+        self.log = log
+        cacheSettings = dict(defaultCacheSettings)
+        cacheSettings["ttl seconds"] = dict(defaultCacheSettings["ttl seconds"])
+        if settings and settings.get("tns cache"):
+            userSettings = dict(settings["tns cache"])
+            cacheSettings["enabled"] = True
+            cacheSettings["ttl seconds"].update(
+                userSettings.pop("ttl seconds", None) or {})
+            cacheSettings.update(userSettings)
+
+        self.enabled = bool(cacheSettings["enabled"])
+        self.offline = self.enabled and bool(cacheSettings["offline"])
+        self.directory = os.path.expanduser(cacheSettings["directory"])
+        self.maxBytes = float(cacheSettings["max size mb"]) * 1024 * 1024
+        self.ttl = cacheSettings["ttl seconds"]
+        self.negativeTtl = float(cacheSettings["negative ttl seconds"])
+        self.negativeDirectory = os.path.join(self.directory, "negative")
+        self._negativeIndex = os.path.join(
+            self.negativeDirectory, "index.jsonl")
+
+        if self.enabled and not os.path.exists(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+        return None
+
+    def key(
+            self,
+            params):
+        """*the content address (SHA-256 hex digest) of a set of request parameters*
+
+        **Key Arguments**
+
+        - ``params`` -- dictionary of request parameters (including the base URL)
+        """
+        canonical = json.dumps(
+            {str(k): str(v) for k, v in params.items()}, sort_keys=True)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(
+            self,
+            key):
+        return os.path.join(self.directory, key[:2], key + ".json.gz")
+
+    def get(
+            self,
+            params,
+            queryType):
+        """*return a cached page if one exists and is younger than the TTL for its query type*
+
+        **Key Arguments**
+
+        - ``params`` -- dictionary of request parameters
+        - ``queryType`` -- one of `cone`, `name`, `internal name` or `recent`
+
+        **Return**
+
+        - ``entry`` -- dictionary with `content` and `url` keys, or *None* on a miss
+        """
+        if not self.enabled:
+            return None
+        path = self._path(self.key(params))
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # IN OFFLINE MODE A STALE PAGE IS BETTER THAN NO PAGE
+        age = time.time() - entry["created"]
+        if not self.offline and age > float(self.ttl.get(queryType, 0)):
+            self._forget(path)
+            return None
+
+        # TOUCH THE ENTRY SO EVICTION IS LEAST-RECENTLY-USED
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.log.debug(f'TNS cache hit for {entry["url"]}')
+        return entry
+
+    def put(
+            self,
+            params,
+            queryType,
+            content,
+            url):
+        """*add a page to the cache, evicting the least recently used pages if the cache is too large*
+
+        **Key Arguments**
+
+        - ``params`` -- dictionary of request parameters
+        - ``queryType`` -- one of `cone`, `name`, `internal name` or `recent`
+        - ``content`` -- the HTML content of the page
+        - ``url`` -- the URL the page was downloaded from
+        """
+        if not self.enabled:
+            return None
+        path = self._path(self.key(params))
+        entry = {
+            "created": time.time(),
+            "queryType": queryType,
+            "url": url,
+            "content": content
+        }
+        self._resize(self._write(path, entry))
+        if self._size() > self.maxBytes:
+            self.evict()
+        return None
+
+    def _write(
+            self,
+            path,
+            entry):
+        """*write an entry, returning the number of bytes it added to the cache*"""
+        # WRITE TO A TEMPORARY FILE THEN MOVE INTO PLACE SO READERS NEVER SEE
+        # A PARTIAL ENTRY
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                    f.write(json.dumps(entry).encode("utf-8"))
+            added = os.path.getsize(tmpPath) - _file_size(path)
+            os.replace(tmpPath, path)
+        except OSError:
+            self._remove(tmpPath)
+            raise
+        return added
+
+    def _remove(
+            self,
+            path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _forget(
+            self,
+            path):
+        """*remove an entry and take its size off the running total*"""
+        size = _file_size(path)
+        self._remove(path)
+        self._resize(-size)
+
+    def _size(
+            self):
+        """*the running total size of the cache (bytes), measured from disk the first time it is needed*"""
+        with _sizeLock:
+            if self.directory not in _cacheSizes:
+                _cacheSizes[self.directory] = sum(
+                    e[1] for e in self._entries())
+            return _cacheSizes[self.directory]
+
+    def _resize(
+            self,
+            added):
+        """*add (or, if negative, take) a number of bytes to the running total size of the cache*"""
+        with _sizeLock:
+            if self.directory in _cacheSizes:
+                _cacheSizes[self.directory] = max(
+                    0, _cacheSizes[self.directory] + added)
+
+    def _entries(
+            self):
+        """*list the (path, size, last-used time) of every entry in the cache*"""
+        entries = []
+        if not os.path.exists(self.directory):
+            return entries
+        for d in os.scandir(self.directory):
+            if not d.is_dir():
+                continue
+            # NEGATIVE ENTRIES ARE PLAIN JSON, ALL OTHERS GZIPPED
+            suffix = ".json" if d.path == self.negativeDirectory else ".json.gz"
+            for f in os.scandir(d.path):
+                if f.name.endswith(suffix):
+                    try:
+                        stat = f.stat()
+                    except OSError:
+                        continue
+                    entries.append((f.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get_negative(
+            self,
+            params):
+        """*is there an unexpired record that this search returned no results?*
+
+        **Key Arguments**
+
+        - ``params`` -- dictionary of request parameters
+
+        **Return**
+
+        - ``entry`` -- dictionary with `content` and `url` keys, or *None* on a miss
+        """
+        if not self.enabled:
+            return None
+        path = os.path.join(self.negativeDirectory,
+                            self.key(params) + ".json")
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not self.offline and time.time() - entry["created"] > self.negativeTtl:
+            self._forget(path)
+            return None
+        self.log.debug(f'TNS negative cache hit for {entry["url"]}')
+        return entry
+
+    def put_negative(
+            self,
+            params,
+            url,
+            constraints):
+        """*record that a search returned no results*
+
+        **Key Arguments**
+
+        - ``params`` -- dictionary of request parameters
+        - ``url`` -- the search URL
+        - ``constraints`` -- dictionary of the search constraints used for invalidation: `raDeg`, `decDeg` and `radiusArcsec` for a conesearch, `name` or `internal_name` for a name search
+        """
+        if not self.enabled:
+            return None
+        key = self.key(params)
+        path = os.path.join(self.negativeDirectory, key + ".json")
+        entry = {
+            "created": time.time(),
+            "url": url,
+            "content": "No results found",
+            "constraints": constraints
+        }
+        os.makedirs(self.negativeDirectory, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(
+            dir=self.negativeDirectory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        added = os.path.getsize(tmpPath) - _file_size(path)
+        os.replace(tmpPath, path)
+
+        # LIST THE ENTRY IN THE INDEX READ BY `invalidate_negative`, SO THE
+        # ENTRIES THEMSELVES NEVER NEED TO BE READ TO INVALIDATE THEM
+        with _negativeLock:
+            with open(self._negativeIndex, "a") as f:
+                f.write(json.dumps(
+                    {"key": key, "created": entry["created"], "constraints": constraints}) + "\n")
+
+        self._resize(added)
+        if self._size() > self.maxBytes:
+            self.evict()
+        return None
+
+    def invalidate_negative(
+            self,
+            sources=None):
+        """*forget negative results that newly reported transients would now match*
+
+        Only the index of negative entries (their search constraints and creation times) is read; entries that have expired are removed along the way.
+
+        **Key Arguments**
+
+        - ``sources`` -- list of source dictionaries (as returned by `search.sources`) newly reported on the TNS. A negative conesearch entry is removed if any source lies within its cone; a negative name search is removed if any source has a matching `TNSId` or `discoveryName`. Default *None* (remove all negative entries)
+
+        **Return**
+
+        - ``removed`` -- the number of negative entries removed
+        """
+        if not self.enabled or not os.path.exists(self.negativeDirectory):
+            return 0
+
+        if sources is None:
+            removed = 0
+            with _negativeLock:
+                for f in os.scandir(self.negativeDirectory):
+                    if f.name.endswith(".json"):
+                        self._forget(f.path)
+                        removed += 1
+                self._remove(self._negativeIndex)
+            return removed
+
+        names = set()
+        positions = []
+        for source in sources:
+            for k in ("TNSId", "discoveryName"):
+                if source.get(k):
+                    names.add(str(source[k]).replace(" ", "").lower())
+            if source.get("raDeg") is not None and source.get("decDeg") is not None:
+                positions.append(
+                    (float(source["raDeg"]), float(source["decDeg"])))
+
+        removed = 0
+        now = time.time()
+        with _negativeLock:
+            try:
+                with open(self._negativeIndex) as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                return 0
+
+            # THE LATEST LINE FOR EACH ENTRY (AN ENTRY RE-WRITTEN IS LISTED
+            # AGAIN)
+            listed = {}
+            for line in lines:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue
+                listed[item["key"]] = item
+
+            kept = []
+            for key, item in listed.items():
+                expired = now - item["created"] > self.negativeTtl
+                if expired or _matches(item["constraints"], names, positions):
+                    path = os.path.join(self.negativeDirectory, key + ".json")
+                    if os.path.exists(path):
+                        removed += 1
+                    self._forget(path)
+                else:
+                    kept.append(item)
+
+            # REWRITE THE INDEX WITHOUT THE ENTRIES REMOVED
+            if len(kept) < len(lines):
+                fd, tmpPath = tempfile.mkstemp(
+                    dir=self.negativeDirectory, suffix=".tmp")
+                with os.fdopen(fd, "w") as f:
+                    f.write("".join(json.dumps(item) +
+                                    "\n" for item in kept))
+                os.replace(tmpPath, self._negativeIndex)
+
+        self.log.debug(f'{removed} negative TNS cache entries invalidated')
+        return removed
+
+    def evict(
+            self):
+        """*delete the least recently used entries until the cache is back under 90% of its size limit (if it is over the limit)*
+
+        The cache directory is measured afresh, correcting the running total for entries written or removed by other processes.
+        """
+        with _evictionLock:
+            entries = self._entries()
+            total = sum(e[1] for e in entries)
+            if total > self.maxBytes:
+                entries.sort(key=lambda e: e[2])
+                for path, size, used in entries:
+                    if total <= 0.9 * self.maxBytes:
+                        break
+                    self._remove(path)
+                    total -= size
+            with _sizeLock:
+                _cacheSizes[self.directory] = total
+        return None
+
+    def clear(
+            self):
+        """*delete every entry in the cache*
+        """
+        for path, size, used in self._entries():
+            self._remove(path)
+        with _sizeLock:
+            _cacheSizes.pop(self.directory, None)
+        self.invalidate_negative()
+        return None
+
+
+def _file_size(
+        path):
+    """*the size of a file in bytes (0 if it does not exist)*"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _matches(
+        constraints,
+        names,
+        positions):
+    """*would any of the named or positioned sources satisfy these search constraints?*"""
+    for k in ("name", "internal_name"):
+        if constraints.get(k) and constraints[k].replace(" ", "").lower() in names:
+            return True
+    if constraints.get("raDeg") is None:
+        return False
+    ra1 = math.radians(float(constraints["raDeg"]))
+    dec1 = math.radians(float(constraints["decDeg"]))
+    radius = float(constraints["radiusArcsec"])
+    for ra2, dec2 in positions:
+        ra2 = math.radians(ra2)
+        dec2 = math.radians(dec2)
+        # HAVERSINE ANGULAR SEPARATION
+        a = math.sin((dec2 - dec1) / 2.) ** 2 + math.cos(dec1) * \
+            math.cos(dec2) * math.sin((ra2 - ra1) / 2.) ** 2
+        separation = math.degrees(
+            2. * math.asin(min(1., math.sqrt(a)))) * 3600.
+        if separation <= radius:
+            return True
+    return False
@@ -0,0 +1,440 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*A single-pass parser for TNS search result pages*
+
+:Author:
+    David Young
+"""
+import re
+
+# ONE LINEAR TOKENIZER FOR THE WHOLE PAGE. ONLY THE TAGS THAT GIVE THE RESULTS
+# TABLE ITS STRUCTURE ARE TOKENIZED; EVERYTHING ELSE IS SKIPPED BY THE REGEX
+# ENGINE. CELLS AND LINKS NEVER CONTAIN OTHER CELLS OR LINKS DIRECTLY, SO ONLY
+# TABLES AND ROWS NEED THEIR END TAGS. COMMENTS ARE MATCHED SO THAT TAGS INSIDE
+# THEM ARE IGNORED, AND QUOTED ATTRIBUTE VALUES MAY CONTAIN `>`. THE TNS WRITES
+# `class` FIRST AND DOUBLE-QUOTED, SO THAT IS THE FAST PATH; ANY OTHER ATTRIBUTE
+# ORDER OR QUOTING FALLS BACK TO THE ATTRIBUTE REGEXES BELOW
+_tokens = re.compile(
+    r"""<!--.*?-->|<(table|tr|td|a|script|style)(?=[\s>/])(?:\s+class="([^"]*)")?((?:[^>"']+|"[^"]*"|'[^']*')*)>|</(table|tr|script|style)\s*>""", re.S)
+_classAttr = re.compile(
+    r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.I)
+_hrefAttr = re.compile(
+    r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.I)
+_columnIdAttr = re.compile(r"""\bcolumn\s*=\s*["']?id(?:["'\s/>]|$)""", re.I)
+_rawTextTags = ("script", "style")
+
+# THE CELLS READ FROM THE HEADER AND DATA ROWS OF THE REPORTS, IN PAGE ORDER.
+# EACH CELL IS FOUND BY THE END OF ITS CLASS NAME; `None` MARKS AN OPTIONAL
+# FIELD THAT THE TNS NEVER FILLS (KEPT SO THE DICTIONARIES MATCH THE LEGACY
+# REGEX PARSER KEY FOR KEY)
+_atHeaderCells = [
+    ("reportAddedDate", "time_received"), ("sender", "user_name"),
+    ("reporters", "reporter_name"), ("reportingGroup", "reporting_group_name"),
+    ("surveyGroup", "source_group_name"), ("ra", "ra"), ("dec", "decl"),
+    ("obsDate", "discovery_date"), ("mag", "flux"), ("magFilter", "filter_name"),
+    ("relatedFiles", "related_files"), ("suggestedType", "type_name"),
+    ("hostName", "hostName"), ("hostRedshift", None),
+    ("objectName", "internal_name"), ("survey", "groups"),
+    ("sourceComment", "remarks")]
+_photCells = [
+    ("obsdate", "obsdate"), ("mag", "flux"), ("magErr", "fluxerr"),
+    ("limitingMag", "limflux"), ("magUnit", "unit_name"),
+    ("filter", "filter_name"), ("telescope", "tel_inst"),
+    ("exptime", "exptime"), ("observer", "observer"), ("remarks", "-remarks")]
+_classHeaderCells = [
+    ("reportAddedDate", "time_received"), ("TNSuser", "user_name"),
+    ("reporters", "classifier_name"), ("survey", "source_group_name"),
+    ("specType", "-type"), ("transRedshift", "-redshift"),
+    ("relatedFiles", "-related_files"), ("surveyGroup", "-groups"),
+    ("sourceComment", "-remarks")]
+_specCells = [
+    ("obsdate", "cell-obsdate"), ("telescope", "-tel_inst"),
+    ("exptime", "-exptime"), ("sender", "-observer"),
+    ("reducer", "-reducer"), ("survey", "-source_group_name"),
+    ("filepath", "-asciifile"), ("fitsFilepath", "-fitsfile"),
+    ("surveyGroup", "-groups"), ("remarks", "-remarks")]
+_sourceCells = [
+    ("tnsId", "cell-id"), ("objectUrl", "cell-name"), ("TNSName", "cell-name"),
+    ("raSex", "cell-ra"), ("decSex", "cell-decl"),
+    ("specType", "cell-objtype_name"), ("transRedshift", "cell-redshift"),
+    ("hostName", "cell-hostname"), ("hostRedshift", "cell-host_redshift"),
+    ("reportingSurvey", "cell-reporting_group_name"),
+    ("discSurvey", "cell-source_group_name"),
+    ("discoveryName", "cell-internal_name"),
+    ("discMag", "cell-discoverymag"), ("discMagFilter", "cell-disc_filter_name"),
+    ("discDate", "cell-discoverydate"), ("sender", "cell-discoverer")]
+
+
+class _element(object):
+    """*an element of the page, holding raw offsets into the page content*"""
+    __slots__ = ("tag", "startTag", "start", "end", "parent", "children", "cls")
+
+    def __init__(
+            self,
+            tag,
+            startTag,
+            start,
+            parent,
+            cls):
+        self.tag = tag
+        self.startTag = startTag
+        self.start = start
+        self.end = None
+        self.parent = parent
+        self.children = []
+        self.cls = cls
+
+    def inner(self, content):
+        """*the raw HTML between the start tag and the (first) end tag*"""
+        end = self.end
+        if end is None:
+            end = content.find("</" + self.tag + ">", self.start)
+        return content[self.start:end]
+
+    def text(self, content):
+        """*the raw text before the first tag inside the element*"""
+        return content[self.start:content.find("<", self.start)]
+
+    def iter(self, tag=None):
+        """*all descendant elements in page order*"""
+        found = []
+        stack = self.children[::-1]
+        while stack:
+            el = stack.pop()
+            if tag is None or el.tag == tag:
+                found.append(el)
+            if el.children:
+                stack += el.children[::-1]
+        return found
+
+
+def _tokenize(
+        content):
+    """*build the element tree of a page in a single pass over its tags*
+
+    **Return**
+
+    - ``root`` -- the root element
+    - ``mainCells`` -- the `cell-id` cells that start the main row of each transient
+    """
+    root = _element("", "", 0, None, "")
+    stack = [root]
+    mainCells = []
+    rawText = None
+    for m in _tokens.finditer(content):
+        tag, cls, attrs, endTag = m.groups()
+        if rawText:
+            # SKIP EVERYTHING INSIDE A SCRIPT OR STYLE ELEMENT
+            if endTag == rawText:
+                rawText = None
+            continue
+        if endTag:
+            # CLOSE THE NEAREST MATCHING OPEN ELEMENT (AND ANY LEFT UNCLOSED
+            # INSIDE IT)
+            for i in range(len(stack) - 1, 0, -1):
+                if stack[i].tag == endTag:
+                    for el in stack[i:]:
+                        el.end = m.start()
+                    del stack[i:]
+                    break
+            continue
+        if tag is None:
+            continue
+        if tag in _rawTextTags:
+            rawText = tag
+            continue
+        if cls is None:
+            cls = (_attr(_classAttr, attrs) or "").strip()
+
+        parent = stack[-1]
+        if tag == "tr" and parent.tag == "tr":
+            # AN UNCLOSED ROW ENDS WHERE THE NEXT ONE STARTS
+            parent.end = m.start()
+            stack.pop()
+            parent = stack[-1]
+        elif tag != "td" and parent.tag == "tr" and parent.children:
+            # TABLES AND LINKS IN A ROW BELONG TO ITS CURRENT CELL
+            parent = parent.children[-1]
+
+        el = _element(tag, m.group(), m.end(), parent, cls)
+        parent.children.append(el)
+        if tag == "td":
+            if cls == "cell-id" and _columnIdAttr.search(attrs):
+                mainCells.append(el)
+        elif tag != "a":
+            stack.append(el)
+    for el in stack:
+        el.end = len(content)
+    return root, mainCells
+
+
+def _attr(
+        regex,
+        attrs):
+    """*the value of an attribute matched by one of the attribute regexes (*None* if absent), however it is quoted*"""
+    m = regex.search(attrs)
+    if not m:
+        return None
+    return next(v for v in m.groups() if v is not None)
+
+
+def _cells(
+        row):
+    """*the cells of a table row*"""
+    return [c for c in row.children if c.tag == "td"]
+
+
+def _read_cells(
+        content,
+        cells,
+        fields):
+    """*read fields from a run of cells, each field from the next cell whose class ends with its marker*
+
+    **Return**
+
+    - ``values`` -- dictionary of cell elements (*None* where not found), or *None* if a required cell is missing
+    """
+    values = {}
+    i = 0
+    for name, marker in fields:
+        if marker is None:
+            values[name] = None
+            continue
+        while i < len(cells) and not cells[i].cls.endswith(marker):
+            i += 1
+        if i == len(cells):
+            return None
+        values[name] = cells[i]
+        i += 1
+    return values
+
+
+def _texts(
+        content,
+        cells):
+    return {k: (None if v is None else v.text(content)) for k, v in cells.items()}
+
+
+def _first_link(
+        el):
+    for a in el.iter("a"):
+        href = _attr(_hrefAttr, a.startTag)
+        if href is not None:
+            return href
+    return None
+
+
+def _related_files(
+        content,
+        block):
+    """*the related files (URL and comment) listed anywhere in a block*"""
+    files = []
+    for td in block.iter("td"):
+        if td.cls != "cell-filename":
+            continue
+        filepath = _first_link(td)
+        if filepath is None:
+            continue
+        comment = ""
+        for sibling in td.parent.children[td.parent.children.index(td) + 1:]:
+            if sibling.cls.endswith("remarks"):
+                comment = sibling.text(content)
+                break
+        files.append({"filepath": filepath, "fileComment": comment})
+    return files
+
+
+def _is_report_row(
+        el):
+    """*the header row of an AT or classification report*"""
+    if el.tag != "tr" or not el.cls.startswith("row-"):
+        return False
+    cells = _cells(el)
+    return bool(cells) and cells[0].cls == "cell-id" and not _columnIdAttr.search(cells[0].startTag)
+
+
+def _reports(
+        content,
+        block,
+        headerFields,
+        dataRows):
+    """*the header and data rows of every report in an AT or classification block*
+
+    A report is its header row plus the rows following it, up to the next report header.
+    """
+    reports = []
+    rows = block.iter("tr")
+    headers = [i for i, r in enumerate(rows) if _is_report_row(r)]
+    for n, i in enumerate(headers):
+        following = rows[i + 1:headers[n + 1]
+                         if n + 1 < len(headers) else len(rows)]
+        header = _read_cells(content, _cells(rows[i]), headerFields)
+        if header is None:
+            continue
+        reports.append((_texts(content, header), dataRows(content, following)))
+    return reports
+
+
+def _phot_rows(
+        content,
+        rows):
+    phot = []
+    for row in rows:
+        if not row.cls.startswith("row-"):
+            continue
+        cells = _read_cells(content, _cells(row), _photCells)
+        if cells:
+            phot.append(_texts(content, cells))
+    return phot
+
+
+def _spec_rows(
+        content,
+        rows):
+    spec = []
+    for row in rows:
+        rowCells = _cells(row)
+        for i, c in enumerate(rowCells):
+            if c.cls == "cell-obsdate":
+                cells = _read_cells(content, rowCells[i:], _specCells)
+                if not cells:
+                    continue
+                values = _texts(content, cells)
+                values["filepath"] = _first_link(cells["filepath"])
+                values["fitsFilepath"] = _first_link(cells["fitsFilepath"])
+                spec.append(values)
+                break
+    return spec
+
+
+def _source(
+        content,
+        row):
+    """*the discovery information from the main row of a transient*"""
+    byClass = {}
+    for c in _cells(row):
+        byClass.setdefault(c.cls, c)
+    source = {}
+    for name, cls in _sourceCells:
+        if cls not in byClass:
+            return None
+        source[name] = byClass[cls].inner(content)
+
+    # NAME CELL: <a href="URL">NAME</a>
+    name = byClass["cell-name"]
+    link = name.children[0] if name.children else None
+    href = _attr(_hrefAttr, link.startTag) if link and link.tag == "a" else None
+    if href is None:
+        return None
+    source["objectUrl"] = href
+    source["TNSName"] = link.inner(content)
+
+    # INTERNAL NAMES MAY BE WRAPPED IN A LINK
+    discoveryName = source["discoveryName"]
+    if discoveryName.startswith("<a"):
+        discoveryName = discoveryName[discoveryName.find(">") + 1:]
+    if discoveryName.endswith("</a>"):
+        discoveryName = discoveryName[:-4]
+    source["discoveryName"] = discoveryName
+    return source
+
+
+def parse_results_page(
+        content,
+        reports=True):
+    """*parse every transient on a TNS search results page in a single pass*
+
+    The page is tokenized once into a tree of elements that keep their raw offsets into the page, so the values returned are the raw (unescaped) text of each cell, exactly as captured by the legacy regex parser kept in the `search` tests. Attributes may be in any order and single-, double- or un-quoted.
+
+    **Key Arguments**
+
+    - ``content`` -- the HTML content of the results page
+    - ``reports`` -- also read the AT and classification reports of each transient. Default *True*. If *False*, the reports can be read later with `read_reports`
+
+    **Return**
+
+    - ``transients`` -- a list with one dictionary per transient row, in page order, with keys:
+        - `source` -- the discovery information (*None* if it could not be read)
+        - `reportRows` -- the rows of the page holding the transient's reports
+        - `atReports` -- list of (header, photometry rows) tuples, one per AT report
+        - `atFiles` -- the related files listed in the AT reports
+        - `classReports` -- list of (header, spectra rows) tuples, one per classification report
+        - `classFiles` -- the related files listed in the classification reports
+
+    The last four keys are only present once the reports have been read.
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.resultsparser import parse_results_page
+    for transient in parse_results_page(content):
+        print(transient["source"]["TNSName"])
+    ```
+    """
+    root, mainCells = _tokenize(content)
+    mainRows = set(id(td.parent) for td in mainCells)
+
+    # A TRANSIENT IS ITS MAIN ROW (WITH THE `cell-id` COLUMN) PLUS THE SIBLING
+    # ROWS THAT FOLLOW IT (THE AT AND CLASSIFICATION REPORTS)
+    transients = []
+    for td in mainCells:
+        row = td.parent
+        siblings = row.parent.children
+        block = []
+        for sibling in siblings[siblings.index(row) + 1:]:
+            if id(sibling) in mainRows:
+                break
+            block.append(sibling)
+
+        transient = {
+            "source": _source(content, row),
+            "reportRows": block
+        }
+        if reports:
+            read_reports(content, transient)
+        transients.append(transient)
+
+    return transients
+
+
+def read_reports(
+        content,
+        transient):
+    """*read the AT and classification reports of a transient returned by `parse_results_page`*
+
+    **Key Arguments**
+
+    - ``content`` -- the HTML content of the results page
+    - ``transient`` -- the transient dictionary. The `atReports`, `atFiles`, `classReports` and `classFiles` keys are added in place
+
+    **Return**
+
+    - ``transient`` -- the same dictionary
+    """
+    transient["atReports"] = []
+    transient["atFiles"] = []
+    transient["classReports"] = []
+    transient["classFiles"] = []
+
+    # THE AT AND CLASSIFICATION BLOCKS ARE THE CELLS HEADED `AT reports` AND
+    # `Classification reports`
+    for sibling in transient["reportRows"]:
+        for cell in _cells(sibling):
+            table = None
+            for child in cell.children:
+                if child.tag == "table":
+                    table = child
+                    break
+            heading = content[cell.start:table.start if table else content.find(
+                "</td>", cell.start)]
+            if "Classification reports" in heading:
+                transient["classReports"] = _reports(
+                    content, cell, _classHeaderCells, _spec_rows)
+                transient["classFiles"] = _related_files(content, cell)
+            elif "AT reports" in heading:
+                transient["atReports"] = _reports(
+                    content, cell, _atHeaderCells, _phot_rows)
+                transient["atFiles"] = _related_files(content, cell)
+
+    return transient
@@ -0,0 +1,111 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Exponential backoff with jitter for retrying failed TNS requests*
+
+:Author:
+    David Young
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# DEFAULTS USED WHEN THE `tns retries` SETTINGS BLOCK IS ABSENT
+defaultRetrySettings = {
+    "max retries": 3,
+    "backoff initial": 2,
+    "backoff max": 60,
+    "jitter": True
+}
+
+
+class retry_policy(object):
+    """
+    *decide whether and how long to wait before retrying a failed TNS request*
+
+    The wait before retry ``n`` (counting from 0) is ``backoff initial * 2**n`` seconds, capped at ``backoff max``. With jitter enabled the wait is drawn uniformly from the upper half of that window so that concurrent workers do not retry in lock-step. A `Retry-After` header sent by the TNS (typically with a 429 or 503) is always honoured as a minimum wait.
+
+    **Key Arguments**
+
+    - ``settings`` -- the settings dictionary. Limits are read from the optional `tns retries` block.
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.retrypolicy import retry_policy
+    policy = retry_policy(settings)
+    attempt = 0
+    while policy.should_retry(attempt):
+        ...
+        time.sleep(policy.delay(attempt, retryAfter=response.headers.get("Retry-After")))
+        attempt += 1
+    ```
+    """
+
+    def __init__(
+            self,
+            settings=False):
+        retrySettings = dict(defaultRetrySettings)
+        if settings and settings.get("tns retries"):
+            retrySettings.update(settings["tns retries"])
+        self.maxRetries = int(retrySettings["max retries"])
+        self.backoffInitial = float(retrySettings["backoff initial"])
+        self.backoffMax = float(retrySettings["backoff max"])
+        self.jitter = bool(retrySettings["jitter"])
+
+    def should_retry(
+            self,
+            attempt):
+        """*is another retry allowed after ``attempt`` retries?*
+
+        **Key Arguments**
+
+        - ``attempt`` -- the number of retries made so far
+        """
+        return attempt < self.maxRetries
+
+    def delay(
+            self,
+            attempt,
+            retryAfter=None):
+        """*the number of seconds to wait before the next retry*
+
+        **Key Arguments**
+
+        - ``attempt`` -- the number of retries made so far
+        - ``retryAfter`` -- the value of the `Retry-After` response header, if any. Default *None*
+
+        **Return**
+
+        - ``delay`` -- seconds to wait
+        """
+        delay = min(self.backoffMax, self.backoffInitial * 2 ** attempt)
+        if self.jitter:
+            delay = random.uniform(delay / 2., delay)
+        return max(delay, parse_retry_after(retryAfter))
+
+
+def parse_retry_after(
+        retryAfter):
+    """*convert a `Retry-After` header (delta-seconds or an HTTP-date) to seconds*
+
+    **Key Arguments**
+
+    - ``retryAfter`` -- the header value
+
+    **Return**
+
+    - ``seconds`` -- seconds to wait (0 if the header is missing or unreadable)
+    """
+    if not retryAfter:
+        return 0.
+    try:
+        return max(0., float(retryAfter))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(retryAfter)
+        return max(0., (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return 0.
@@ -0,0 +1,140 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*An on-disk k-d tree over the positions of transients, for local conesearches (requires the optional `scipy` package)*
+
+:Author:
+    David Young
+"""
+import os
+import numpy as np
+
+# A LITTLE SLACK SO POINTS ON THE EDGE OF A CONE ARE NEVER LOST TO ROUNDING.
+# CALLERS MEASURE THE EXACT SEPARATIONS OF THE CANDIDATES RETURNED
+_slack = 1e-9
+
+
+class spatial_index(object):
+    """
+    *an on-disk k-d tree over the positions of transients, for local conesearches*
+
+    Positions are indexed as 3-D unit vectors, so cones are handled correctly across RA=0 and at the poles, and a cone of any radius is a single ball query. The vectors are saved to a `.npz` file with the version of the data they were built from; the tree itself is rebuilt from them when the index is loaded.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``path`` -- path to the index file
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.spatialindex import spatial_index
+    index = spatial_index(log=log, path="/path/to/index.npz")
+    index.build(TNSIds=["2016asf"], raDeg=[102.65308], decDeg=[31.11242], version=1)
+    candidates = index.query(raDeg=[102.653], decDeg=[31.112], radiusArcsec=5)
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            path):
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            raise ImportError(
+                "the spatial index requires the `scipy` package - install it with `pip install transientNamer[index]`")
+        self._cKDTree = cKDTree
+        self.log = log
+        self.path = path
+        self.version = None
+        self.TNSIds = np.array([], dtype=str)
+        self._tree = None
+
+        if os.path.exists(path):
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    self._set(data["TNSIds"], data["xyz"],
+                              int(data["version"]))
+            except Exception as e:
+                self.log.warning(
+                    f'could not read the spatial index at {path}, it will be rebuilt: {e}')
+        return None
+
+    def build(
+            self,
+            TNSIds,
+            raDeg,
+            decDeg,
+            version):
+        """
+        *index a set of positions and save the index to disk*
+
+        **Key Arguments**
+
+        - ``TNSIds`` -- list of TNS identifiers
+        - ``raDeg``, ``decDeg`` -- lists of positions in decimal degrees
+        - ``version`` -- the version of the data being indexed, saved with the index
+        """
+        self.log.debug('starting the ``build`` method')
+
+        TNSIds = np.array(TNSIds, dtype=str)
+        xyz = _unit_vectors(raDeg, decDeg)
+
+        # WRITE TO A TEMPORARY FILE FIRST SO READERS NEVER SEE A PARTIAL INDEX
+        temporary = self.path + ".tmp.npz"
+        np.savez(temporary, TNSIds=TNSIds, xyz=xyz, version=version)
+        os.replace(temporary, self.path)
+        self._set(TNSIds, xyz, version)
+
+        self.log.debug('completed the ``build`` method')
+        return None
+
+    def query(
+            self,
+            raDeg,
+            decDeg,
+            radiusArcsec):
+        """
+        *the transients that may lie within each of a batch of cones*
+
+        **Key Arguments**
+
+        - ``raDeg``, ``decDeg`` -- lists of cone centres in decimal degrees
+        - ``radiusArcsec`` -- a single radius for all cones, or a list with one radius per cone
+
+        **Return**
+
+        - ``candidates`` -- one list of TNS identifiers per cone
+        """
+        if not len(raDeg):
+            return []
+        radiusArcsec = np.broadcast_to(
+            np.asarray(radiusArcsec, dtype=float), (len(raDeg),))
+        if self._tree is None or not len(self.TNSIds):
+            return [[] for r in raDeg]
+
+        # THE ANGULAR RADIUS AS A CHORD LENGTH BETWEEN UNIT VECTORS
+        theta = np.radians(np.minimum(radiusArcsec / 3600., 180.))
+        chord = 2. * np.sin(theta / 2.) + _slack
+        neighbours = self._tree.query_ball_point(
+            _unit_vectors(raDeg, decDeg), chord)
+        return [self.TNSIds[sorted(n)].tolist() for n in neighbours]
+
+    def _set(
+            self,
+            TNSIds,
+            xyz,
+            version):
+        self.TNSIds = TNSIds
+        self.version = version
+        self._tree = self._cKDTree(xyz) if len(xyz) else None
+
+
+def _unit_vectors(
+        raDeg,
+        decDeg):
+    """*the 3-D unit vectors of positions given in decimal degrees*"""
+    ra = np.radians(np.asarray(raDeg, dtype=float))
+    dec = np.radians(np.asarray(decDeg, dtype=float))
+    return np.column_stack((np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)))
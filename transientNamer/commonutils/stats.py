@@ -0,0 +1,193 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Per-stage timings and counters recorded while querying and parsing the TNS*
+
+:Author:
+    David Young
+"""
+import time
+import threading
+from contextlib import contextmanager
+
+
+class run_stats(object):
+    """
+    *per-stage wall-clock and CPU timings and counters recorded while querying and parsing the TNS*
+
+    Each stage (e.g. `http`, `extract`, `discovery`) records the number of times it ran and its total wall-clock and CPU time. CPU time is measured for the thread running the stage, so pages downloaded by worker threads are not double-counted. The asynchronous clients record only the wall-clock time of their requests (their CPU time is left at zero): the CPU time of a thread waiting on an `await` would include the work of every other coroutine run meanwhile. Stages may nest (`coordinates` runs inside `discovery`), so stage times should not be summed. Counters (e.g. `pages`, `bytes`, `retries`, `cache hits`) are simple running totals.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``callback`` -- a function called as each timing or count is recorded, as ``callback(name, kind, value)``: ``kind`` is *time* (``value`` is a ``(wall, cpu)`` tuple of seconds) or *count* (``value`` is the increment). Use it to forward the metrics to statsd, Prometheus etc. Default *None*
+
+    **Usage**
+
+    ```python
+    tns = search(
+        log=log,
+        discInLastDays=3,
+        settings=settings,
+        statsCallback=lambda name, kind, value: print(name, kind, value)
+    )
+    tns.run()
+    print(tns.stats.summary())
+    print(tns.stats.stages["http"]["wall"], tns.stats.counters["bytes"])
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            callback=None):
+        self.log = log
+        self.callback = callback
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._callbackFailed = False
+        return None
+
+    @contextmanager
+    def timer(
+            self,
+            stage):
+        """*time the wall-clock and CPU time of the code run inside the block as a stage*
+
+        **Key Arguments**
+
+        - ``stage`` -- the name of the stage
+
+        **Usage**
+
+        ```python
+        with tns.stats.timer("render"):
+            ...
+        ```
+        """
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() -
+                          wall, time.thread_time() - cpu)
+
+    def add_time(
+            self,
+            stage,
+            wall,
+            cpu=0.):
+        """*add a timing to a stage*
+
+        **Key Arguments**
+
+        - ``stage`` -- the name of the stage
+        - ``wall`` -- seconds of wall-clock time
+        - ``cpu`` -- seconds of CPU time. Default *0*
+        """
+        with self._lock:
+            totals = self.stages.setdefault(
+                stage, {"calls": 0, "wall": 0., "cpu": 0.})
+            totals["calls"] += 1
+            totals["wall"] += wall
+            totals["cpu"] += cpu
+        self._report(stage, "time", (wall, cpu))
+        return None
+
+    def count(
+            self,
+            name,
+            increment=1):
+        """*add to a counter*
+
+        **Key Arguments**
+
+        - ``name`` -- the name of the counter
+        - ``increment`` -- the amount to add. Default *1*
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + increment
+        self._report(name, "count", increment)
+        return None
+
+    def merge(
+            self,
+            other):
+        """*add the timings and counters recorded by another `run_stats` (e.g. those of the searches run on behalf of a batch) to these*
+
+        **Key Arguments**
+
+        - ``other`` -- the `run_stats` to add
+        """
+        stats = other.as_dict()
+        with self._lock:
+            for stage, totals in stats["stages"].items():
+                mine = self.stages.setdefault(
+                    stage, {"calls": 0, "wall": 0., "cpu": 0.})
+                for k in mine:
+                    mine[k] += totals[k]
+            for name, total in stats["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + total
+        for stage, totals in stats["stages"].items():
+            self._report(stage, "time", (totals["wall"], totals["cpu"]))
+        for name, total in stats["counters"].items():
+            self._report(name, "count", total)
+        return None
+
+    def as_dict(
+            self):
+        """*a copy of the timings and counters recorded so far*
+
+        **Return**
+
+        - ``stats`` -- a dictionary with ``stages`` (stage name to ``calls``, ``wall`` and ``cpu``) and ``counters`` (counter name to total)
+        """
+        with self._lock:
+            return {
+                "stages": {k: dict(v) for k, v in self.stages.items()},
+                "counters": dict(self.counters)
+            }
+
+    def summary(
+            self):
+        """*the timings and counters recorded so far as a plain-text table*"""
+        stats = self.as_dict()
+        lines = ["%-16s %8s %11s %11s" %
+                 ("stage", "calls", "wall (s)", "cpu (s)")]
+        for stage, totals in stats["stages"].items():
+            lines.append("%-16s %8d %11.3f %11.3f" %
+                         (stage, totals["calls"], totals["wall"], totals["cpu"]))
+        if stats["counters"]:
+            lines.append("")
+            for name, total in stats["counters"].items():
+                lines.append("%-16s %8s" % (name, f"{total:,}"))
+        return "\n".join(lines)
+
+    def reset(
+            self):
+        """*forget the timings and counters recorded so far*"""
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+        return None
+
+    def _report(
+            self,
+            name,
+            kind,
+            value):
+        """*pass a timing or count to the callback (a failing callback never stops the search, and is only warned about once)*"""
+        if self.callback is None:
+            return
+        try:
+            self.callback(name, kind, value)
+        except Exception as e:
+            if self._callbackFailed:
+                self.log.debug(
+                    f'the stats callback failed for `{name}`: {e}')
+                return
+            self._callbackFailed = True
+            self.log.warning(
+                f'the stats callback failed for `{name}`: {e}')
@@ -0,0 +1,147 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Write rows of TNS results to a csv, json, yaml or ndjson file one row at a time, optionally gzip-compressed*
+
+:Author:
+    David Young
+"""
+import io
+import csv
+import gzip
+import json
+import yaml
+from datetime import datetime
+from decimal import Decimal
+
+# THE FORMATS THAT CAN BE WRITTEN A ROW AT A TIME (TABLE AND MARKDOWN
+# RENDERINGS NEED EVERY ROW TO SIZE THEIR COLUMNS)
+streamableFormats = ("csv", "json", "yaml", "ndjson")
+
+
+class stream_writer(object):
+    """
+    *write rows of TNS results to a csv, json, yaml or ndjson file one row at a time, optionally gzip-compressed*
+
+    Each row is rendered and written as soon as it is given, so memory use does not grow with the number of rows. The files match those written by the `search` renderers (`csv`, `json`, `yaml` and `ndjson`). Call `flush` to make the rows written so far visible to readers tailing the file. The file is only created when the first row is written, so no file is left for an empty set of results.
+
+    **Key Arguments**
+
+    - ``filepath`` -- path to the file to write (`.gz` is appended if ``compress`` is *True*)
+    - ``render`` -- the output format, one of csv, json, yaml or ndjson. Default *csv*
+    - ``compress`` -- gzip-compress the file. Default *False*
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils.streamwriter import stream_writer
+    with stream_writer("/path/to/sources.csv", render="csv", compress=True) as writer:
+        for source, photometry, spectra, files in tns.iter_sources():
+            writer.write(source)
+    print(writer.rowCount, writer.filepath)
+    ```
+    """
+
+    def __init__(
+            self,
+            filepath,
+            render="csv",
+            compress=False):
+        if render not in streamableFormats:
+            raise ValueError(
+                f"results can only be streamed to {', '.join(streamableFormats)} files, not `{render}`")
+        self.filepath = filepath + ".gz" if compress else filepath
+        self.render = render
+        self.compress = compress
+        self.rowCount = 0
+        self._file = None
+        self._csvWriter = None
+        self._csvColumns = None
+        return None
+
+    def write(
+            self,
+            row):
+        """*render a row of results and write it to the file*
+
+        **Key Arguments**
+
+        - ``row`` -- dictionary of one row of results
+        """
+        if self._file is None:
+            self._open()
+        if self.render == "csv":
+            if self._csvWriter is None:
+                # THE COLUMNS ARE THOSE OF THE FIRST ROW (AS THE CSV RENDERER)
+                self._csvColumns = list(row.keys())
+                self._csvWriter = csv.writer(
+                    self._file, dialect="excel", quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+                self._csvWriter.writerow(self._csvColumns)
+            self._csvWriter.writerow([_csv_value(row.get(c))
+                                      for c in self._csvColumns])
+        elif self.render == "ndjson":
+            self._file.write(ndjson_line(row) + "\n")
+        elif self.render == "json":
+            text = json.dumps(_json_row(row), separators=(
+                ",", ": "), sort_keys=True, indent=4)
+            self._file.write(("[\n" if not self.rowCount else ",\n") +
+                             "    " + text.replace("\n", "\n    "))
+        else:
+            self._file.write(yaml.dump(
+                [dict(row)], default_flow_style=False))
+        self.rowCount += 1
+        return None
+
+    def flush(
+            self):
+        """*flush the rows written so far to disk (a sync point in a compressed file)*"""
+        if self._file is not None:
+            self._file.flush()
+        return None
+
+    def close(
+            self):
+        """*finish and close the file*"""
+        if self._file is not None:
+            if self.render == "json":
+                self._file.write("\n]")
+            self._file.close()
+            self._file = None
+        return None
+
+    def _open(
+            self):
+        if self.compress:
+            self._file = gzip.open(
+                self.filepath, "wt", encoding="utf-8", newline="")
+        else:
+            self._file = open(self.filepath, "w",
+                              encoding="utf-8", newline="")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ndjson_line(
+        row):
+    """*a row of results as one compact line of JSON (keys in the order of the row)*"""
+    return json.dumps(_json_row(row), separators=(",", ":"), ensure_ascii=False)
+
+
+def _csv_value(
+        value):
+    """*a value as the csv renderer writes it*"""
+    if isinstance(value, (float, Decimal)):
+        return "%0.9g" % value
+    if isinstance(value, datetime):
+        return str(value)[:10]
+    return value
+
+
+def _json_row(
+        row):
+    """*a row with any datetimes formatted as the json renderer writes them*"""
+    return {k: v.strftime("%Y%m%dt%H%M%S") if isinstance(v, datetime) else v for k, v in row.items()}
@@ -0,0 +1,139 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*A shared, pooled keep-alive HTTP session used for all traffic to the TNS*
+
+:Author:
+    David Young
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from .ratelimiter import ratelimiter
+
+# ONE SESSION PER DISTINCT CONFIGURATION - SHARED ACROSS THE WHOLE PROCESS
+_sessions = {}
+_sessionsLock = threading.Lock()
+
+# DEFAULTS USED WHEN THE `tns http` SETTINGS BLOCK IS ABSENT
+defaultHttpSettings = {
+    "base url": "https://www.wis-tns.org",
+    "pool connections": 4,
+    "pool maxsize": 10,
+    "keep-alive": True,
+    "connect timeout": 10,
+    "read timeout": 60
+}
+
+
+class _tns_session(requests.Session):
+    """
+    *a requests session that applies default timeouts and the TNS rate limit to every request and knows the TNS base URL*
+    """
+
+    def __init__(
+            self,
+            baseUrl,
+            timeout,
+            rateLimiter=None):
+        requests.Session.__init__(self)
+        self.baseUrl = baseUrl.rstrip("/")
+        self.timeout = timeout
+        self.rateLimiter = rateLimiter
+
+    def request(
+            self,
+            method,
+            url,
+            **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        if self.rateLimiter:
+            # THE ENDPOINT IS THE FIRST PATH SEGMENT, E.G. `search`
+            endpoint = urlparse(url).path.strip("/").split("/")[0]
+            self.rateLimiter.acquire(endpoint)
+        return requests.Session.request(self, method, url, **kwargs)
+
+
+def http_settings(
+        settings=False):
+    """*merge the `tns http` block of the settings file over the package defaults*
+
+    **Key Arguments**
+
+    - ``settings`` -- the settings dictionary
+
+    **Return**
+
+    - ``httpSettings`` -- dictionary of HTTP settings
+    """
+    httpSettings = dict(defaultHttpSettings)
+    if settings and settings.get("tns http"):
+        httpSettings.update(settings["tns http"])
+    return httpSettings
+
+
+def tnssession(
+        settings=False):
+    """*return the shared, pooled keep-alive HTTP session used for all TNS requests*
+
+    Sessions are cached per configuration, so every `search` and `astronotes` object in the process reuses the same connection pool (and so the same TCP+TLS connections to the TNS). Every request made through the session first waits on the process-wide rate limiter.
+
+    **Key Arguments**
+
+    - ``settings`` -- the settings dictionary. Connection pooling, keep-alive and timeouts are read from the optional `tns http` block, request budgets from the optional `tns rate limit` block.
+
+    **Return**
+
+    - ``session`` -- a `requests.Session` with `baseUrl` and default `timeout` attributes
+
+    **Usage**
+
+    ```python
+    from transientNamer.commonutils import tnssession
+    session = tnssession(settings)
+    response = session.get(session.baseUrl + "/search", params={"name": "2016asf"})
+    ```
+    """
+    httpSettings = http_settings(settings)
+    userAgent = None
+    if settings:
+        userAgent = settings.get("user-agent")
+
+    timeout = (float(httpSettings["connect timeout"]),
+               float(httpSettings["read timeout"]))
+    limiter = ratelimiter(settings)
+    key = (httpSettings["base url"], int(httpSettings["pool connections"]), int(
+        httpSettings["pool maxsize"]), bool(httpSettings["keep-alive"]), timeout, userAgent, id(limiter))
+
+    with _sessionsLock:
+        if key in _sessions:
+            return _sessions[key]
+
+        session = _tns_session(
+            baseUrl=httpSettings["base url"], timeout=timeout, rateLimiter=limiter)
+        adapter = HTTPAdapter(
+            pool_connections=int(httpSettings["pool connections"]),
+            pool_maxsize=int(httpSettings["pool maxsize"]),
+            max_retries=0
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive" if httpSettings["keep-alive"] else "close"
+        })
+        if userAgent:
+            session.headers["User-Agent"] = userAgent
+        _sessions[key] = session
+
+    return session
+
+
+def close_sessions():
+    """*close all shared TNS sessions and release their pooled connections*
+    """
+    with _sessionsLock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
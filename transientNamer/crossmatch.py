@@ -0,0 +1,233 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Cross-match a catalogue of positions against the TNS, streaming it in batches*
+
+:Author:
+    David Young
+"""
+from __future__ import print_function
+import csv
+import gzip
+import time
+from builtins import object
+from transientNamer.batch_conesearch import batch_conesearch, _position_columns
+from transientNamer.commonutils.stats import run_stats
+
+
+class crossmatch(object):
+    """
+    *Cross-match a catalogue of positions against the TNS, streaming it in batches*
+
+    The catalogue (a CSV file, optionally gzipped, with `ra` and `dec` columns and an optional `radiusArcsec` column) is read ``batchSize`` rows at a time. Each batch is matched with a `batch_conesearch`, against the TNS or a local mirror, so memory use does not grow with the size of the catalogue.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``pathToCatalogue`` -- path to the CSV catalogue
+    - ``radiusArcsec`` -- the search radius for rows without a `radiusArcsec` column. Default *5*
+    - ``settings`` -- the settings dictionary
+    - ``mirror`` -- match against a local TNS mirror instead of the TNS. Either *True* (use the mirror database in the `tns mirror` settings) or a `mirror` object. Default *False*
+    - ``batchSize`` -- the number of catalogue rows to match at once. Default *10000*
+    - ``concurrentCones`` -- the number of TNS conesearches to run at once (not used with a mirror). Default *4*
+    - ``progressCallback`` -- a function called after each batch is matched, as ``progressCallback(rowCount, matchCount, rowsPerSecond)``, e.g. to print progress. Default *None*
+    - ``statsCallback`` -- a function passed each stage timing and counter as it is recorded (see `xm.stats`). Default *None*
+
+    The time spent matching each batch (`match`, which includes the `http` waits etc. of the TNS conesearches sent) and writing the matches (`render`), and counters of the `catalogue rows` read and `matches` found, are recorded in `xm.stats` (see `search`).
+
+    Catalogue rows whose TNS conesearches could not be completed, even after retrying, may be missing matches. Their indexes (counting from 0) are listed in `xm.incompleteRows` and logged as errors, so they can be cross-matched again.
+
+    **Usage**
+
+    ```python
+    from transientNamer import crossmatch
+    xm = crossmatch(
+        log=log,
+        pathToCatalogue="/path/to/catalogue.csv",
+        radiusArcsec=3,
+        settings=settings,
+        mirror=True
+    )
+    rowCount, matchCount = xm.to_csv("/path/to/matches.csv")
+    ```
+
+    or to handle the matches as they are found:
+
+    ```python
+    for row, match in xm.iter_matches():
+        print(row["ra"], row["dec"], match["TNSId"], match["separationArcsec"])
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            pathToCatalogue,
+            radiusArcsec=5,
+            settings=False,
+            mirror=False,
+            batchSize=10000,
+            concurrentCones=4,
+            progressCallback=None,
+            statsCallback=None
+    ):
+        self.log = log
+        log.debug("instansiating a new 'crossmatch' object")
+        self.pathToCatalogue = pathToCatalogue
+        self.radiusArcsec = radiusArcsec
+        self.settings = settings
+        self.batchSize = int(batchSize)
+        self.concurrentCones = concurrentCones
+        self.progressCallback = progressCallback
+        self.stats = run_stats(log=log, callback=statsCallback)
+
+        # OPEN THE MIRROR ONCE FOR ALL BATCHES
+        if mirror is True:
+            from transientNamer.mirror import mirror as tns_mirror
+            mirror = tns_mirror(log=log, settings=settings)
+        self.mirror = mirror
+
+        # PROGRESS OF THE CROSS-MATCH
+        self.rowCount = 0
+        self.matchCount = 0
+        self.rowsPerSecond = 0.
+        self.incompleteRows = []
+
+        return None
+
+    def iter_matches(
+            self):
+        """
+        *stream the matches of the catalogue rows, one batch of rows at a time*
+
+        **Return**
+
+        - ``row``, ``match`` -- a generator with one tuple per (catalogue row, matched transient) pair: the catalogue row as a dictionary and the matched transient's source data plus the `inputIndex` (the row's position in the catalogue, counting from 0) and the separations from the row. Matches are in catalogue order and then by separation.
+        """
+        self.log.debug('starting the ``iter_matches`` method')
+
+        for matches in self._iter_batch_matches():
+            for row, match in matches:
+                yield row, match
+
+        self.log.debug('completed the ``iter_matches`` method')
+        return None
+
+    def _iter_batch_matches(
+            self):
+        """*the (catalogue row, matched transient) pairs of the catalogue, one list per batch of rows (see `iter_matches`)*"""
+        self.rowCount = 0
+        self.matchCount = 0
+        self.incompleteRows = []
+        started = time.time()
+        with _open_catalogue(self.pathToCatalogue) as f:
+            reader = csv.DictReader(f)
+            raCol, decCol, radiusCol = _position_columns(
+                reader.fieldnames, self.pathToCatalogue)
+            batch = []
+            for row in reader:
+                batch.append(row)
+                if len(batch) == self.batchSize:
+                    yield self._match_batch(batch, raCol, decCol, radiusCol, started)
+                    batch = []
+            if batch:
+                yield self._match_batch(batch, raCol, decCol, radiusCol, started)
+        return None
+
+    def to_csv(
+            self,
+            pathToOutput):
+        """
+        *cross-match the catalogue and write the matches to a CSV file, one batch of catalogue rows at a time*
+
+        Each output row holds the catalogue row's columns followed by the matched transient's source data and separations. Catalogue columns that share a name with a TNS column are renamed with an `input_` prefix.
+
+        **Key Arguments**
+
+        - ``pathToOutput`` -- path to the CSV file to write
+
+        **Return**
+
+        - ``rowCount``, ``matchCount`` -- the number of catalogue rows read and the number of matches written
+        """
+        self.log.debug('starting the ``to_csv`` method')
+
+        writer = None
+        with open(pathToOutput, "w", newline="") as f:
+            for matches in self._iter_batch_matches():
+                with self.stats.timer("render"):
+                    for row, match in matches:
+                        if writer is None:
+                            inputColumns = {c: ("input_" + c if c in match else c)
+                                            for c in row}
+                            writer = csv.DictWriter(f, fieldnames=list(inputColumns.values(
+                            )) + list(match.keys()), restval="", extrasaction="ignore")
+                            writer.writeheader()
+                        outputRow = {inputColumns.get(
+                            c, c): v for c, v in row.items()}
+                        outputRow.update(match)
+                        writer.writerow(outputRow)
+                    # THE MATCHES OF EACH BATCH REACH THE FILE TOGETHER
+                    f.flush()
+
+        if self.incompleteRows:
+            self.log.error(
+                f'{pathToOutput} may be missing the matches of {len(self.incompleteRows)} catalogue rows whose TNS conesearches could not be completed: rows {self.incompleteRows}')
+
+        self.log.debug('completed the ``to_csv`` method')
+        return self.rowCount, self.matchCount
+
+    def _match_batch(
+            self,
+            batch,
+            raCol,
+            decCol,
+            radiusCol,
+            started):
+        """*match one batch of catalogue rows and report the throughput so far*
+
+        **Return**
+
+        - ``matches`` -- list of (catalogue row, matched transient) tuples
+        """
+        radii = [float(r[radiusCol]) if radiusCol and r[radiusCol] else float(
+            self.radiusArcsec) for r in batch]
+        bc = batch_conesearch(
+            log=self.log,
+            ra=[r[raCol] for r in batch],
+            dec=[r[decCol] for r in batch],
+            radiusArcsec=radii,
+            settings=self.settings,
+            concurrentCones=self.concurrentCones,
+            mirror=self.mirror
+        )
+        offset = self.rowCount
+        with self.stats.timer("match"):
+            matches = bc.get()
+        self.stats.merge(bc.stats)
+        self.stats.count("catalogue rows", len(batch))
+        self.stats.count("matches", len(matches))
+        self.incompleteRows += [i + offset for i in bc.incompleteInputIndexes]
+        self.rowCount += len(batch)
+        self.matchCount += len(matches)
+        self.rowsPerSecond = self.rowCount / max(time.time() - started, 1e-9)
+        self.log.info(
+            f"{self.rowCount} catalogue rows cross-matched, {self.matchCount} matches ({self.rowsPerSecond:0.0f} rows/s)")
+        if self.progressCallback:
+            self.progressCallback(
+                self.rowCount, self.matchCount, self.rowsPerSecond)
+
+        pairs = []
+        for match in matches:
+            row = batch[match["inputIndex"]]
+            match["inputIndex"] += offset
+            pairs.append((row, match))
+        return pairs
+
+
+def _open_catalogue(
+        pathToCatalogue):
+    """*open a CSV catalogue for reading, decompressing it if gzipped*"""
+    if pathToCatalogue.endswith(".gz"):
+        return gzip.open(pathToCatalogue, "rt", newline="")
+    return open(pathToCatalogue, newline="")
@@ -0,0 +1,513 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*A local mirror of the Transient Name Server, kept current with incremental syncs*
+
+:Author:
+    David Young
+"""
+from __future__ import print_function
+import os
+import json
+import math
+import sqlite3
+import threading
+from datetime import datetime
+from builtins import object
+
+# THE EARLIEST DISCOVERY DATE PULLED BY A FULL BOOTSTRAP
+_bootstrapEpoch = datetime(1900, 1, 1)
+
+# ONE CONNECTION PER THREAD AND DATABASE FILE
+_connections = threading.local()
+
+_schema = """
+CREATE TABLE IF NOT EXISTS sources (TNSId TEXT PRIMARY KEY, raDeg REAL, decDeg REAL, data TEXT);
+CREATE INDEX IF NOT EXISTS sources_decDeg ON sources (decDeg);
+CREATE TABLE IF NOT EXISTS names (name TEXT, TNSId TEXT, PRIMARY KEY (name, TNSId));
+CREATE INDEX IF NOT EXISTS names_TNSId ON names (TNSId);
+CREATE TABLE IF NOT EXISTS photometry (TNSId TEXT, data TEXT);
+CREATE INDEX IF NOT EXISTS photometry_TNSId ON photometry (TNSId);
+CREATE TABLE IF NOT EXISTS spectra (TNSId TEXT, data TEXT);
+CREATE INDEX IF NOT EXISTS spectra_TNSId ON spectra (TNSId);
+CREATE TABLE IF NOT EXISTS files (TNSId TEXT, data TEXT);
+CREATE INDEX IF NOT EXISTS files_TNSId ON files (TNSId);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+class mirror(object):
+    """
+    *A local mirror of the Transient Name Server, kept current with incremental syncs*
+
+    The mirror is an SQLite database holding the discovery data, photometry, spectra and related files of every transient pulled from the TNS. It is bootstrapped with one bulk pull and then kept current by `sync`, which re-pulls the transients discovered since the previous sync (plus a day of overlap) and replaces everything held for each transient it sees.
+
+    Once a mirror exists, `search` and `batch_conesearch` can answer name and cone searches from it (pass `mirror=True`) without contacting the TNS. Conesearches use an on-disk k-d tree over the positions of all transients in the mirror (when the optional `scipy` package is installed), rebuilt automatically the first time it is needed after the mirror changes. Note that the TNS can only be searched by discovery date, so updates to long-known transients (e.g. a new classification) only reach the mirror when they are re-pulled, e.g. by a periodic re-bootstrap.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``settings`` -- the settings dictionary. The database path is read from the `path` of the `tns mirror` block
+    - ``path`` -- path to the mirror database, overriding the settings. Default *False*
+
+    **Usage**
+
+    ```python
+    from transientNamer import mirror
+    tnsMirror = mirror(
+        log=log,
+        settings=settings
+    )
+    # ONCE
+    count, resumeToken = tnsMirror.bootstrap(concurrentPages=4)
+    # THEN PERIODICALLY
+    count, resumeToken = tnsMirror.sync()
+    ```
+
+    and to answer searches from the mirror:
+
+    ```python
+    from transientNamer import search
+    tns = search(
+        log=log,
+        ra="06:50:36.74",
+        dec="+31:06:44.7",
+        radiusArcsec=5,
+        settings=settings,
+        mirror=True
+    )
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            settings=False,
+            path=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'mirror' object")
+        self.settings = settings
+
+        if not path:
+            mirrorSettings = (settings or {}).get("tns mirror") or {}
+            path = mirrorSettings.get("path")
+        if not path:
+            raise ValueError(
+                "no mirror database given - add a `path` to the `tns mirror` settings")
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.indexPath = os.path.splitext(self.path)[0] + "-index.npz"
+        self._index = None
+
+        parent = os.path.dirname(self.path)
+        if not os.path.exists(parent):
+            os.makedirs(parent)
+        self._connection().executescript(_schema)
+
+        return None
+
+    @property
+    def lastSync(
+            self):
+        """*the time (UTC) the pull behind the most recent bootstrap or sync started (or the time a bulk object dump was taken), or None if the mirror is empty*"""
+        row = self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'last sync'").fetchone()
+        if not row:
+            return None
+        return datetime.strptime(row[0], "%Y-%m-%dT%H:%M:%S")
+
+    @lastSync.setter
+    def lastSync(
+            self,
+            lastSync):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last sync', ?)",
+                         (lastSync.strftime("%Y-%m-%dT%H:%M:%S"),))
+
+    def bootstrap(
+            self,
+            inLastDays=False,
+            concurrentPages=4,
+            resumeToken=False):
+        """
+        *fill the mirror with a bulk pull of the TNS*
+
+        **Key Arguments**
+
+        - ``inLastDays`` -- only pull transients discovered in the last N days. Default *False* (pull everything)
+        - ``concurrentPages`` -- the number of result pages to download at once. Default *4*
+        - ``resumeToken`` -- the `resumeToken` returned by an interrupted bootstrap, to continue from where it stopped. Once the resumed pull completes, `lastSync` is set to the time the interrupted bootstrap started. Default *False*
+
+        **Return**
+
+        - ``count`` -- the number of transients added or updated
+        - ``resumeToken`` -- *None* if the pull completed, else the token to pass back to continue it
+        """
+        self.log.debug('starting the ``bootstrap`` method')
+
+        if not inLastDays:
+            inLastDays = (datetime.utcnow() - _bootstrapEpoch).days + 1
+        count, resumeToken = self._pull(
+            inLastDays, concurrentPages, resumeToken)
+
+        self.log.debug('completed the ``bootstrap`` method')
+        return count, resumeToken
+
+    def sync(
+            self,
+            concurrentPages=4):
+        """
+        *bring the mirror up to date with the transients discovered since the last sync*
+
+        An empty mirror is bootstrapped instead.
+
+        **Key Arguments**
+
+        - ``concurrentPages`` -- the number of result pages to download at once. Default *4*
+
+        **Return**
+
+        - ``count`` -- the number of transients added or updated
+        - ``resumeToken`` -- *None* if the sync completed. Otherwise the TNS could not be reached for every page and the next sync covers the same period again
+        """
+        self.log.debug('starting the ``sync`` method')
+
+        lastSync = self.lastSync
+        if lastSync is None:
+            return self.bootstrap(concurrentPages=concurrentPages)
+
+        # A DAY OF OVERLAP COVERS REPORTS LANDING WHILE THE LAST SYNC RAN
+        inLastDays = (datetime.utcnow() - lastSync).days + 2
+        count, resumeToken = self._pull(inLastDays, concurrentPages)
+
+        self.log.debug('completed the ``sync`` method')
+        return count, resumeToken
+
+    def _pull(
+            self,
+            inLastDays,
+            concurrentPages,
+            resumeToken=False):
+        """*stream a `discInLastDays` search into the mirror, one page at a time*"""
+        from transientNamer.search import search
+        started = datetime.utcnow()
+        if resumeToken:
+            # A RESUMED PULL ONLY COVERS THE PAGES THE INTERRUPTED PULL DID NOT
+            # REACH, SO THE MIRROR IS ONLY AS CURRENT AS THAT PULL'S START
+            started = self._interrupted_pull_start(resumeToken)
+        tns = search(
+            log=self.log,
+            discInLastDays=inLastDays,
+            settings=self.settings,
+            comments=True,
+            concurrentPages=concurrentPages,
+            resumeToken=resumeToken
+        )
+        count = 0
+        batch = []
+        for transient in tns.iter_sources():
+            batch.append(transient)
+            if len(batch) == tns.batchSize:
+                count += self.upsert(batch)
+                batch = []
+        count += self.upsert(batch)
+
+        if tns.resumeToken is None:
+            if started is not None:
+                self.lastSync = started
+            else:
+                self.log.warning(
+                    f'resumed a TNS pull that this mirror has no record of (resumeToken={resumeToken}); the time of the last sync is left unchanged')
+            self._record_interrupted_pull(None)
+        else:
+            self.log.warning(
+                f'the TNS pull stopped early (resumeToken={tns.resumeToken}); the mirror is only partially updated')
+            if started is not None:
+                self._record_interrupted_pull(tns.resumeToken, started)
+        return count, tns.resumeToken
+
+    def _interrupted_pull_start(
+            self,
+            resumeToken):
+        """*the time (UTC) the interrupted pull that ``resumeToken`` continues was started, or None if the mirror has no record of it*"""
+        row = self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'interrupted pull'").fetchone()
+        if not row:
+            return None
+        interrupted = json.loads(row[0])
+        if str(interrupted["resumeToken"]) != str(resumeToken):
+            return None
+        return datetime.strptime(interrupted["started"], "%Y-%m-%dT%H:%M:%S")
+
+    def _record_interrupted_pull(
+            self,
+            resumeToken,
+            started=None):
+        """*record the resume token and start time (UTC) of an interrupted pull, or forget it once a pull completes (``resumeToken`` is None)*"""
+        with self._connection() as conn:
+            if resumeToken is None:
+                conn.execute("DELETE FROM meta WHERE key = 'interrupted pull'")
+                return
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('interrupted pull', ?)",
+                         (json.dumps({"resumeToken": resumeToken, "started": started.strftime("%Y-%m-%dT%H:%M:%S")}),))
+
+    def upsert(
+            self,
+            transients,
+            reports=True):
+        """
+        *add or replace transients in the mirror*
+
+        Everything already held for a transient (discovery data, names, photometry, spectra and files) is replaced.
+
+        **Key Arguments**
+
+        - ``transients`` -- list of (``source``, ``photometry``, ``spectra``, ``files``) tuples, as generated by `search.iter_sources` (with `comments=True`)
+        - ``reports`` -- replace the photometry, spectra and files held for the transients. Set to *False* to update the discovery data only (e.g. from a bulk object dump), keeping any reports already held. Default *True*
+
+        **Return**
+
+        - ``count`` -- the number of transients added or updated
+        """
+        from transientNamer.name_resolver import _source_names
+        if not transients:
+            return 0
+
+        with self._connection() as conn:
+            # EVERY CHANGE BUMPS THE VERSION, SO THE SPATIAL INDEX KNOWS TO
+            # REBUILD
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(self._version() + 1),))
+            for source, photometry, spectra, files in transients:
+                source = {k: v for k, v in source.items(
+                ) if k not in _separationKeys}
+                TNSId = source["TNSId"]
+                conn.execute("INSERT OR REPLACE INTO sources (TNSId, raDeg, decDeg, data) VALUES (?, ?, ?, ?)",
+                             (TNSId, float(source["raDeg"]), float(source["decDeg"]), _dumps(source)))
+                tables = [("names", None)]
+                if reports:
+                    tables += [("photometry", photometry),
+                               ("spectra", spectra), ("files", files)]
+                for table, rows in tables:
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE TNSId = ?", (TNSId,))
+                    if rows:
+                        conn.executemany(f"INSERT INTO {table} (TNSId, data) VALUES (?, ?)", [
+                                         (TNSId, _dumps(r)) for r in rows])
+                conn.executemany("INSERT OR IGNORE INTO names (name, TNSId) VALUES (?, ?)", [
+                                 (n, TNSId) for n in _source_names(source)])
+        return len(transients)
+
+    def lookup_name(
+            self,
+            name):
+        """
+        *the transients with a TNS or survey name*
+
+        **Key Arguments**
+
+        - ``name`` -- a TNS name (with or without an `SN`/`AT` prefix) or a survey name
+
+        **Return**
+
+        - ``sources`` -- list of dictionaries of discovery data
+        """
+        from transientNamer.name_resolver import normalise_name
+        rows = self._connection().execute(
+            "SELECT s.data FROM names n JOIN sources s ON s.TNSId = n.TNSId WHERE n.name = ? ORDER BY s.TNSId", (normalise_name(name),)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def conesearch(
+            self,
+            raDeg,
+            decDeg,
+            radiusArcsec):
+        """
+        *the transients that may lie within a cone*
+
+        **Key Arguments**
+
+        - ``raDeg``, ``decDeg`` -- the centre of the cone in decimal degrees
+        - ``radiusArcsec`` -- the radius of the cone
+
+        **Return**
+
+        - ``sources`` -- list of dictionaries of discovery data. The caller measures the exact separations; a few candidates just beyond the radius may be included
+        """
+        return self.conesearches([raDeg], [decDeg], radiusArcsec)[0]
+
+    def conesearches(
+            self,
+            raDeg,
+            decDeg,
+            radiusArcsec):
+        """
+        *the transients that may lie within each of a batch of cones*
+
+        **Key Arguments**
+
+        - ``raDeg``, ``decDeg`` -- lists of cone centres in decimal degrees
+        - ``radiusArcsec`` -- a single radius for all cones, or a list with one radius per cone
+
+        **Return**
+
+        - ``sources`` -- one list of dictionaries of discovery data per cone (see `conesearch`)
+        """
+        self.log.debug('starting the ``conesearches`` method')
+
+        index = self._spatial_index()
+        if index is None:
+            if not hasattr(radiusArcsec, "__len__"):
+                radiusArcsec = [radiusArcsec] * len(raDeg)
+            results = [self._box_conesearch(r, d, rad) for r, d, rad in zip(
+                raDeg, decDeg, radiusArcsec)]
+            self.log.debug('completed the ``conesearches`` method')
+            return results
+
+        candidates = index.query(raDeg, decDeg, radiusArcsec)
+        sources = self.sources(set(t for c in candidates for t in c))
+
+        self.log.debug('completed the ``conesearches`` method')
+        return [[sources[t] for t in c] for c in candidates]
+
+    def reports(
+            self,
+            TNSIds,
+            comments=True):
+        """
+        *the photometry, spectra and related files of transients*
+
+        **Key Arguments**
+
+        - ``TNSIds`` -- list of TNS identifiers
+        - ``comments`` -- include the comments of the reports. Default *True*
+
+        **Return**
+
+        - ``photometry``, ``spectra``, ``files`` -- lists of dictionaries, in the order of ``TNSIds``
+        """
+        results = []
+        conn = self._connection()
+        for table in ("photometry", "spectra", "files"):
+            rows = []
+            for TNSId in TNSIds:
+                rows += [json.loads(r[0]) for r in conn.execute(
+                    f"SELECT data FROM {table} WHERE TNSId = ? ORDER BY rowid", (TNSId,))]
+            results.append(rows)
+        photometry, spectra, files = results
+
+        # DROP THE COMMENTS AS THE TNS PARSER DOES FOR `comments=False`
+        if not comments:
+            for row in photometry + spectra:
+                row.pop("sourceComment", None)
+                row.pop("remarks", None)
+            for row in files:
+                row.pop("comment", None)
+        return photometry, spectra, files
+
+    def sources(
+            self,
+            TNSIds):
+        """
+        *the discovery data of transients held in the mirror*
+
+        **Key Arguments**
+
+        - ``TNSIds`` -- list of TNS identifiers
+
+        **Return**
+
+        - ``sources`` -- dictionary of discovery data keyed by TNS identifier (transients not in the mirror are left out)
+        """
+        TNSIds = list(TNSIds)
+        sources = {}
+        conn = self._connection()
+        # SQLITE LIMITS THE NUMBER OF PARAMETERS IN ONE STATEMENT
+        for i in range(0, len(TNSIds), 500):
+            chunk = TNSIds[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for TNSId, data in conn.execute(f"SELECT TNSId, data FROM sources WHERE TNSId IN ({marks})", chunk):
+                sources[TNSId] = json.loads(data)
+        return sources
+
+    def _spatial_index(
+            self):
+        """*the k-d tree over the positions in the mirror, rebuilt if the mirror has changed since it was built (None without `scipy`)*"""
+        if self._index is None:
+            from transientNamer.commonutils.spatialindex import spatial_index
+            try:
+                self._index = spatial_index(
+                    log=self.log, path=self.indexPath)
+            except ImportError as e:
+                self.log.info(f'{e}; falling back to SQL conesearches')
+                self._index = False
+        if self._index is False:
+            return None
+
+        version = self._version()
+        if self._index.version != version:
+            rows = self._connection().execute(
+                "SELECT TNSId, raDeg, decDeg FROM sources ORDER BY TNSId").fetchall()
+            self._index.build(
+                TNSIds=[r[0] for r in rows],
+                raDeg=[r[1] for r in rows],
+                decDeg=[r[2] for r in rows],
+                version=version
+            )
+        return self._index
+
+    def _box_conesearch(
+            self,
+            raDeg,
+            decDeg,
+            radiusArcsec):
+        """*the transients within a box around a cone, selected with the declination index of the sources table*"""
+        radius = float(radiusArcsec) / 3600.
+        decMin = decDeg - radius
+        decMax = decDeg + radius
+        query = "SELECT data FROM sources WHERE decDeg BETWEEN ? AND ?"
+        params = [decMin, decMax]
+
+        # THE RA RANGE WIDENS TOWARDS THE POLES (AND COVERS EVERYTHING AT THEM)
+        if max(abs(decMin), abs(decMax)) < 90.:
+            raRadius = radius / \
+                math.cos(math.radians(max(abs(decMin), abs(decMax))))
+            if raRadius < 180.:
+                raMin = (raDeg - raRadius) % 360.
+                raMax = (raDeg + raRadius) % 360.
+                if raMin <= raMax:
+                    query += " AND raDeg BETWEEN ? AND ?"
+                else:
+                    query += " AND (raDeg >= ? OR raDeg <= ?)"
+                params += [raMin, raMax]
+
+        rows = self._connection().execute(
+            query + " ORDER BY TNSId", params).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def _version(
+            self):
+        """*the number of changes made to the mirror*"""
+        row = self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _connection(
+            self):
+        """*this thread's connection to the mirror database*"""
+        connections = getattr(_connections, "byPath", None)
+        if connections is None:
+            connections = _connections.byPath = {}
+        if self.path not in connections:
+            connections[self.path] = sqlite3.connect(self.path)
+        return connections[self.path]
+
+
+# SEPARATIONS DEPEND ON THE SEARCH, SO ARE NEVER STORED
+_separationKeys = ("separationArcsec",
+                   "separationNorthArcsec", "separationEastArcsec")
+
+
+def _dumps(
+        row):
+    return json.dumps(row, default=str)
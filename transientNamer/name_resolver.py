@@ -0,0 +1,211 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Resolve many TNS and survey names to TNS identifiers*
+
+:Author:
+    David Young
+"""
+from __future__ import print_function
+import re
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from builtins import object
+from transientNamer.search import search
+
+
+class name_resolver(object):
+    """
+    *Resolve many TNS and survey names to TNS identifiers*
+
+    Names are normalised before lookup, so that equivalent forms (e.g. `2016asf`, `SN 2016asf` and `AT2016asf`, or `ATLAS20xyz` and `atlas20xyz`) share a single TNS lookup. Lookups already held in the on-disk cache (see the `tns cache` settings) are answered first without contacting the TNS; the remaining lookups are sent concurrently through the shared TNS rate limit. A transient returned by one lookup also resolves any other requested name it carries (its TNS name or any of its survey names), saving the lookups for those names.
+
+    The TNS search accepts a single name per query, so a lookup is still needed for every distinct name that is not cached or resolved along the way.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``names`` -- list of TNS names and/or survey (internal) names
+    - ``settings`` -- the settings dictionary
+    - ``concurrentNames`` -- the number of names to look up at once. Default *4*
+
+    **Usage**
+
+    ```python
+    from transientNamer import name_resolver
+    resolver = name_resolver(
+        log=log,
+        names=["2016asf", "SN 2016asf", "Gaia16bbi", "ATLAS20xyz"],
+        settings=settings
+    )
+    for name, TNSId in resolver.get():
+        print(name, TNSId)
+    ```
+
+    Names are streamed back as soon as they are resolved (not in input order). Names that could not be found on the TNS are returned with a `TNSId` of *None*.
+    """
+
+    def __init__(
+            self,
+            log,
+            names,
+            settings=False,
+            concurrentNames=4
+    ):
+        self.log = log
+        log.debug("instansiating a new 'name_resolver' object")
+        self.settings = settings
+        self.concurrentNames = concurrentNames
+
+        # GROUP THE INPUT NAMES BY THEIR NORMALISED LOOKUP
+        self.lookups = collections.OrderedDict()
+        for name in names:
+            if name is None or not str(name).strip():
+                continue
+            key = normalise_name(name)
+            self.lookups.setdefault(key, [])
+            if name not in self.lookups[key]:
+                self.lookups[key].append(name)
+
+        return None
+
+    def get(self):
+        """
+        *resolve the names*
+
+        **Return**
+
+        - a generator of (``name``, ``TNSId``) tuples, one for each distinct input name
+        """
+        self.log.debug('starting the ``get`` method')
+
+        resolved = {}
+        pending = collections.OrderedDict((k, None) for k in self.lookups)
+
+        def settle(key, TNSId):
+            resolved[key] = TNSId
+            pending.pop(key, None)
+            return [(name, TNSId) for name in self.lookups[key]]
+
+        def harvest(key, tns):
+            # THE LOOKED-UP NAME AND ANY OTHER REQUESTED NAMES THE RESULTS
+            # CARRY
+            found = []
+            matchedId = None
+            for source in tns.sources:
+                for alias in _source_names(source):
+                    if alias == key:
+                        matchedId = source["TNSId"]
+                    elif alias in pending:
+                        found += settle(alias, source["TNSId"])
+            if matchedId is None and len(tns.sources) == 1:
+                matchedId = tns.sources[0]["TNSId"]
+            if key in pending:
+                found += settle(key, matchedId)
+            return found
+
+        # ANSWER WHAT WE CAN FROM THE CACHE FIRST
+        for key in list(self.lookups):
+            if key not in pending:
+                continue
+            tns = self._lookup(key, cacheOnly=True)
+            if tns.resumeToken is None:
+                for result in harvest(key, tns):
+                    yield result
+
+        # LOOK UP THE REST CONCURRENTLY, SKIPPING NAMES RESOLVED ALONG THE WAY
+        workers = max(1, int(self.concurrentNames))
+        inFlight = collections.deque()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                queue = iter(list(pending))
+                while True:
+                    while len(inFlight) < workers:
+                        key = next((k for k in queue if k in pending), None)
+                        if key is None:
+                            break
+                        inFlight.append(
+                            (key, executor.submit(self._lookup, key)))
+                    if not inFlight:
+                        break
+                    key, future = inFlight.popleft()
+                    tns = future.result()
+                    if key not in pending:
+                        continue
+                    if tns.resumeToken is not None:
+                        # THE TNS COULD NOT BE REACHED - REPORT AS UNRESOLVED
+                        self.log.warning(
+                            f'could not look up `{self.lookups[key][0]}` on the TNS')
+                        for result in settle(key, None):
+                            yield result
+                        continue
+                    for result in harvest(key, tns):
+                        yield result
+            finally:
+                for key, future in inFlight:
+                    future.cancel()
+
+        self.log.debug('completed the ``get`` method')
+        return None
+
+    def _lookup(
+            self,
+            key,
+            cacheOnly=False):
+        """*search the TNS for a single normalised name*
+
+        **Key Arguments**
+
+        - ``key`` -- the normalised name
+        - ``cacheOnly`` -- only look in the on-disk cache. Default *False*
+        """
+        tns = search(
+            log=self.log,
+            name=self.lookups[key][0] if not _is_tns_name(key) else key,
+            settings=self.settings,
+            cacheOnly=cacheOnly
+        )
+        tns.run()
+        return tns
+
+
+def normalise_name(
+        name):
+    """*the normalised form of a TNS or survey name used to group equivalent names*
+
+    **Key Arguments**
+
+    - ``name`` -- a TNS name (with or without an `SN`/`AT` prefix) or a survey name
+
+    **Return**
+
+    - ``key`` -- the bare, lowercase TNS name (e.g. `2016asf`) or the lowercase survey name with whitespace removed
+
+    **Usage**
+
+    ```python
+    from transientNamer.name_resolver import normalise_name
+    normalise_name("SN 2016asf")
+    # 2016asf
+    ```
+    """
+    name = re.sub(r"\s+", " ", str(name).strip())
+    matchObject = re.match(r'^((SN|AT) ?)?(\d{4}\w{1,6})$', name, re.I)
+    if matchObject:
+        return matchObject.group(3).lower()
+    return name.replace(" ", "").lower()
+
+
+def _is_tns_name(
+        key):
+    return re.match(r'^\d{4}\w{1,6}$', key) is not None
+
+
+def _source_names(
+        source):
+    """*the normalised TNS and survey names of a transient returned by a search*"""
+    names = [normalise_name(source["TNSId"])]
+    for name in (source.get("discoveryName") or "").split(","):
+        if name.strip():
+            names.append(normalise_name(name))
+    return names
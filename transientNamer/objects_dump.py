@@ -0,0 +1,282 @@
+#!/usr/local/bin/python
+# encoding: utf-8
+"""
+*Read a TNS bulk object dump and load it into a local mirror or MySQL*
+
+:Author:
+    David Young
+"""
+from __future__ import print_function
+import io
+import csv
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from builtins import object
+from transientNamer.commonutils.coordinates import decimal_to_sexagesimal
+
+# THE DISCOVERY DATA THE DUMP DOES NOT CARRY
+_missingColumns = ("hostName", "hostRedshift")
+
+
+class objects_dump(object):
+    """
+    *Read a TNS bulk object dump and load it into a local mirror or MySQL*
+
+    The TNS publishes the discovery data of every object as a single CSV file (`tns_public_objects.csv`, usually zipped). Reading it is a far quicker way to fill a mirror or database than paginating through the TNS search, e.g. to bootstrap a `mirror` before keeping it current with `mirror.sync()`.
+
+    The dump is streamed, so memory use does not grow with its size. Its columns are mapped onto the same discovery data as a `search` returns (`TNSId`, `TNSName`, `raSex`, `raDeg` etc.). The dump holds no host galaxy information or photometry, spectra and files: `hostName` and `hostRedshift` are *None* and loading the dump keeps any of these already held.
+
+    **Key Arguments**
+
+    - ``log`` -- logger
+    - ``pathToDump`` -- path to the CSV dump, or a zip file containing it
+    - ``dbConn`` -- database connection (only used by `to_mysql`). Default *False* (connect with the `database settings` in the settings file)
+    - ``settings`` -- the settings dictionary
+
+    **Usage**
+
+    ```python
+    from transientNamer import objects_dump
+    dump = objects_dump(
+        log=log,
+        pathToDump="/path/to/tns_public_objects.csv.zip",
+        settings=settings
+    )
+    count = dump.to_mirror()
+    ```
+
+    or to load the dump into the `TNS_sources` MySQL table (see `search.mysql`):
+
+    ```python
+    dump = objects_dump(
+        log=log,
+        pathToDump="/path/to/tns_public_objects.csv.zip",
+        dbConn=dbConn,
+        settings=settings
+    )
+    count = dump.to_mysql(tableNamePrefix="TNS")
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            pathToDump,
+            dbConn=False,
+            settings=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'objects_dump' object")
+        self.pathToDump = pathToDump
+        self.dbConn = dbConn
+        self.settings = settings
+
+        # THE TIME THE DUMP WAS TAKEN (READ FROM ITS FIRST LINE)
+        self.dumpDate = None
+
+        return None
+
+    def iter_sources(
+            self,
+            batchSize=10000):
+        """
+        *stream the discovery data of the objects in the dump*
+
+        **Key Arguments**
+
+        - ``batchSize`` -- the number of objects to return at a time. Default *10000*
+
+        **Return**
+
+        - ``sources`` -- a generator of lists of dictionaries of discovery data (up to ``batchSize`` per list)
+        """
+        self.log.debug('starting the ``iter_sources`` method')
+
+        with self._open() as f:
+            reader = self._reader(f)
+            batch = []
+            for row in reader:
+                batch.append(row)
+                if len(batch) == batchSize:
+                    yield self._source_rows(batch)
+                    batch = []
+            if batch:
+                yield self._source_rows(batch)
+
+        self.log.debug('completed the ``iter_sources`` method')
+        return None
+
+    def to_mirror(
+            self,
+            mirror=True,
+            batchSize=10000):
+        """
+        *add or update the objects in the dump in a local TNS mirror*
+
+        The discovery data of each object is replaced; any host galaxy information, photometry, spectra and files already held are kept. If the mirror has not been synced since the dump was taken, its last sync time is set to the time of the dump, so the next `mirror.sync()` only pulls the transients discovered since.
+
+        **Key Arguments**
+
+        - ``mirror`` -- *True* (use the mirror database in the `tns mirror` settings) or a `mirror` object. Default *True*
+        - ``batchSize`` -- the number of objects to write at a time. Default *10000*
+
+        **Return**
+
+        - ``count`` -- the number of objects added or updated
+        """
+        self.log.debug('starting the ``to_mirror`` method')
+
+        if mirror is True:
+            from transientNamer.mirror import mirror as tns_mirror
+            mirror = tns_mirror(log=self.log, settings=self.settings)
+
+        count = 0
+        for sources in self.iter_sources(batchSize=batchSize):
+            held = mirror.sources([s["TNSId"] for s in sources])
+            for s in sources:
+                if s["TNSId"] in held:
+                    for k in _missingColumns:
+                        s[k] = held[s["TNSId"]].get(k)
+            count += mirror.upsert([(s, [], [], [])
+                                    for s in sources], reports=False)
+            self.log.info(f"{count} objects loaded into the TNS mirror")
+
+        if self.dumpDate and (mirror.lastSync is None or mirror.lastSync < self.dumpDate):
+            mirror.lastSync = self.dumpDate
+
+        self.log.debug('completed the ``to_mirror`` method')
+        return count
+
+    def to_mysql(
+            self,
+            tableNamePrefix="TNS",
+            batchSize=2500):
+        """
+        *add or update the objects in the dump in the `<tableNamePrefix>_sources` MySQL table*
+
+        The table is created if it doesn't yet exist and rows are matched on `TNSId`. The host galaxy columns are not in the dump, so are left untouched for objects already in the table.
+
+        **Key Arguments**
+
+        - ``tableNamePrefix`` -- the prefix of the table name (as used by `search.mysql`). Default *TNS*
+        - ``batchSize`` -- the number of rows to insert at a time. Default *2500*
+
+        **Return**
+
+        - ``count`` -- the number of objects added or updated
+        """
+        self.log.debug('starting the ``to_mysql`` method')
+
+        from transientNamer.commonutils.mysqlwriter import mysql_writer
+        writer = mysql_writer(
+            log=self.log,
+            dbConn=self.dbConn,
+            tableNamePrefix=tableNamePrefix,
+            settings=self.settings,
+            batchSize=batchSize
+        )
+        writer.create_tables()
+
+        count = 0
+        for sources in self.iter_sources(batchSize=batchSize):
+            for s in sources:
+                for k in _missingColumns:
+                    del s[k]
+            count += writer.write(sources=sources)[0]
+            self.log.info(
+                f"{count} objects loaded into `{tableNamePrefix}_sources`")
+
+        self.log.debug('completed the ``to_mysql`` method')
+        return count
+
+    @contextmanager
+    def _open(
+            self):
+        """*open the dump (or the CSV file inside a zipped dump) for reading as text*"""
+        if not zipfile.is_zipfile(self.pathToDump):
+            with open(self.pathToDump, newline="", encoding="utf-8") as f:
+                yield f
+            return
+        with zipfile.ZipFile(self.pathToDump) as archive:
+            members = [n for n in archive.namelist()
+                       if n.lower().endswith(".csv")]
+            if not members:
+                raise IOError(f"no CSV file found in {self.pathToDump}")
+            with io.TextIOWrapper(archive.open(members[0]), newline="", encoding="utf-8") as f:
+                yield f
+
+    def _reader(
+            self,
+            f):
+        """*a `csv.DictReader` over the dump, skipping (and recording) the timestamp line the TNS puts above the column names*"""
+        firstLine = next(csv.reader([f.readline()]), [])
+        if "name" in [c.strip().lower() for c in firstLine]:
+            return csv.DictReader(f, fieldnames=firstLine)
+
+        try:
+            self.dumpDate = datetime.strptime(
+                firstLine[0].strip(), "%Y-%m-%d %H:%M:%S")
+        except (IndexError, ValueError):
+            self.log.warning(
+                f'could not read the time the dump was taken from its first line: {firstLine}')
+        return csv.DictReader(f)
+
+    def _source_rows(
+            self,
+            rows):
+        """*map rows of the dump onto the discovery data returned by `search`*
+
+        **Key Arguments**
+
+        - ``rows`` -- list of dictionaries read from the dump
+
+        **Return**
+
+        - ``sources`` -- list of dictionaries of discovery data
+        """
+        # CLEAN THE VALUES AS THE TNS RESULTS PARSER DOES
+        cleaned = []
+        for row in rows:
+            row = {k.strip().lower(): (v.strip() or None) if isinstance(v, str) else v
+                   for k, v in row.items() if k}
+            if not row.get("name") or not row.get("ra") or not row.get("declination"):
+                self.log.warning(
+                    f'skipping an object in the TNS dump without a name or position: {row}')
+                continue
+            cleaned.append(row)
+
+        raDeg = [float(r["ra"]) for r in cleaned]
+        decDeg = [float(r["declination"]) for r in cleaned]
+        raSex, decSex = decimal_to_sexagesimal(
+            log=self.log, raDeg=raDeg, decDeg=decDeg)
+
+        sources = []
+        for row, r, d, rs, ds in zip(cleaned, raDeg, decDeg, raSex, decSex):
+            TNSName = (row.get("name_prefix") or "") + row["name"]
+            source = {
+                "objectUrl": "https://www.wis-tns.org/object/" + row["name"],
+                "TNSName": TNSName,
+                "raSex": rs,
+                "decSex": ds,
+                "specType": row.get("type"),
+                "transRedshift": row.get("redshift"),
+                "hostName": None,
+                "hostRedshift": None,
+                "reportingSurvey": row.get("reporting_group"),
+                "discSurvey": row.get("source_group"),
+                "discoveryName": row.get("internal_names"),
+                "discMag": row.get("discoverymag"),
+                "discMagFilter": row.get("filter"),
+                "discDate": row.get("discoverydate"),
+                "raDeg": r,
+                "decDeg": d
+            }
+            # THE REPORTING USERS STAND IN FOR A MISSING DISCOVERY SURVEY
+            if not source["discSurvey"]:
+                source["survey"] = row.get("reporters")
+            source["TNSId"] = TNSName.replace("SN", "").replace("AT", "")
+            if "survey" not in source:
+                source["survey"] = None
+            sources.append(source)
+        return sources
@@ -10,12 +10,21 @@ from __future__ import print_function
 
 from fundamentals.renderer import list_of_dictionaries
 from fundamentals.files import list_of_dictionaries_to_mysql_inserts
+from transientNamer.commonutils.mysqlwriter import tableSchemas
 from datetime import datetime, date, timedelta
 import time as timesleep
 from fundamentals import tools
+from transientNamer.commonutils import tnssession
+from transientNamer.commonutils.retrypolicy import retry_policy
+from transientNamer.commonutils.responsecache import response_cache
+from transientNamer.commonutils.stats import run_stats
+from transientNamer.commonutils.resultsparser import parse_results_page, read_reports
+from transientNamer.commonutils.coordinates import sexagesimal_to_decimal, separations
 from operator import itemgetter
 import collections
 import copy
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from builtins import str
 from builtins import object
 import sys
@@ -40,6 +49,11 @@ class search(object):
     - ``name`` -- name of the object to search the TNS for
     - ``discInLastDays`` -- search the TNS for transient reported in the last X days
     - ``comments`` -- print the comments from the TNS, note these can be long making table outputs somewhat unreadable. Default *False*
+    - ``concurrentPages`` -- the number of result pages to download in parallel once the first page shows more pages exist. Default *False* (download pages one at a time)
+    - ``resumeToken`` -- the `resumeToken` of an earlier, incomplete search with the same search constraints. The search restarts from the page that previously failed. Default *False*
+    - ``cacheOnly`` -- only answer the search from the on-disk cache (see the `tns cache` settings) and never contact the TNS. A search that is not cached quietly returns no results and sets `resumeToken`. Default *False*
+    - ``mirror`` -- answer name and cone searches from a local TNS mirror instead of the TNS. Either *True* (use the mirror database in the `tns mirror` settings) or a `mirror` object. Default *False*
+    - ``statsCallback`` -- a function passed each stage timing and counter as it is recorded (see `tns.stats`). Default *None*
 
 
     **Usage**
@@ -68,6 +82,15 @@ class search(object):
 
     Note the search method can accept coordinates in sexagesimal or decimal defree formats.
 
+    The search is not sent to the TNS until the results are first accessed (e.g. `tns.sources`), or `tns.run()` is called. The photometry, spectra and related files are only parsed when they are first accessed, so a search that only needs `tns.sources` skips that work.
+
+    To process a large result set without holding it all in memory, stream the transients (with their photometry, spectra and files) as each results page is parsed:
+
+    ```python
+    for source, photometry, spectra, files in tns.iter_sources():
+        print(source["TNSId"])
+    ```
+
     To list all new objects reported in the last three weeks, then use:
 
     ```python
@@ -78,6 +101,59 @@ class search(object):
     )
     ```
 
+    Large result sets are paginated by the TNS. To download the remaining pages in parallel once the first page shows there are more to come, set `concurrentPages` to the number of pages to download at once (results are returned in the same order as a sequential search):
+
+    ```python
+    from transientNamer import search
+    tns = search(
+        log=log,
+        discInLastDays=30,
+        concurrentPages=4
+    )
+    ```
+
+    Failed page requests are retried with exponential backoff (see the `tns retries` settings). If a page still cannot be downloaded, the results parsed from the earlier pages are kept and `tns.resumeToken` is set; pass it back with the same search constraints to continue from the failed page:
+
+    ```python
+    if tns.resumeToken is not None:
+        rest = search(
+            log=log,
+            discInLastDays=30,
+            resumeToken=tns.resumeToken
+        )
+    ```
+
+    If the settings file contains a `tns cache` block, every result page downloaded is cached on disk and repeat searches are answered from the cache until the entry expires (expiry times are set per query type). Set `offline: True` in the `tns cache` block to answer searches from the cache only, without contacting the TNS. Name and cone searches that find nothing are cached separately (see `negative ttl seconds`) and are forgotten as soon as a `discInLastDays` search reports a transient that would now match them.
+
+    Name and cone searches can be answered from a local mirror of the TNS (see `mirror`) without contacting the TNS at all:
+
+    ```python
+    from transientNamer import search
+    tns = search(
+        log=log,
+        ra="06:50:36.74",
+        dec="+31:06:44.7",
+        radiusArcsec=5,
+        settings=settings,
+        mirror=True
+    )
+    ```
+
+    The mirror is the only source consulted: a transient missing from the mirror is not looked for on the TNS. Names are matched exactly (after normalisation, as by `name_resolver`). `discInLastDays` searches are always sent to the TNS.
+
+    Every search records where its time goes in `tns.stats`: the wall-clock and CPU time of each stage (`http` wait, `extract`ing the rows from the HTML, parsing the `discovery` data, `coordinates`, `photometry` and `spectra`, and `render`ing the output) and counters of the `requests` sent, `bytes` downloaded, `pages` and `rows` read, `retries` and `cache hits`. Pass `statsCallback` to forward each timing and count to a metrics system as it is recorded:
+
+    ```python
+    tns = search(
+        log=log,
+        discInLastDays=3,
+        settings=settings,
+        statsCallback=lambda name, kind, value: print(name, kind, value)
+    )
+    tns.csv()
+    print(tns.stats.summary())
+    ```
+
     """
     # Initialisation
 
@@ -90,7 +166,12 @@ class search(object):
             name="",
             discInLastDays="",
             settings=False,
-            comments=False
+            comments=False,
+            concurrentPages=False,
+            resumeToken=False,
+            cacheOnly=False,
+            mirror=False,
+            statsCallback=None
     ):
         self.log = log
         log.debug("instansiating a new 'search' object")
@@ -104,6 +185,12 @@ class search(object):
         self.discInLastDays = discInLastDays
         self.page = 0
         self.batchSize = 50
+        self.concurrentPages = concurrentPages
+        self.cacheOnly = cacheOnly
+        self._resumeToken = None
+        if resumeToken:
+            self.page = int(resumeToken)
+        self._firstPage = self.page
 
         # CREATE THE TIME-RANGE WINDOW TO SEARCH TNS
         if not discInLastDays:
@@ -122,28 +209,202 @@ class search(object):
                 self.internal_name = self.name
                 self.name = ""
 
-        # DO THE SEARCH OF THE TNS AND COMPILE THE RESULTS INTO SEPARATE RESULT
-        # SETS
-        self.sourceResultsList, self.photResultsList, self.specResultsList, self.relatedFilesResultsList = self._query_tns()
-        self.sourceResults = list_of_dictionaries(
-            log=log,
-            listOfDictionaries=self.sourceResultsList
-        )
-        self.photResults = list_of_dictionaries(
-            log=log,
-            listOfDictionaries=self.photResultsList
-        )
-        self.specResults = list_of_dictionaries(
+        # THE QUERY TYPE SETS HOW LONG CACHED RESULT PAGES REMAIN VALID
+        # (AN RA OF 0 IS STILL A CONESEARCH)
+        if self.ra not in ("", None):
+            self.queryType = "cone"
+        elif self.name:
+            self.queryType = "name"
+        elif self.internal_name:
+            self.queryType = "internal name"
+        else:
+            self.queryType = "recent"
+        self._cache = response_cache(log=log, settings=settings)
+
+        # NAME AND CONE SEARCHES CAN BE ANSWERED FROM A LOCAL MIRROR
+        self._mirror = None
+        if mirror and self.queryType != "recent":
+            if mirror is True:
+                from transientNamer.mirror import mirror as tns_mirror
+                mirror = tns_mirror(log=log, settings=settings)
+            self._mirror = mirror
+
+        # THE SEARCH IS ONLY SENT TO THE TNS WHEN THE RESULTS ARE FIRST ASKED
+        # FOR (OR `run()` IS CALLED)
+        self._searchURL = None
+        self._queried = False
+        self._sourceResultsList = None
+        self._resultPages = None
+        self._reportResultsLists = None
+        self._renderers = {}
+
+        # PER-STAGE TIMINGS AND COUNTERS (HTTP WAIT, PARSING, RENDERING ...)
+        self.stats = run_stats(log=log, callback=statsCallback)
+
+        return None
+
+    def run(self):
+        """
+        *send the search to the TNS and parse the transients found*
+
+        The search is run automatically the first time any of the results (or the `resumeToken`) are accessed; call `run()` to send it at a time of your choosing (e.g. from a worker thread). Calling it again has no effect.
+
+        The photometry, spectra and related files of the transients are only parsed from the downloaded pages when they are first accessed.
+
+        **Usage**
+
+        ```python
+        tns = search(
             log=log,
-            listOfDictionaries=self.specResultsList
+            name="Gaia16bbi"
         )
-        self.relatedFilesResults = list_of_dictionaries(
+        tns.run()
+        ```
+        """
+        if self._sourceResultsList is None:
+            if self._mirror is not None:
+                with self.stats.timer("mirror"):
+                    self._sourceResultsList = self._query_mirror()
+            else:
+                self._sourceResultsList, self._resultPages = self._query_tns()
+        return None
+
+    def _require_results(
+            self):
+        """*run the search if the results are needed and it has not run yet*"""
+        self.run()
+
+    def iter_sources(
+            self):
+        """
+        *stream the transients found by the search, one at a time, as soon as each results page is parsed*
+
+        Unlike the `sources`, `photometry`, `spectra` and `files` properties, the results are not held in memory: each page of results is downloaded, parsed and handed back before the next page is needed. Transients are returned in the order the TNS lists them (conesearch results are not sorted by separation). If the search stops early, `resumeToken` is set as usual.
+
+        **Return**
+
+        - ``source``, ``photometry``, ``spectra``, ``files`` -- a generator with one tuple per transient: the dictionary of discovery data plus lists of dictionaries of the transient's photometry, spectra and related files
+
+        **Usage**
+
+        ```python
+        tns = search(
             log=log,
-            listOfDictionaries=self.relatedFilesResultsList
+            discInLastDays=30
         )
+        for source, photometry, spectra, files in tns.iter_sources():
+            print(source["TNSId"], len(photometry))
+        ```
+        """
+        self.log.debug('starting the ``iter_sources`` method')
+
+        for page in self._iter_source_pages():
+            for transient in page:
+                yield transient
 
+        self.log.debug('completed the ``iter_sources`` method')
+        return None
+
+    def _iter_source_pages(
+            self):
+        """*the transients found by the search (as returned by `iter_sources`), one list per page of results*"""
+        if self._mirror is not None:
+            sources = self._query_mirror()
+            for i in range(0, len(sources), self.batchSize):
+                page = []
+                for source in sources[i:i + self.batchSize]:
+                    photometry, spectra, files = self._mirror.reports(
+                        [source["TNSId"]], comments=self.comments)
+                    page.append((dict(source), photometry, spectra, files))
+                yield page
+            return None
+
+        for content, sources, transients in self._iter_parsed_pages():
+            page = []
+            for source, transient in zip(sources, transients):
+                photometry, spectra, files = self._report_rows(
+                    content, [transient])
+                page.append((dict(source), photometry, spectra, files))
+            yield page
+        return None
+
+    def _keep_source_pages(
+            self,
+            pages):
+        """*pass on the pages of transients returned by `_iter_source_pages`, keeping them as the results of the search once the last page has been read*"""
+        sources = []
+        photometry = []
+        spectra = []
+        files = []
+        for page in pages:
+            for source, phot, spec, relatedFiles in page:
+                sources.append(source)
+                photometry += phot
+                spectra += spec
+                files += relatedFiles
+            yield page
+        self._sourceResultsList = self._sort_sources(sources)
+        self._reportResultsLists = (photometry, spectra, files)
+        self._resultPages = None
         return None
 
+    @property
+    def resumeToken(
+            self):
+        """*the page to resume an incomplete search from (None if the search completed)*"""
+        if not self._queried:
+            self._require_results()
+        return self._resumeToken
+
+    @property
+    def sourceResultsList(
+            self):
+        """*the top-level transient data as a list of dictionaries*"""
+        self._require_results()
+        return self._sourceResultsList
+
+    @property
+    def photResultsList(
+            self):
+        """*the photometry of the transients as a list of dictionaries*"""
+        return self._report_results()[0]
+
+    @property
+    def specResultsList(
+            self):
+        """*the spectral data of the transients as a list of dictionaries*"""
+        return self._report_results()[1]
+
+    @property
+    def relatedFilesResultsList(
+            self):
+        """*the files associated with the transients as a list of dictionaries*"""
+        return self._report_results()[2]
+
+    @property
+    def sourceResults(
+            self):
+        """*a renderer for the top-level transient data*"""
+        return self._renderer("sourceResultsList")
+
+    @property
+    def photResults(
+            self):
+        """*a renderer for the photometry*"""
+        return self._renderer("photResultsList")
+
+    @property
+    def specResults(
+            self):
+        """*a renderer for the spectral data*"""
+        return self._renderer("specResultsList")
+
+    @property
+    def relatedFilesResults(
+            self):
+        """*a renderer for the related files*"""
+        return self._renderer("relatedFilesResultsList")
+
     @property
     def sources(
             self):
@@ -209,6 +470,84 @@ class search(object):
         photResultsList[:] = [dict(l) for l in self.photResultsList]
         return photResultsList
 
+    def records(
+            self):
+        """
+        *the results as compact, typed records*
+
+        The same results as the `sources`, `photometry`, `spectra` and `files` properties, but each row is a record holding its values in `__slots__` (a fraction of the memory of a dictionary) with numeric columns parsed to floats and date columns to `datetime` objects. Records can still be read by key like the dictionaries (`record["mag"]`, `record.get("mag")`, `dict(record)`) as well as by attribute (`record.mag`).
+
+        If the search has not run yet, the results are streamed from the TNS and each page is converted to records as it arrives, so the dictionaries are never all held in memory (the dictionary properties would send the search again).
+
+        **Return**
+
+        - ``sources``, ``photometry``, ``spectra``, ``files`` -- lists of `source`, `photometry`, `spectrum` and `related_file` records (see `commonutils.records`)
+
+        **Usage**
+
+        ```python
+        sources, photometry, spectra, files = tns.records()
+        brightest = min(p.mag for p in photometry if p.mag is not None)
+        ```
+        """
+        from transientNamer.commonutils import records
+        recordClasses = (records.source, records.photometry,
+                         records.spectrum, records.related_file)
+        results = ([], [], [], [])
+        separations = []
+        for batch in self._iter_result_batches():
+            separations += [r.get("separationArcsec") for r in batch[0]]
+            for recordClass, rows, result in zip(recordClasses, batch, results):
+                result += [recordClass.from_dict(self.log, row)
+                           for row in rows]
+        sources = [results[0][i] for i in self._source_order(separations)]
+        return (sources,) + results[1:]
+
+    def columns(
+            self):
+        """
+        *the results as column-oriented stores backed by NumPy arrays*
+
+        Numeric columns are held as float arrays, dates as `datetime64` arrays and strings as categoricals, so large result sets (e.g. the photometry of a long `discInLastDays` search) take little memory and can be filtered on any column without building dictionaries (see `commonutils.columnstore.column_store`). If the search has not run yet, the results are streamed from the TNS and each page is added to the columns as it arrives, so the dictionaries are never all held in memory (the dictionary properties would send the search again).
+
+        **Return**
+
+        - ``sources``, ``photometry``, ``spectra``, ``files`` -- a `column_store` for each flavour of results
+
+        **Usage**
+
+        ```python
+        sources, photometry, spectra, files = tns.columns()
+        detections = photometry.where(filter="g", limitingMag=0)
+        print(detections["mag"].min())
+        ```
+        """
+        from transientNamer.commonutils.columnstore import column_builder
+        builders = [column_builder(self.log) for i in range(4)]
+        separations = []
+        for batch in self._iter_result_batches():
+            separations += [r.get("separationArcsec") for r in batch[0]]
+            for builder, rows in zip(builders, batch):
+                builder.add(rows)
+        stores = [b.store() for b in builders]
+        stores[0] = stores[0][self._source_order(separations)]
+        return tuple(stores)
+
+    def _iter_result_batches(
+            self):
+        """*the sources, photometry, spectra and files of the search a batch at a time: the results already held in one batch, otherwise one batch per page streamed from the TNS*"""
+        if self._sourceResultsList is not None:
+            yield self.sourceResultsList, self.photResultsList, self.specResultsList, self.relatedFilesResultsList
+            return None
+        for page in self._iter_source_pages():
+            batch = ([], [], [], [])
+            for transient in page:
+                batch[0].append(transient[0])
+                for rows, more in zip(batch[1:], transient[1:]):
+                    rows += more
+            yield batch
+        return None
+
     @property
     def url(
             self):
@@ -220,8 +559,10 @@ class search(object):
         searchURL = tns.url
         ```
 
+        Accessing the URL does not run the search. Once the search has run, this is the URL of the last results page downloaded.
         """
-
+        if self._searchURL is None:
+            return self._search_url(self._search_params(self.page))
         return self._searchURL
 
     def csv(
@@ -268,21 +609,22 @@ class search(object):
 
         """
 
-        if dirPath:
-            p = self._file_prefix()
-            csvSources = self.sourceResults.csv(
-                filepath=dirPath + "/" + p + "sources.csv")
-            csvPhot = self.photResults.csv(
-                filepath=dirPath + "/" + p + "phot.csv")
-            csvSpec = self.specResults.csv(
-                filepath=dirPath + "/" + p + "spec.csv")
-            csvFiles = self.relatedFilesResults.csv(
-                filepath=dirPath + "/" + p + "relatedFiles.csv")
-        else:
-            csvSources = self.sourceResults.csv()
-            csvPhot = self.photResults.csv()
-            csvSpec = self.specResults.csv()
-            csvFiles = self.relatedFilesResults.csv()
+        with self._rendering():
+            if dirPath:
+                p = self._file_prefix()
+                csvSources = self.sourceResults.csv(
+                    filepath=dirPath + "/" + p + "sources.csv")
+                csvPhot = self.photResults.csv(
+                    filepath=dirPath + "/" + p + "phot.csv")
+                csvSpec = self.specResults.csv(
+                    filepath=dirPath + "/" + p + "spec.csv")
+                csvFiles = self.relatedFilesResults.csv(
+                    filepath=dirPath + "/" + p + "relatedFiles.csv")
+            else:
+                csvSources = self.sourceResults.csv()
+                csvPhot = self.photResults.csv()
+                csvSpec = self.specResults.csv()
+                csvFiles = self.relatedFilesResults.csv()
         return csvSources, csvPhot, csvSpec, csvFiles
 
     def json(
@@ -350,23 +692,61 @@ class search(object):
 
         """
 
-        if dirPath:
-            p = self._file_prefix()
-            jsonSources = self.sourceResults.json(
-                filepath=dirPath + "/" + p + "sources.json")
-            jsonPhot = self.photResults.json(
-                filepath=dirPath + "/" + p + "phot.json")
-            jsonSpec = self.specResults.json(
-                filepath=dirPath + "/" + p + "spec.json")
-            jsonFiles = self.relatedFilesResults.json(
-                filepath=dirPath + "/" + p + "relatedFiles.json")
-        else:
-            jsonSources = self.sourceResults.json()
-            jsonPhot = self.photResults.json()
-            jsonSpec = self.specResults.json()
-            jsonFiles = self.relatedFilesResults.json()
+        with self._rendering():
+            if dirPath:
+                p = self._file_prefix()
+                jsonSources = self.sourceResults.json(
+                    filepath=dirPath + "/" + p + "sources.json")
+                jsonPhot = self.photResults.json(
+                    filepath=dirPath + "/" + p + "phot.json")
+                jsonSpec = self.specResults.json(
+                    filepath=dirPath + "/" + p + "spec.json")
+                jsonFiles = self.relatedFilesResults.json(
+                    filepath=dirPath + "/" + p + "relatedFiles.json")
+            else:
+                jsonSources = self.sourceResults.json()
+                jsonPhot = self.photResults.json()
+                jsonSpec = self.specResults.json()
+                jsonFiles = self.relatedFilesResults.json()
         return jsonSources, jsonPhot, jsonSpec, jsonFiles
 
+    def ndjson(
+            self,
+            dirPath=None):
+        """*Render the results as newline-delimited JSON (JSON Lines)*
+
+        Each row is written as one compact JSON object on its own line, so the output can be read (or tailed) a line at a time rather than loaded whole. If ``dirPath`` is given and the search has not run yet, the files are written page by page as the results arrive, and the rows are kept to return. To stream a large search to ndjson files without holding the results in memory, use `to_files(dirPath, render="ndjson")`.
+
+        **Key Arguments**
+
+        - ``dirPath`` -- the path to the directory to save the rendered results to. Default *None*
+
+        **Return**
+
+        - `ndjsonSources` -- the top-level transient data
+        - `ndjsonPhot` -- all photometry associated with the transients
+        - `ndjsonSpec` -- all spectral data associated with the transients
+        - `ndjsonFiles`  -- all files associated with the matched transients found on the tns
+
+        **Usage**
+
+        ```python
+        ndjsonSources, ndjsonPhot, ndjsonSpec, ndjsonFiles = tns.ndjson()
+        print(ndjsonSources)
+        ```
+
+        ```text
+        {"objectUrl":"https://www.wis-tns.org/object/2016asf","TNSName":"SN2016asf","raSex":"06:50:36.73","decSex":"+31:06:45.36", ... ,"TNSId":"2016asf","survey":null}
+        ```
+        """
+        from transientNamer.commonutils.streamwriter import ndjson_line
+        if dirPath:
+            # ONE PASS OVER THE TNS: THE ROWS STREAMED TO THE FILES ARE KEPT AS
+            # THE RESULTS RETURNED BELOW
+            self.to_files(dirPath, render="ndjson", keepResults=True)
+        with self._rendering():
+            return tuple("\n".join(ndjson_line(row) for row in rows) for rows in (self.sourceResultsList, self.photResultsList, self.specResultsList, self.relatedFilesResultsList))
+
     def yaml(
             self,
             dirPath=None):
@@ -428,21 +808,22 @@ class search(object):
 
         """
 
-        if dirPath:
-            p = self._file_prefix()
-            yamlSources = self.sourceResults.yaml(
-                filepath=dirPath + "/" + p + "sources.yaml")
-            yamlPhot = self.photResults.yaml(
-                filepath=dirPath + "/" + p + "phot.yaml")
-            yamlSpec = self.specResults.yaml(
-                filepath=dirPath + "/" + p + "spec.yaml")
-            yamlFiles = self.relatedFilesResults.yaml(
-                filepath=dirPath + "/" + p + "relatedFiles.yaml")
-        else:
-            yamlSources = self.sourceResults.yaml()
-            yamlPhot = self.photResults.yaml()
-            yamlSpec = self.specResults.yaml()
-            yamlFiles = self.relatedFilesResults.yaml()
+        with self._rendering():
+            if dirPath:
+                p = self._file_prefix()
+                yamlSources = self.sourceResults.yaml(
+                    filepath=dirPath + "/" + p + "sources.yaml")
+                yamlPhot = self.photResults.yaml(
+                    filepath=dirPath + "/" + p + "phot.yaml")
+                yamlSpec = self.specResults.yaml(
+                    filepath=dirPath + "/" + p + "spec.yaml")
+                yamlFiles = self.relatedFilesResults.yaml(
+                    filepath=dirPath + "/" + p + "relatedFiles.yaml")
+            else:
+                yamlSources = self.sourceResults.yaml()
+                yamlPhot = self.photResults.yaml()
+                yamlSpec = self.specResults.yaml()
+                yamlFiles = self.relatedFilesResults.yaml()
         return yamlSources, yamlPhot, yamlSpec, yamlFiles
 
     def markdown(
@@ -490,21 +871,22 @@ class search(object):
 
         """
 
-        if dirPath:
-            p = self._file_prefix()
-            markdownSources = self.sourceResults.markdown(
-                filepath=dirPath + "/" + p + "sources.md")
-            markdownPhot = self.photResults.markdown(
-                filepath=dirPath + "/" + p + "phot.md")
-            markdownSpec = self.specResults.markdown(
-                filepath=dirPath + "/" + p + "spec.md")
-            markdownFiles = self.relatedFilesResults.markdown(
-                filepath=dirPath + "/" + p + "relatedFiles.md")
-        else:
-            markdownSources = self.sourceResults.markdown()
-            markdownPhot = self.photResults.markdown()
-            markdownSpec = self.specResults.markdown()
-            markdownFiles = self.relatedFilesResults.markdown()
+        with self._rendering():
+            if dirPath:
+                p = self._file_prefix()
+                markdownSources = self.sourceResults.markdown(
+                    filepath=dirPath + "/" + p + "sources.md")
+                markdownPhot = self.photResults.markdown(
+                    filepath=dirPath + "/" + p + "phot.md")
+                markdownSpec = self.specResults.markdown(
+                    filepath=dirPath + "/" + p + "spec.md")
+                markdownFiles = self.relatedFilesResults.markdown(
+                    filepath=dirPath + "/" + p + "relatedFiles.md")
+            else:
+                markdownSources = self.sourceResults.markdown()
+                markdownPhot = self.photResults.markdown()
+                markdownSpec = self.specResults.markdown()
+                markdownFiles = self.relatedFilesResults.markdown()
         return markdownSources, markdownPhot, markdownSpec, markdownFiles
 
     def table(
@@ -554,23 +936,143 @@ class search(object):
 
         """
 
-        if dirPath:
-            p = self._file_prefix()
-            tableSources = self.sourceResults.table(
-                filepath=dirPath + "/" + p + "sources.ascii")
-            tablePhot = self.photResults.table(
-                filepath=dirPath + "/" + p + "phot.ascii")
-            tableSpec = self.specResults.table(
-                filepath=dirPath + "/" + p + "spec.ascii")
-            tableFiles = self.relatedFilesResults.table(
-                filepath=dirPath + "/" + p + "relatedFiles.ascii")
-        else:
-            tableSources = self.sourceResults.table()
-            tablePhot = self.photResults.table()
-            tableSpec = self.specResults.table()
-            tableFiles = self.relatedFilesResults.table()
+        with self._rendering():
+            if dirPath:
+                p = self._file_prefix()
+                tableSources = self.sourceResults.table(
+                    filepath=dirPath + "/" + p + "sources.ascii")
+                tablePhot = self.photResults.table(
+                    filepath=dirPath + "/" + p + "phot.ascii")
+                tableSpec = self.specResults.table(
+                    filepath=dirPath + "/" + p + "spec.ascii")
+                tableFiles = self.relatedFilesResults.table(
+                    filepath=dirPath + "/" + p + "relatedFiles.ascii")
+            else:
+                tableSources = self.sourceResults.table()
+                tablePhot = self.photResults.table()
+                tableSpec = self.specResults.table()
+                tableFiles = self.relatedFilesResults.table()
         return tableSources, tablePhot, tableSpec, tableFiles
 
+    def to_files(
+            self,
+            dirPath,
+            render="csv",
+            compress=False,
+            keepResults=False):
+        """*Stream the results to csv, json, yaml or ndjson files*
+
+        Unlike `csv`, `json` and `yaml`, the rendered results are never held in memory: each row is written to its file as soon as it is parsed (if the search has not run yet, the results are streamed from the TNS one page at a time and the files are flushed after each page), so memory use stays flat however many transients the search returns. The `ndjson` format (JSON Lines) writes one compact JSON object per line, so the files can be tailed while the search runs. The files hold the same content as those written by the renderers, except that conesearch results are written in the order the TNS lists them rather than sorted by separation. No file is written for a flavour of data without results.
+
+        **Key Arguments**
+
+        - ``dirPath`` -- the path to the directory to save the results to
+        - ``render`` -- the output format, one of csv, json, yaml or ndjson. Default *csv*
+        - ``compress`` -- gzip-compress the files (`.gz` is appended to their names). Default *False*
+        - ``keepResults`` -- also keep the streamed rows as the results of the search, so the properties and renderers can use them afterwards without sending the search to the TNS again. Default *False*
+
+        **Return**
+
+        - ``counts`` -- the number of sources, photometry, spectra and files rows written
+        - ``paths`` -- the paths of the sources, photometry, spectra and files output files (*None* where no rows were written)
+
+        **Usage**
+
+        ```python
+        counts, paths = tns.to_files("~/tns", render="csv", compress=True)
+        print(f"{counts[0]} transients written to {paths[0]}")
+        ```
+        """
+        self.log.debug('starting the ``to_files`` method')
+
+        from transientNamer.commonutils.streamwriter import stream_writer
+        p = self._file_prefix()
+        writers = [stream_writer(dirPath + "/" + p + suffix + "." + render, render=render, compress=compress)
+                   for suffix in ("sources", "phot", "spec", "relatedFiles")]
+        try:
+            if self._sourceResultsList is not None:
+                with self._rendering():
+                    for writer, rows in zip(writers, (self.sourceResultsList, self.photResultsList, self.specResultsList, self.relatedFilesResultsList)):
+                        for row in rows:
+                            writer.write(row)
+            else:
+                pages = self._iter_source_pages()
+                if keepResults:
+                    pages = self._keep_source_pages(pages)
+                for page in pages:
+                    with self.stats.timer("render"):
+                        for source, photometry, spectra, files in page:
+                            writers[0].write(source)
+                            for writer, rows in zip(writers[1:], (photometry, spectra, files)):
+                                for row in rows:
+                                    writer.write(row)
+                        # CONSUMERS TAILING THE FILES SEE EACH PAGE AS SOON AS IT IS PARSED
+                        for writer in writers:
+                            writer.flush()
+        finally:
+            for writer in writers:
+                writer.close()
+
+        counts = tuple(w.rowCount for w in writers)
+        paths = tuple(w.filepath if w.rowCount else None for w in writers)
+
+        self.log.debug('completed the ``to_files`` method')
+        return counts, paths
+
+    def parquet(
+            self,
+            dirPath=None):
+        """*Render the results as typed Apache Arrow tables, optionally saved as Parquet files*
+
+        Unlike the text renderers, numeric columns (e.g. `raDeg`, `discMag`, `transRedshift`, `mag`) are stored as floats and date columns (`discDate`, `obsdate`, `reportAddedDate`, `dateObs`) as timestamps. Requires the optional `pyarrow` package (`pip install transientNamer[columnar]`).
+
+        **Key Arguments**
+
+        - ``dirPath`` -- the path to the directory to save the rendered results to. Default *None*
+
+        **Return**
+
+        - `parquetSources` -- the top-level transient data
+        - `parquetPhot` -- all photometry associated with the transients
+        - `parquetSpec` -- all spectral data associated with the transients
+        - `parquetFiles`  -- all files associated with the matched transients found on the tns
+
+        each as a `pyarrow.Table`
+
+        **Usage**
+
+        ```python
+        parquetSources, parquetPhot, parquetSpec, parquetFiles = tns.parquet("~/tns")
+        print(parquetPhot.schema)
+        ```
+
+        The four flavours of data are saved to separate files (e.g. `..._sources.parquet`) but all data can be assoicated with its transient source using the transient's unique `TNSId`.
+        """
+        return self._columnar(dirPath=dirPath, extension="parquet")
+
+    def arrow(
+            self,
+            dirPath=None):
+        """*Render the results as typed Apache Arrow tables, optionally saved as Arrow IPC files*
+
+        The same as `parquet` but the files are saved uncompressed in the Arrow IPC (Feather v2) format, so they can be memory-mapped (e.g. with `pyarrow.ipc.open_file(pyarrow.memory_map(path))`) rather than read into memory.
+
+        **Key Arguments**
+
+        - ``dirPath`` -- the path to the directory to save the rendered results to. Default *None*
+
+        **Return**
+
+        - `arrowSources`, `arrowPhot`, `arrowSpec`, `arrowFiles` -- the sources, photometry, spectra and files as `pyarrow.Table` objects
+
+        **Usage**
+
+        ```python
+        arrowSources, arrowPhot, arrowSpec, arrowFiles = tns.arrow("~/tns")
+        ```
+        """
+        return self._columnar(dirPath=dirPath, extension="arrow")
+
     def mysql(
             self,
             tableNamePrefix="TNS",
@@ -615,752 +1117,1081 @@ class search(object):
             :alt: mysql output
 
         """
-        if dirPath:
-            p = self._file_prefix()
-
-            createStatement = """
-CREATE TABLE `%(tableNamePrefix)s_sources` (
-  `primaryId` bigint(20) NOT NULL AUTO_INCREMENT COMMENT 'An internal counter',
-  `TNSId` varchar(20) NOT NULL,
-  `TNSName` varchar(20) DEFAULT NULL,
-  `dateCreated` datetime DEFAULT NULL,
-  `decDeg` double DEFAULT NULL,
-  `decSex` varchar(45) DEFAULT NULL,
-  `discDate` datetime DEFAULT NULL,
-  `discMag` double DEFAULT NULL,
-  `discMagFilter` varchar(45) DEFAULT NULL,
-  `discSurvey` varchar(100) DEFAULT NULL,
-  `discoveryName` varchar(100) DEFAULT NULL,
-  `objectUrl` varchar(200) DEFAULT NULL,
-  `raDeg` double DEFAULT NULL,
-  `raSex` varchar(45) DEFAULT NULL,
-  `specType` varchar(100) DEFAULT NULL,
-  `transRedshift` double DEFAULT NULL,
-  `updated` tinyint(4) DEFAULT '0',
-  `dateLastModified` datetime DEFAULT NULL,
-  `hostName` VARCHAR(100) NULL DEFAULT NULL,
-  `hostRedshift` DOUBLE NULL DEFAULT NULL, 
-  `survey` VARCHAR(100) NULL DEFAULT NULL,
-  PRIMARY KEY (`primaryId`),
-  UNIQUE KEY `tnsid` (`TNSId`)
-) ENGINE=InnoDB AUTO_INCREMENT=0 DEFAULT CHARSET=latin1;
-            """ % locals()
-
-            mysqlSources = self.sourceResults.mysql(
-                tableNamePrefix + "_sources", filepath=dirPath + "/" + p + "sources.sql", createStatement=createStatement)
-
-            createStatement = """
-CREATE TABLE `%(tableNamePrefix)s_photometry` (
-  `primaryId` bigint(20) NOT NULL AUTO_INCREMENT COMMENT 'An internal counter',
-  `TNSId` varchar(20) NOT NULL,
-  `dateCreated` datetime DEFAULT CURRENT_TIMESTAMP,
-  `exptime` double DEFAULT NULL,
-  `filter` varchar(100) DEFAULT NULL,
-  `limitingMag` tinyint(4) DEFAULT NULL,
-  `mag` double DEFAULT NULL,
-  `magErr` double DEFAULT NULL,
-  `magUnit` varchar(100) DEFAULT NULL,
-  `objectName` varchar(100) DEFAULT NULL,
-  `obsdate` datetime DEFAULT NULL,
-  `reportAddedDate` datetime DEFAULT NULL,
-  `suggestedType` varchar(100) DEFAULT NULL,
-  `survey` varchar(100) DEFAULT NULL,
-  `telescope` varchar(100) DEFAULT NULL,
-  `updated` tinyint(4) DEFAULT '0',
-  `dateLastModified` datetime DEFAULT NULL,
-  `remarks` VARCHAR(800) NULL DEFAULT NULL,
-  `sourceComment` VARCHAR(800) NULL DEFAULT NULL,
-  PRIMARY KEY (`primaryId`),
-  UNIQUE KEY `tnsid_survey_obsdate` (`TNSId`,`survey`,`obsdate`),
-  UNIQUE INDEX `u_tnsid_survey_obsdate` (`TNSId` ASC, `survey` ASC, `obsdate` ASC),
-  UNIQUE INDEX `u_tnsid_obsdate_objname` (`TNSId` ASC, `obsdate` ASC, `objectName` ASC)
-) ENGINE=InnoDB AUTO_INCREMENT=0 DEFAULT CHARSET=latin1;
-            """ % locals()
-
-            mysqlPhot = self.photResults.mysql(
-                tableNamePrefix + "_photometry", filepath=dirPath + "/" + p + "phot.sql", createStatement=createStatement)
-
-            createStatement = """
-CREATE TABLE `%(tableNamePrefix)s_spectra` (
-  `primaryId` bigint(20) NOT NULL AUTO_INCREMENT COMMENT 'An internal counter',
-  `TNSId` varchar(45) NOT NULL,
-  `TNSuser` varchar(45) DEFAULT NULL,
-  `dateCreated` datetime DEFAULT CURRENT_TIMESTAMP,
-  `exptime` double DEFAULT NULL,
-  `obsdate` datetime DEFAULT NULL,
-  `reportAddedDate` datetime DEFAULT NULL,
-  `specType` varchar(100) DEFAULT NULL,
-  `survey` varchar(100) DEFAULT NULL,
-  `telescope` varchar(100) DEFAULT NULL,
-  `transRedshift` double DEFAULT NULL,
-  `updated` tinyint(4) DEFAULT '0',
-  `dateLastModified` datetime DEFAULT NULL,
-  `remarks` VARCHAR(800) NULL DEFAULT NULL,
-  `sourceComment` VARCHAR(800) NULL DEFAULT NULL,
-  PRIMARY KEY (`primaryId`),
-  UNIQUE KEY `u_tnsid_survey_obsdate` (`TNSId`,`survey`,`obsdate`),
-  UNIQUE KEY `u_id_user_obsdate` (`TNSId`,`TNSuser`,`obsdate`)
-) ENGINE=InnoDB AUTO_INCREMENT=0 DEFAULT CHARSET=latin1;
-            """ % locals()
-
-            mysqlSpec = self.specResults.mysql(
-                tableNamePrefix + "_spectra", filepath=dirPath + "/" + p + "spec.sql", createStatement=createStatement)
-
-            createStatement = """
-CREATE TABLE `%(tableNamePrefix)s_files` (
-  `primaryId` bigint(20) NOT NULL AUTO_INCREMENT COMMENT 'An internal counter',
-  `TNSId` varchar(100) NOT NULL,
-  `dateCreated` datetime DEFAULT CURRENT_TIMESTAMP,
-  `dateObs` datetime DEFAULT NULL,
-  `filename` varchar(200) DEFAULT NULL,
-  `spec1phot2` tinyint(4) DEFAULT NULL,
-  `url` varchar(800) DEFAULT NULL,
-  `updated` tinyint(4) DEFAULT '0',
-  `dateLastModified` datetime DEFAULT NULL,
-  `comment` VARCHAR(800) NULL DEFAULT NULL,
-  PRIMARY KEY (`primaryId`),
-  UNIQUE KEY `tnsid_url` (`TNSId`,`url`)
-) ENGINE=InnoDB AUTO_INCREMENT=0 DEFAULT CHARSET=latin1;
-            """ % locals()
-
-            mysqlFiles = self.relatedFilesResults.mysql(
-                tableNamePrefix + "_files", filepath=dirPath + "/" + p + "relatedFiles.sql", createStatement=createStatement)
-        else:
-            mysqlSources = self.sourceResults.mysql(
-                tableNamePrefix + "_sources")
-            mysqlPhot = self.photResults.mysql(tableNamePrefix + "_photometry")
-            mysqlSpec = self.specResults.mysql(tableNamePrefix + "_spectra")
-            mysqlFiles = self.relatedFilesResults.mysql(
-                tableNamePrefix + "_files")
+        with self._rendering():
+            if dirPath:
+                p = self._file_prefix()
+
+                mysqlSources = self.sourceResults.mysql(
+                    tableNamePrefix + "_sources", filepath=dirPath + "/" + p + "sources.sql", createStatement=tableSchemas["sources"] % locals())
+                mysqlPhot = self.photResults.mysql(
+                    tableNamePrefix + "_photometry", filepath=dirPath + "/" + p + "phot.sql", createStatement=tableSchemas["photometry"] % locals())
+                mysqlSpec = self.specResults.mysql(
+                    tableNamePrefix + "_spectra", filepath=dirPath + "/" + p + "spec.sql", createStatement=tableSchemas["spectra"] % locals())
+                mysqlFiles = self.relatedFilesResults.mysql(
+                    tableNamePrefix + "_files", filepath=dirPath + "/" + p + "relatedFiles.sql", createStatement=tableSchemas["files"] % locals())
+            else:
+                mysqlSources = self.sourceResults.mysql(
+                    tableNamePrefix + "_sources")
+                mysqlPhot = self.photResults.mysql(tableNamePrefix + "_photometry")
+                mysqlSpec = self.specResults.mysql(tableNamePrefix + "_spectra")
+                mysqlFiles = self.relatedFilesResults.mysql(
+                    tableNamePrefix + "_files")
         return mysqlSources, mysqlPhot, mysqlSpec, mysqlFiles
 
+    def to_mysql(
+            self,
+            dbConn=False,
+            tableNamePrefix="TNS",
+            batchSize=2500):
+        """*Write the results straight into MySQL database tables*
+
+        Unlike `mysql`, no insert statements are rendered: rows are sent in batches of ``batchSize`` with upserting `executemany` inserts, each batch committed as one transaction. The four tables are created if they don't yet exist, and rows already in the tables (matched on `TNSId`, or `TNSId` and `url` for files etc.) are updated. If the search has not run yet, its results are streamed into the database rather than held in memory: transients are gathered until any of the four tables has ``batchSize`` rows waiting, and those rows are then written.
+
+        **Key Arguments**
+
+        - ``dbConn`` -- database connection. Default *False* (connect with the `database settings` in the settings file)
+        - ``tableNamePrefix`` -- the prefix for the database table names. Default *TNS*.
+        - ``batchSize`` -- the number of rows to write at a time. Default *2500*
+
+        **Return**
+
+        - ``sourceCount``, ``photCount``, ``specCount``, ``fileCount`` -- the number of rows written to each table
+
+        **Usage**
+
+        ```python
+        sourceCount, photCount, specCount, fileCount = tns.to_mysql(
+            dbConn=dbConn, tableNamePrefix="TNS")
+        ```
+        """
+        self.log.debug('starting the ``to_mysql`` method')
+
+        from transientNamer.commonutils.mysqlwriter import mysql_writer
+        writer = mysql_writer(
+            log=self.log,
+            dbConn=dbConn,
+            tableNamePrefix=tableNamePrefix,
+            settings=self.settings,
+            batchSize=batchSize
+        )
+        writer.create_tables()
+
+        if self._queried:
+            self._report_results()
+            with self.stats.timer("database"):
+                counts = writer.write(
+                    self.sourceResultsList, self.photResultsList, self.specResultsList, self.relatedFilesResultsList)
+        else:
+            counts = [0, 0, 0, 0]
+            batch = ([], [], [], [])
+            for page in self._iter_source_pages():
+                for transient in page:
+                    batch[0].append(transient[0])
+                    for rows, more in zip(batch[1:], transient[1:]):
+                        rows.extend(more)
+                    # A TRANSIENT CAN CARRY MANY PHOTOMETRY ROWS - COUNT THE
+                    # ROWS OF EVERY TABLE, NOT THE TRANSIENTS
+                    if max(len(rows) for rows in batch) >= batchSize:
+                        with self.stats.timer("database"):
+                            counts = [c + n for c, n in zip(counts, writer.write(*batch))]
+                        batch = ([], [], [], [])
+            with self.stats.timer("database"):
+                counts = [c + n for c, n in zip(counts, writer.write(*batch))]
+
+        self.log.debug('completed the ``to_mysql`` method')
+        return tuple(counts)
+
+    def _columnar(
+            self,
+            dirPath,
+            extension):
+        """*convert the four flavours of results to Arrow tables and save them to files with the given extension*"""
+        from transientNamer.commonutils.columnar import to_arrow_table, write_arrow_table
+        p = self._file_prefix()
+        tables = []
+        with self._rendering():
+            for rows, suffix in ((self.sourceResultsList, "sources"), (self.photResultsList, "phot"), (self.specResultsList, "spec"), (self.relatedFilesResultsList, "relatedFiles")):
+                table = to_arrow_table(log=self.log, rows=rows)
+                if dirPath:
+                    write_arrow_table(
+                        table, dirPath + "/" + p + suffix + "." + extension)
+                tables.append(table)
+        return tuple(tables)
+
     def _query_tns(self):
         """
         *determine how to query the TNS, send query and parse the results*
 
         **Return**
 
-        - ``results`` -- a list of dictionaries (one dictionary for each result set returned from the TNS)
+        - ``sourceTable`` -- a list of dictionaries (one dictionary for each transient returned from the TNS)
+        - ``resultPages`` -- a list of (``content``, ``TNSIds``) tuples, one for each results page, holding the raw page and the ids of the transients read from it, whose reports have not yet been parsed (see `_report_results`)
 
         """
         self.log.debug('starting the ``get`` method')
 
-        import time
-
         sourceTable = []
-        photoTable = []
-        specTable = []
-        relatedFilesTable = []
-
-        # THIS stop IS TO KEEP TRACK OF THE TNS PAGINATION IF MANY RESULT PAGES
-        # ARE RETURNED
-        stop = False
+        resultPages = []
+        for content, sources, transients in self._iter_parsed_pages():
+            sourceTable += sources
+            # KEEP ONLY THE RAW PAGE - THE ELEMENT TREES ARE FAR LARGER AND
+            # ARE REBUILT IF THE REPORTS ARE ASKED FOR
+            resultPages.append((content, [t[1] for t in transients]))
 
-        sourceCount = 0
-        failedCount = 0
-        while not stop:
-
-            status_code, content, self._searchURL = self._get_tns_search_results()
+        self.log.debug('completed the ``get`` method')
+        return self._sort_sources(sourceTable), resultPages
 
-            if status_code != 200:
-                # IF FAILED TOO MANY TIME - RETURN WHAT WE HAVE
-                if failedCount > 2:
-                    self.log.error(f'cound not get the search reuslts from the TNS, HTML error code {status_code}. Search URL was {self._searchURL}')
-                    raise ConnectionError(
-                        'cound not get the search reuslts from the TNS, HTML error code %(status_code)s ' % locals())
-                    return sourceTable, photoTable, specTable, relatedFilesTable
-                failedCount += 1
-                timesleep.sleep(2)
+    def _query_mirror(
+            self):
+        """
+        *answer the search from the local TNS mirror*
 
-                continue
+        **Return**
 
-            if "No results found" in content:
-                print("No results found")
-                return sourceTable, photoTable, specTable, relatedFilesTable
+        - ``sourceTable`` -- a list of dictionaries (one dictionary for each transient found in the mirror), as the TNS would return them
+        """
+        self.log.debug('starting the ``_query_mirror`` method')
+
+        self._resumeToken = None
+        self._queried = True
+
+        if self.queryType != "cone":
+            sourceTable = self._mirror.lookup_name(
+                self.name or self.internal_name)
+            self.log.debug('completed the ``_query_mirror`` method')
+            return sourceTable
+
+        raDeg, decDeg = sexagesimal_to_decimal(
+            log=self.log, ra=[self.ra], dec=[self.dec])
+        candidates = self._mirror.conesearch(
+            raDeg[0], decDeg[0], self.radiusArcsec)
+        angularSeparation, north, east = separations(
+            log=self.log,
+            ra1=self.ra,
+            dec1=self.dec,
+            ra2=[c["raDeg"] for c in candidates],
+            dec2=[c["decDeg"] for c in candidates]
+        )
 
-            if self._parse_transient_rows(content, True) < self.batchSize:
-                stop = True
-            else:
-                self.page += 1
-                thisPage = self.page
-                print(
-                    "Downloaded %(thisPage)s page(s) from the TNS. %(sourceCount)s transients parsed so far." % locals())
-                sourceCount += self.batchSize
-                # print "\t" + self._searchURL
-                timesleep.sleep(1)
-
-            # PARSE ALL ROWS RETURNED
-            index = 1
-            for transientRow in self._parse_transient_rows(content):
-
-                # TOP LEVEL DISCOVERY CONTENT
-                sourceContent = transientRow.group()
-
-                discInfo, TNSId = self._parse_discovery_information(
-                    sourceContent)
-                if 'survey' not in discInfo:
-                    discInfo['survey'] = None
-                sourceTable.append(discInfo)
-
-                # PHOTOMETERY
-                phot, relatedFiles = self._parse_photometry_data(
-                    sourceContent, TNSId)
-                photoTable += phot
-                relatedFilesTable += relatedFiles
+        sourceTable = [_with_separations(c, a, n, e) for c, a, n, e in zip(
+            candidates, angularSeparation, north, east) if float(a) <= float(self.radiusArcsec)]
 
-                # SPECTRA
-                spec, relatedFiles = self._parse_spectral_data(
-                    sourceContent, TNSId)
-                specTable += spec
-                relatedFilesTable += relatedFiles
+        self.log.debug('completed the ``_query_mirror`` method')
+        return self._sort_sources(sourceTable)
 
-        # SORT BY SEPARATION FROM THE SEARCH COORDINATES
+    def _sort_sources(
+            self,
+            sourceTable):
+        """*sort the transients found by separation from the search coordinates (conesearches only)*"""
         try:
             sourceTable = sorted(sourceTable, key=itemgetter(
                 'separationArcsec'), reverse=False)
         except:
             pass
+        return sourceTable
 
-        self.log.debug('completed the ``get`` method')
-        return sourceTable, photoTable, specTable, relatedFilesTable
+    def _source_order(
+            self,
+            separations):
+        """*the order `_sort_sources` puts the transients in, given their `separationArcsec` values (None where absent), as a list of indexes*"""
+        order = list(range(len(separations)))
+        try:
+            return sorted(order, key=separations.__getitem__)
+        except:
+            return order
 
-    def _get_tns_search_results(
+    def _iter_parsed_pages(
             self):
+        """*download the TNS search results page by page and parse the discovery data of the transients on each*
+
+        The reports (photometry and spectra) of the transients are not parsed; pass the transients to `_report_rows` when they are needed.
+
+        **Return**
+
+        - ``content``, ``sourceTable``, ``transients`` -- a generator with one tuple per results page: the HTML content of the page, a list of dictionaries of discovery data and the list of (``transient``, ``TNSId``) tuples returned by `_source_rows`
         """
-        *query the tns and result the response*
-        """
-        self.log.debug('starting the ``_get_tns_search_results`` method')
+        self.log.debug('starting the ``_iter_parsed_pages`` method')
 
+        self._resumeToken = None
+        self._queried = True
+        pages = self._iter_result_pages()
         try:
-            response = requests.get(
-                url="https://www.wis-tns.org/search",
-                params={
-                    "page": self.page,
-                    "ra": self.ra,
-                    "decl": self.dec,
-                    "radius": self.radiusArcsec,
-                    "name": self.name,
-                    "internal_name": self.internal_name,
-                    "discovered_period_units": self.period_units,
-                    "discovered_period_value": self.discInLastDays,
-                    "num_page": self.batchSize,
-                    "display[redshift]": "1",
-                    "display[hostname]": "1",
-                    "display[host_redshift]": "1",
-                    "display[source_group_name]": "1",
-                    "display[internal_name]": "1",
-                    "display[spectra_count]": "1",
-                    "display[discoverymag]": "1",
-                    "display[discmagfilter]": "1",
-                    "display[discoverydate]": "1",
-                    "display[discoverer]": "1",
-                    "display[sources]": "1",
-                    "display[bibcode]": "1",
-                },
-                headers={
-                    'User-Agent': self.settings["user-agent"]
-                }
-            )
+            for page, content, self._searchURL in pages:
+                parsed = self._read_results_page(page, content)
+                if parsed is None:
+                    return
+                sources, transients, more = parsed
+                # NEWLY REPORTED TRANSIENTS MAY NOW MATCH SEARCHES THAT
+                # PREVIOUSLY RETURNED NOTHING
+                self._invalidate_negative_cache(sources)
+                yield content, sources, transients
+                if not more:
+                    return
+        finally:
+            pages.close()
+            self.log.debug('completed the ``_iter_parsed_pages`` method')
+
+    def _read_results_page(
+            self,
+            page,
+            content):
+        """*parse the discovery data of the transients on one downloaded results page*
 
-        except requests.exceptions.RequestException:
-            print('HTTP Request failed')
+        **Key Arguments**
 
-        self.log.debug('completed the ``_get_tns_search_results`` method')
-        try:
-            # PYTHON 3
-            return response.status_code, str(response.content, 'utf-8'), response.url
-        except:
-            # PYTHON 2
-            return response.status_code, response.content, response.url
+        - ``page`` -- the page number
+        - ``content`` -- the HTML content of the page (*None* if it could not be downloaded)
 
-    def _file_prefix(
+        **Return**
+
+        - ``sources``, ``transients``, ``more`` -- a list of dictionaries of discovery data, the list of (``transient``, ``TNSId``) tuples returned by `_source_rows` and whether more pages follow. *None* if the search ends at this page with nothing to parse.
+        """
+        # RETRIES EXHAUSTED - KEEP WHAT WE HAVE AND RECORD WHERE TO RESUME
+        if content is None:
+            self._resumeToken = page
+            if self.cacheOnly:
+                self.log.debug(
+                    f'page {page} of this TNS search is not cached')
+                return None
+            self.log.error(
+                f'could not download page {page} of the TNS search results. Returning the results parsed so far; resume with `resumeToken={page}`')
+            return None
+
+        if "No results found" in content:
+            print("No results found")
+            return None
+
+        # EXTRACT THE TRANSIENT ROWS ONCE - THE SAME LIST DECIDES THE
+        # PAGINATION AND IS PARSED. THE REPORTS ARE LEFT UNTIL THEY ARE ASKED
+        # FOR
+        with self.stats.timer("extract"):
+            transients = parse_results_page(content, reports=False)
+        self.stats.count("pages")
+        self.stats.count("rows", len(transients))
+
+        # KEEP TRACK OF THE TNS PAGINATION IF MANY RESULT PAGES ARE RETURNED
+        more = len(transients) >= self.batchSize
+        if more:
+            sourceCount = (page - self._firstPage) * self.batchSize
+            self.page = page + 1
+            thisPage = self.page
+            print(
+                "Downloaded %(thisPage)s page(s) from the TNS. %(sourceCount)s transients parsed so far." % locals())
+
+        # PARSE ALL ROWS RETURNED
+        with self.stats.timer("discovery"):
+            sources, transients = self._source_rows(transients)
+
+        return sources, transients, more
+
+    def _invalidate_negative_cache(
+            self,
+            sources):
+        """*drop the cached 'No results found' searches that the transients just read from a page of recent discoveries would now match*
+
+        **Key Arguments**
+
+        - ``sources`` -- the dictionaries of discovery data read from the page
+        """
+        if self.queryType == "recent" and sources:
+            self._cache.invalidate_negative(sources)
+        return None
+
+    @contextmanager
+    def _rendering(
             self):
-        """*Generate a file prefix based on the type of search for saving files to disk*
+        """*run the search and parse its reports first, then time the code run inside the block as the `render` stage (so the search itself is not counted as rendering)*"""
+        self._report_results()
+        with self.stats.timer("render"):
+            yield
+
+    def _report_results(
+            self):
+        """*parse the photometry, spectra and related files of the transients found, the first time they are needed*
 
         **Return**
 
-        - ``prefix`` -- the file prefix
+        - ``photoTable``, ``specTable``, ``relatedFilesTable`` -- lists of dictionaries
+        """
+        if self._reportResultsLists is None and self._mirror is not None:
+            self._require_results()
+            self._reportResultsLists = self._mirror.reports(
+                [s["TNSId"] for s in self._sourceResultsList], comments=self.comments)
+        if self._reportResultsLists is None:
+            self._require_results()
+            photoTable = []
+            specTable = []
+            relatedFilesTable = []
+            for content, TNSIds in self._resultPages:
+                # RE-TOKENIZE THE PAGE; THE TRANSIENTS WHOSE DISCOVERY DATA
+                # COULD NOT BE READ WERE DROPPED BY `_source_rows`
+                with self.stats.timer("extract"):
+                    transients = [t for t in parse_results_page(
+                        content, reports=False) if t["source"] is not None]
+                phot, spec, relatedFiles = self._report_rows(
+                    content, list(zip(transients, TNSIds)))
+                photoTable += phot
+                specTable += spec
+                relatedFilesTable += relatedFiles
+            self._reportResultsLists = (
+                photoTable, specTable, relatedFilesTable)
+            # THE PAGES ARE NO LONGER NEEDED
+            self._resultPages = None
+        return self._reportResultsLists
+
+    def _renderer(
+            self,
+            resultsList):
+        """*a `list_of_dictionaries` renderer for one of the result lists, created the first time it is needed*
+
+        **Key Arguments**
 
+        - ``resultsList`` -- the name of the result list property (e.g. `sourceResultsList`)
         """
-        self.log.debug('starting the ``_file_prefix`` method')
+        if resultsList not in self._renderers:
+            self._renderers[resultsList] = list_of_dictionaries(
+                log=self.log,
+                listOfDictionaries=getattr(self, resultsList)
+            )
+        return self._renderers[resultsList]
 
-        if self.ra:
-            now = datetime.now()
-            prefix = now.strftime("%Y%m%dt%H%M%S%f_tns_conesearch_")
-        elif self.name:
-            prefix = self.name + "_tns_conesearch_"
-        elif self.internal_name:
-            prefix = self.internal_name + "_tns_conesearch_"
-        elif self.discInLastDays:
-            discInLastDays = str(self.discInLastDays)
-            now = datetime.now()
-            prefix = now.strftime(
-                discInLastDays + "d_since_%Y%m%d_tns_conesearch_")
+    def _iter_result_pages(
+            self):
+        """*generate the TNS search result pages in page order*
 
-        self.log.debug('completed the ``_file_prefix`` method')
-        return prefix
+        Pages are downloaded one at a time unless ``concurrentPages`` is set, in which case the first page is downloaded alone and, if the caller asks for more, the following pages are downloaded by a bounded pool of workers. Pages are always yielded in page order. Closing the generator cancels any pages not yet downloaded.
 
-    def _parse_transient_rows(
+        **Return**
+
+        - ``page``, ``content``, ``url`` -- the page number, the HTML content of the page and the URL it was downloaded from
+        """
+        self.log.debug('starting the ``_iter_result_pages`` method')
+
+        page = self._firstPage
+        content, url = self._download_results_page(page)
+        yield page, content, url
+        page += 1
+
+        if not self.concurrentPages or int(self.concurrentPages) < 2:
+            while True:
+                content, url = self._download_results_page(page)
+                yield page, content, url
+                page += 1
+
+        # MORE PAGES EXIST - KEEP A WINDOW OF `concurrentPages` DOWNLOADS IN
+        # FLIGHT AND HAND THEM BACK IN PAGE ORDER
+        workers = int(self.concurrentPages)
+        pending = collections.deque()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    while len(pending) < workers:
+                        pending.append((page, executor.submit(
+                            self._download_results_page, page)))
+                        page += 1
+                    thisPage, future = pending.popleft()
+                    content, url = future.result()
+                    yield thisPage, content, url
+            finally:
+                for thisPage, future in pending:
+                    future.cancel()
+
+    def _download_results_page(
             self,
-            content,
-            count=False):
-        """* parse transient rows from the TNS result page content*
+            page):
+        """*download a single page of TNS search results, retrying on failure*
 
         **Key Arguments**
 
-        - ``content`` -- the content from the TNS results page.
-        - ``count`` -- return only the number of rows
+        - ``page`` -- the index of the results page to download
 
+        **Return**
+
+        - ``content`` -- the HTML content of the results page (*None* if the page could not be downloaded within the retry limits, or is not cached when working offline)
+        - ``url`` -- the search URL for the page
+        """
+        self.log.debug('starting the ``_download_results_page`` method')
+
+        # TRY THE ON-DISK CACHE FIRST
+        cached, cacheParams = self._cached_results_page(page)
+        if cached:
+            return cached
+
+        # REQUESTS ARE PACED BY THE PROCESS-WIDE TNS RATE LIMITER (SEE THE
+        # `tns rate limit` SETTINGS). FAILURES BACK OFF EXPONENTIALLY (SEE THE
+        # `tns retries` SETTINGS)
+        policy = retry_policy(self.settings)
+        attempt = 0
+        while True:
+            status_code, content, url, retryAfter = self._get_tns_search_results(
+                page)
+            if status_code == 200:
+                break
+            delay = self._retry_delay(
+                policy, attempt, page, status_code, url, retryAfter)
+            if delay is None:
+                content = None
+                break
+            timesleep.sleep(delay)
+            attempt += 1
+
+        self._cache_results_page(page, cacheParams, content, url)
+
+        self.log.debug('completed the ``_download_results_page`` method')
+        return content, url
+
+    def _cached_results_page(
+            self,
+            page):
+        """*answer a results page from the on-disk cache, if possible*
+
+        **Key Arguments**
+
+        - ``page`` -- the index of the results page
 
         **Return**
 
-        - ``transientRows``
+        - ``cached`` -- the (``content``, ``url``) of the page if it can be answered without contacting the TNS (``content`` is *None* if the page is not cached and the TNS must not be contacted), else *None*
+        - ``cacheParams`` -- the parameters the page is cached under
+        """
+        params = self._search_params(page)
+        cacheParams = dict(params)
+        cacheParams["base url"] = tnssession(self.settings).baseUrl
+        cached = None
+        if self._negative_cacheable(page):
+            cached = self._cache.get_negative(cacheParams)
+        cached = cached or self._cache.get(cacheParams, self.queryType)
+        if cached:
+            self.stats.count("cache hits")
+            return (cached["content"], cached["url"]), cacheParams
+        if self.cacheOnly:
+            return (None, self._search_url(params)), cacheParams
+        if self._cache.offline:
+            url = self._search_url(params)
+            self.log.warning(
+                f'working offline and page {page} of this TNS search is not cached')
+            return (None, url), cacheParams
+        return None, cacheParams
+
+    def _retry_delay(
+            self,
+            policy,
+            attempt,
+            page,
+            status_code,
+            url,
+            retryAfter):
+        """*decide whether (and when) to retry a failed results page request*
+
+        **Key Arguments**
+
+        - ``policy`` -- the `retry_policy`
+        - ``attempt`` -- the number of retries already made
+        - ``page`` -- the index of the results page
+        - ``status_code``, ``url``, ``retryAfter`` -- the HTTP status, URL and `Retry-After` header of the failed request
 
+        **Return**
+
+        - ``delay`` -- the number of seconds to wait before retrying, or *None* to give up
         """
-        self.log.debug('starting the ``_parse_transient_rows`` method')
+        # IF FAILED TOO MANY TIME - GIVE UP
+        if not policy.should_retry(attempt):
+            self.log.error(f'cound not get the search reuslts from the TNS, HTML error code {status_code}. Search URL was {url}')
+            return None
+
+        delay = policy.delay(attempt, retryAfter=retryAfter)
+        self.stats.count("retries")
+        if status_code == 429:
+            # THROTTLED - HOLD BACK ALL OTHER TNS REQUESTS TOO
+            tnssession(self.settings).rateLimiter.pause(delay)
+        self.log.warning(
+            f'TNS search page {page} failed (HTML error code {status_code}). Retrying in {delay:0.1f}s')
+        return delay
+
+    def _cache_results_page(
+            self,
+            page,
+            cacheParams,
+            content,
+            url):
+        """*cache a downloaded results page on disk (as a negative entry if a name or cone search found nothing at all)*
 
-        regexForRow = r"""\n([^\n]*?<td class=\"cell-id\" column=\"id\">.*?)(?=\n[^\n]*?<td class=\"cell-id\" column=\"id\">|<nav class=\"pager\")"""
+        Only the first page of a name or cone search that finds nothing is a negative result. The empty page that ends every paginated search (or that `concurrentPages` downloads ahead of it) is cached like any other page, with the time-to-live of its query type.
+        """
+        if content is None:
+            return
+        if "No results found" in content and self._negative_cacheable(page):
+            self._cache.put_negative(
+                cacheParams, url=url, constraints=self._search_constraints())
+        else:
+            self._cache.put(cacheParams, self.queryType,
+                            content=content, url=url)
 
-        if count:
-            # A SINGLE SOURCE BLOCK
-            matchedSources = re.findall(
-                regexForRow,
-                content,
-                flags=re.S  # re.S
-            )
-            return len(matchedSources)
+    def _negative_cacheable(
+            self,
+            page):
+        """*can this results page be answered from (or recorded as) a negative cache entry? Only the first page of a name or cone search*"""
+        return page == 0 and self.queryType != "recent"
 
-        # A SINGLE SOURCE BLOCK
-        matchedSources = re.finditer(
-            regexForRow,
+    def _parse_results_page(
+            self,
             content,
-            flags=re.S  # re.S
-        )
+            transients=None):
+        """*parse all transient rows from one page of TNS search results*
+
+        The page is walked once by the single-pass parser in `commonutils.resultsparser`, which reads the discovery information, AT reports (photometry) and classification reports (spectra) of every transient together.
 
-        self.log.debug('completed the ``_parse_transient_rows`` method')
-        return matchedSources
+        **Key Arguments**
+
+        - ``content`` -- the HTML content of the results page
+        - ``transients`` -- the transient rows already extracted from the page by `parse_results_page`. Default *None* (extract them from ``content``)
+
+        **Return**
 
-    def _parse_discovery_information(
+        - ``sourceTable``, ``photoTable``, ``specTable``, ``relatedFilesTable`` -- lists of dictionaries parsed from the page
+        """
+        self.log.debug('starting the ``_parse_results_page`` method')
+
+        if transients is None:
+            transients = parse_results_page(content)
+
+        sourceTable, transients = self._source_rows(transients)
+        photoTable, specTable, relatedFilesTable = self._report_rows(
+            content, transients)
+
+        self.log.debug('completed the ``_parse_results_page`` method')
+        return sourceTable, photoTable, specTable, relatedFilesTable
+
+    def _source_rows(
             self,
-            content):
-        """* parse discovery information from one row on the TNS results page*
+            transients):
+        """*build the top-level discovery data of the transients extracted from a results page*
 
         **Key Arguments**
 
-        - ``content`` -- a table row from the TNS results page.
+        - ``transients`` -- the transient rows extracted from the page by `parse_results_page`
 
+        **Return**
+
+        - ``sourceTable`` -- list of dictionaries of discovery data
+        - ``transients`` -- list of (``transient``, ``TNSId``) tuples for the transients that could be read, to pass to `_report_rows`
+        """
+        self.log.debug('starting the ``_source_rows`` method')
+
+        # CONVERT ALL COORDINATES ON THE PAGE (AND SEPARATIONS FOR A
+        # CONESEARCH) IN ONE PASS
+        readable = []
+        for transient in transients:
+            if transient["source"] is None:
+                self.log.warning(
+                    'could not read the discovery information of a transient on the TNS results page')
+                continue
+            readable.append(transient)
+        with self.stats.timer("coordinates"):
+            coordinates = self._discovery_coordinates(
+                [t["source"] for t in readable])
+
+        sourceTable = []
+        transients = []
+        for transient, coords in zip(readable, coordinates):
+            discInfo = self._discovery_row(
+                transient["source"], coordinates=coords)
+            if 'survey' not in discInfo:
+                discInfo['survey'] = None
+            sourceTable.append(discInfo)
+            transients.append((transient, discInfo["TNSId"]))
+
+        self.log.debug('completed the ``_source_rows`` method')
+        return sourceTable, transients
+
+    def _report_rows(
+            self,
+            content,
+            transients):
+        """*build the photometry, spectra and related files of the transients extracted from a results page*
+
+        **Key Arguments**
+
+        - ``content`` -- the HTML content of the results page
+        - ``transients`` -- list of (``transient``, ``TNSId``) tuples returned by `_source_rows`
 
         **Return**
 
-        - ``discoveryData`` -- dictionary of results
-        - ``TNSId`` -- the unique TNS id for the transient
+        - ``photoTable``, ``specTable``, ``relatedFilesTable`` -- lists of dictionaries
+        """
+        self.log.debug('starting the ``_report_rows`` method')
+
+        photoTable = []
+        specTable = []
+        relatedFilesTable = []
+        for transient, TNSId in transients:
+            if "atReports" not in transient:
+                with self.stats.timer("extract"):
+                    read_reports(content, transient)
+
+            # PHOTOMETERY
+            with self.stats.timer("photometry"):
+                for header, phot in transient["atReports"]:
+                    phot, relatedFiles = self._photometry_rows(
+                        header, phot, transient["atFiles"], TNSId)
+                    photoTable += phot
+                    relatedFilesTable += relatedFiles
+
+            # SPECTRA
+            with self.stats.timer("spectra"):
+                for header, spec in transient["classReports"]:
+                    spec, relatedFiles = self._spectral_rows(
+                        header, spec, transient["classFiles"], TNSId)
+                    specTable += spec
+                    relatedFilesTable += relatedFiles
+
+        self.log.debug('completed the ``_report_rows`` method')
+        return photoTable, specTable, relatedFilesTable
 
+    def _get_tns_search_results(
+            self,
+            page=None):
         """
-        self.log.debug('starting the ``_parse_discovery_information`` method')
+        *query the tns and result the response*
 
-        # ASTROCALC UNIT CONVERTER OBJECT
-        from astrocalc.coords import unit_conversion
-        converter = unit_conversion(
-            log=self.log
-        )
+        **Key Arguments**
 
-        matches = re.finditer(
-            r"""<td class=\"cell-id\" column=.*?>(?P<tnsId>\d*?)</td>\s*<td class=\"cell-name\"><a href=\"(?P<objectUrl>.*?)\">(?P<TNSName>.*?)</a></td>\s*?<td class=\"cell-.*?<td class=\"cell-ra\" column=.*?>(?P<raSex>.*?)</td>\s*<td class=\"cell-decl\" column=.*?>(?P<decSex>.*?)</td>\s*<td class=\"cell-objtype_name\" column=.*?>(?P<specType>.*?)</td>\s*<td class=\"cell-redshift\">(?P<transRedshift>.*?)</td>\s*<td class=\"cell-hostname\" column=.*?>(?P<hostName>.*?)</td>\s*<td class=\"cell-host_redshift\" column=.*?>(?P<hostRedshift>.*?)</td>\s*<td class=\"cell-reporting_group_name\" column=.*?>(?P<reportingSurvey>.*?)</td>\s*<td class=\"cell-source_group_name\" column=.*?>(?P<discSurvey>.*?)</td>.*?<td class=\"cell-internal_name\" column=.*?>(<a.*?>)?(?P<discoveryName>.*?)(</a>)?</td>.*?<td class=\"cell-discoverymag\" column=.*?>(?P<discMag>.*?)</td>\s*<td class=\"cell-disc_filter_name\" column=.*?>(?P<discMagFilter>.*?)</td>\s*<td class=\"cell-discoverydate\" column=.*?>(?P<discDate>.*?)</td>\s*<td class=\"cell-discoverer\" column=.*?>(?P<sender>.*?)</td>.*?</tr>""",
-            content,
-            flags=re.S  # re.S
-        )
-        discoveryData = []
-
-        # # COUNT THE NUMBER OF MATCHES
-        # number_of_matches = sum(1 for _ in matches)
-
-        for match in matches:
-            row = match.groupdict()
-
-            for k, v in list(row.items()):
-                row[k] = v.strip()
-                if len(v) == 0:
-                    row[k] = None
-            if row["transRedshift"] == 0:
-                row["transRedshift"] = None
-            if row["TNSName"][0] in ["1", "2"]:
-                row["TNSName"] = "SN" + row["TNSName"]
-
-            if "https://" not in row["objectUrl"]:
-                row["objectUrl"] = "https://www.wis-tns.org" + \
-                    row["objectUrl"]
-
-            # CONVERT COORDINATES TO DECIMAL DEGREES
-            row["raDeg"] = converter.ra_sexegesimal_to_decimal(
-                ra=row["raSex"]
-            )
-            row["decDeg"] = converter.dec_sexegesimal_to_decimal(
-                dec=row["decSex"]
-            )
+        - ``page`` -- the index of the results page to request. Default *None* (use the current page)
+
+        **Return**
+
+        - ``status_code``, ``content``, ``url``, ``retryAfter`` -- the HTTP status (*None* if the request itself failed), the page content, the search URL and any `Retry-After` header sent by the TNS
+        """
+        self.log.debug('starting the ``_get_tns_search_results`` method')
+
+        if page is None:
+            page = self.page
 
-            # IF THIS IS A COORDINATE SEARCH, ADD SEPARATION FROM
-            # ORIGINAL QUERY COORDINATES
-            if self.ra:
-                # CALCULATE SEPARATION IN ARCSEC
-                from astrocalc.coords import separations
-                calculator = separations(
-                    log=self.log,
-                    ra1=self.ra,
-                    dec1=self.dec,
-                    ra2=row["raDeg"],
-                    dec2=row["decDeg"],
+        session = tnssession(self.settings)
+        params = self._search_params(page)
+        self.stats.count("requests")
+        try:
+            with self.stats.timer("http"):
+                response = session.get(
+                    url=session.baseUrl + "/search",
+                    params=params
                 )
-                angularSeparation, north, east = calculator.get()
-                row["separationArcsec"] = angularSeparation
-                row["separationNorthArcsec"] = north
-                row["separationEastArcsec"] = east
-
-            if not row["discSurvey"]:
-                row["survey"] = row["sender"]
-
-            del row["sender"]
-            del row["tnsId"]
-            row["TNSName"] = row["TNSName"].replace(" ", "")
-            row["TNSId"] = row["TNSName"].replace(
-                "SN", "").replace("AT", "")
-            TNSId = row["TNSId"]
-
-            # ORDER THE DICTIONARY FOR THIS ROW OF RESULTS
-            orow = collections.OrderedDict()
-            keyOrder = ["TNSId", "TNSName", "discoveryName", "discSurvey", "raSex", "decSex", "raDeg", "decDeg",
-                        "transRedshift", "specType", "discMag", "discMagFilter", "discDate", "objectUrl", "hostName", "hostRedshift", "separationArcsec", "separationNorthArcsec", "separationEastArcsec"]
-            for k, v in list(row.items()):
-                if k not in keyOrder:
-                    keyOrder.append(k)
-            for k in keyOrder:
-                try:
-                    orow[k] = row[k]
-                except:
-                    self.log.info(
-                        "`%(k)s` not found in the source data for %(TNSId)s" % locals())
-                    pass
-            discoveryData.append(row)
-
-        self.log.debug('completed the ``_parse_discovery_information`` method')
-        return discoveryData[0], TNSId
-
-    def _parse_photometry_data(
+        except requests.exceptions.RequestException as e:
+            print('HTTP Request failed')
+            self.log.warning(f'TNS search request failed: {e}')
+            return None, "", self._search_url(params), None
+        self.stats.count("bytes", len(response.content))
+
+        self.log.debug('completed the ``_get_tns_search_results`` method')
+        return response.status_code, str(response.content, 'utf-8'), response.url, response.headers.get("Retry-After")
+
+    def _search_params(
             self,
-            content,
-            TNSId):
-        """*parse photometry data from a row in the tns results content*
+            page):
+        """*the full set of TNS search request parameters for a page of results*
 
         **Key Arguments**
 
-         - ``content`` -- a table row from the TNS results page
-         - ``TNSId`` -- the tns id of the transient
+        - ``page`` -- the index of the results page
 
+        **Return**
+
+        - ``params`` -- dictionary of request parameters
+        """
+        params = {
+            "page": page,
+            "ra": self.ra,
+            "decl": self.dec,
+            "radius": self.radiusArcsec,
+            "name": self.name,
+            "internal_name": self.internal_name,
+            "discovered_period_units": self.period_units,
+            "discovered_period_value": self.discInLastDays,
+            "num_page": self.batchSize,
+            "display[redshift]": "1",
+            "display[hostname]": "1",
+            "display[host_redshift]": "1",
+            "display[source_group_name]": "1",
+            "display[internal_name]": "1",
+            "display[spectra_count]": "1",
+            "display[discoverymag]": "1",
+            "display[discmagfilter]": "1",
+            "display[discoverydate]": "1",
+            "display[discoverer]": "1",
+            "display[sources]": "1",
+            "display[bibcode]": "1",
+        }
+        return params
+
+    def _search_constraints(
+            self):
+        """*the search constraints recorded with a negative (no results) cache entry*
 
         **Return**
 
-        - ``photData`` -- a list of dictionaries of the photometry data
-        - ``relatedFilesTable`` -- a list of dictionaries of transient photometry related files 
+        - ``constraints`` -- dictionary of cone centre and radius in decimal degrees and arcsec, or the searched name
+        """
+        constraints = {}
+        if self.queryType == "cone":
+            raDeg, decDeg = sexagesimal_to_decimal(
+                log=self.log,
+                ra=[self.ra],
+                dec=[self.dec]
+            )
+            constraints["raDeg"] = raDeg[0]
+            constraints["decDeg"] = decDeg[0]
+            constraints["radiusArcsec"] = float(self.radiusArcsec)
+        if self.name:
+            constraints["name"] = self.name
+        if self.internal_name:
+            constraints["internal_name"] = self.internal_name
+        return constraints
 
+    def _search_url(
+            self,
+            params):
+        """*the URL a TNS search request with these parameters is sent to*
+
+        **Key Arguments**
+
+        - ``params`` -- dictionary of request parameters
         """
-        self.log.debug('starting the ``_parse_photometry_data`` method')
+        session = tnssession(self.settings)
+        return requests.Request(
+            "GET", session.baseUrl + "/search", params=params).prepare().url
 
-        photData = []
-        relatedFilesTable = []
+    def _file_prefix(
+            self):
+        """*Generate a file prefix based on the type of search for saving files to disk*
 
-        # AT REPORT BLOCK
-        ATBlock = re.search(
-            r"""<td class=[^\n]*?AT reports.*?(?=<td class=[^\n]*?Classification reports|$)""",
-            content,
-            flags=re.S  # re.S
-        )
+        **Return**
 
-        if ATBlock:
-            ATBlock = ATBlock.group()
-            reports = re.finditer(
-                r"""(<tbody>|</tr>)\s*<tr class=\"row-[^\"]*\">\s*<td class=\"cell-id\">.*?</tbody>""",
-                ATBlock,
-                flags=re.S  # re.S
-            )
+        - ``prefix`` -- the file prefix
 
-            relatedFiles = self._parse_related_files(ATBlock)
+        """
+        self.log.debug('starting the ``_file_prefix`` method')
 
-            for r in reports:
+        if self.queryType == "cone":
+            now = datetime.now()
+            prefix = now.strftime("%Y%m%dt%H%M%S%f_tns_conesearch_")
+        elif self.name:
+            prefix = self.name + "_tns_conesearch_"
+        elif self.internal_name:
+            prefix = self.internal_name + "_tns_conesearch_"
+        elif self.discInLastDays:
+            discInLastDays = str(self.discInLastDays)
+            now = datetime.now()
+            prefix = now.strftime(
+                discInLastDays + "d_since_%Y%m%d_tns_conesearch_")
 
-                header = re.search(
-                    r"""<tr class=\"row[^\"]*\".*?time_received\">(?P<reportAddedDate>[^<]*).*?user_name\">(?P<sender>[^<]*).*?reporter_name\"( title=\".*?\")?>(?P<reporters>[^<]*).*?reporting_group_name\">(?P<reportingGroup>[^<]*).*?source_group_name\">(?P<surveyGroup>[^<]*).*?ra\">(?P<ra>[^<]*).*?decl\">(?P<dec>[^<]*).*?discovery_date\">(?P<obsDate>[^<]*).*?flux\">(?P<mag>[^<]*).*?filter_name\">(?P<magFilter>[^<]*).*?related_files\">(?P<relatedFiles>[^<]*).*?type_name\">(?P<suggestedType>[^<]*).*?hostName\">(?P<hostName>[^<]*).*?(host_redshift\">(?P<hostRedshift>[^<]*))?.*?internal_name\">(?P<objectName>[^<]*).*?groups\">(?P<survey>[^<]*).*?remarks\">(?P<sourceComment>[^<]*)""",
-                    r.group(),
-                    flags=re.S  # re.S
-                )
-                try:
-                    header = header.groupdict()
-                except:
-                    print(r.group())
-
-                header["TNSId"] = TNSId
-
-                del header["reporters"]
-                del header["surveyGroup"]
-                del header["hostName"]
-                del header["hostRedshift"]
-                del header["mag"]
-                del header["magFilter"]
-                del header["obsDate"]
-                del header["ra"]
-                del header["dec"]
-
-                if not self.comments:
-                    del header['sourceComment']
-                else:
-                    theseComments = header[
-                        "sourceComment"].split("\n")
-                    header["sourceComment"] = ""
-                    for c in theseComments:
-                        header["sourceComment"] += " " + c.strip()
-                    header["sourceComment"] = header[
-                        "sourceComment"].strip()[0:750]
-
-                phot = re.finditer(
-                    r"""<tr class=\"row\-[^\"]*\".*?obsdate\">(?P<obsdate>[^<]*).*?flux\">(?P<mag>[^<]*).*?fluxerr\">(?P<magErr>[^<]*).*?limflux\">(?P<limitingMag>[^<]*).*?unit_name\">(?P<magUnit>[^<]*).*?filter_name\">(?P<filter>[^<]*).*?tel_inst\">(?P<telescope>[^<]*).*?exptime\">(?P<exptime>[^<]*).*?observer\">(?P<observer>[^<]*).*?-remarks\">(?P<remarks>[^<]*)""",
-                    r.group(),
-                    flags=re.S  # re.S
-                )
-                filesAppended = False
-                for p in phot:
-                    p = p.groupdict()
-                    del p["observer"]
-
-                    if "date" in p["obsdate"]:
-                        continue
-
-                    if p["limitingMag"] and not p["mag"]:
-                        p["mag"] = p["limitingMag"]
-                        p["limitingMag"] = 1
-                        p["remarks"] = p["remarks"].replace(
-                            "[Last non detection]", "")
-                    else:
-                        p["limitingMag"] = 0
-
-                    if not self.comments:
-                        del p["remarks"]
-
-                    p.update(header)
-
-                    if p["relatedFiles"] and filesAppended == False:
-                        filesAppended = True
-                        for f in relatedFiles:
-                            # ORDER THE DICTIONARY FOR THIS ROW OF
-                            # RESULTS
-                            thisFile = collections.OrderedDict()
-                            thisFile["TNSId"] = TNSId
-                            thisFile["filename"] = f[
-                                "filepath"].split("/")[-1]
-                            thisFile["url"] = f["filepath"]
-                            if self.comments:
-                                thisFile["comment"] = f[
-                                    "fileComment"].replace("\n", " ")[0:750]
-                            thisFile["dateObs"] = p["obsdate"]
-                            thisFile["spec1phot2"] = 2
-                            relatedFilesTable.append(thisFile)
-
-                    if not p["survey"] and not p["objectName"]:
-                        p["survey"] = p["sender"]
-
-                    del p["relatedFiles"]
-                    del p["sender"]
-
-                    # ORDER THE DICTIONARY FOR THIS ROW OF RESULTS
-                    orow = collections.OrderedDict()
-                    keyOrder = ["TNSId", "survey", "obsdate", "filter", "limitingMag", "mag", "magErr",
-                                "magUnit", "suggestedType", "telescope", "exptime", "reportAddedDate"]
-                    for k, v in list(p.items()):
-                        if k not in keyOrder:
-                            keyOrder.append(k)
-                    for k in keyOrder:
-                        try:
-                            orow[k] = p[k]
-                        except:
-                            self.log.info(
-                                "`%(k)s` not found in the source data for %(TNSId)s" % locals())
-                            pass
-
-                    photData.append(orow)
-
-        self.log.debug('completed the ``_parse_photometry_data`` method')
-        return photData, relatedFilesTable
+        self.log.debug('completed the ``_file_prefix`` method')
+        return prefix
 
-    def _parse_related_files(
+    def _discovery_coordinates(
             self,
-            content):
-        """*parse the contents for related files URLs and comments*
+            rows):
+        """*convert the coordinates of all discovery rows on a results page to decimal degrees (and calculate separations for a conesearch) in one pass*
 
         **Key Arguments**
 
-        - ``content`` -- the content to parse.
-
+        - ``rows`` -- list of dictionaries of raw values read from the page
 
         **Return**
 
-        - ``relatedFiles`` -- a list of dictionaries of transient related files 
-
+        - ``coordinates`` -- list of dictionaries of `raDeg` and `decDeg` (plus `separationArcsec`, `separationNorthArcsec` and `separationEastArcsec` for a conesearch), one per row
         """
-        self.log.debug('starting the ``_parse_related_files`` method')
+        self.log.debug('starting the ``_discovery_coordinates`` method')
 
-        relatedFilesList = re.finditer(
-            r"""<td class=\"cell-filename\">.*?href=\"(?P<filepath>[^\"]*).*?remarks\">(?P<fileComment>[^<]*)""",
-            content,
-            flags=re.S  # re.S
+        raDeg, decDeg = sexagesimal_to_decimal(
+            log=self.log,
+            ra=[r["raSex"].strip() for r in rows],
+            dec=[r["decSex"].strip() for r in rows]
         )
+        coordinates = [{"raDeg": r, "decDeg": d}
+                       for r, d in zip(raDeg, decDeg)]
+
+        # IF THIS IS A COORDINATE SEARCH, ADD SEPARATION FROM
+        # ORIGINAL QUERY COORDINATES
+        if self.queryType == "cone" and rows:
+            angularSeparation, north, east = separations(
+                log=self.log,
+                ra1=self.ra,
+                dec1=self.dec,
+                ra2=raDeg,
+                dec2=decDeg
+            )
+            for c, a, n, e in zip(coordinates, angularSeparation, north, east):
+                c["separationArcsec"] = a
+                c["separationNorthArcsec"] = n
+                c["separationEastArcsec"] = e
 
-        relatedFiles = []
-        for f in relatedFilesList:
-            f = f.groupdict()
-            relatedFiles.append(f)
+        self.log.debug('completed the ``_discovery_coordinates`` method')
+        return coordinates
 
-        self.log.debug('completed the ``_parse_related_files`` method')
-        return relatedFiles
+    def _discovery_row(
+            self,
+            row,
+            coordinates):
+        """*clean a row of discovery information read from the TNS results page and add decimal coordinates (and separations for a conesearch)*
 
-    def _parse_spectral_data(
+        **Key Arguments**
+
+        - ``row`` -- dictionary of raw values read from the page
+        - ``coordinates`` -- the coordinates (and separations) of this row calculated by `_discovery_coordinates`
+
+        **Return**
+
+        - ``row`` -- the cleaned dictionary of discovery information
+        """
+        for k, v in list(row.items()):
+            row[k] = v.strip()
+            if len(v) == 0:
+                row[k] = None
+        if row["transRedshift"] == 0:
+            row["transRedshift"] = None
+        if row["TNSName"][0] in ["1", "2"]:
+            row["TNSName"] = "SN" + row["TNSName"]
+
+        if "https://" not in row["objectUrl"]:
+            row["objectUrl"] = "https://www.wis-tns.org" + \
+                row["objectUrl"]
+
+        row.update(coordinates)
+
+        if not row["discSurvey"]:
+            row["survey"] = row["sender"]
+
+        del row["sender"]
+        del row["tnsId"]
+        row["TNSName"] = row["TNSName"].replace(" ", "")
+        row["TNSId"] = row["TNSName"].replace(
+            "SN", "").replace("AT", "")
+        return row
+
+    def _photometry_rows(
             self,
-            content,
+            header,
+            phot,
+            relatedFiles,
             TNSId):
-        """*parse spectra data from a row in the tns results content*
+        """*clean the header and photometry rows of one AT report read from the TNS results page*
 
         **Key Arguments**
 
-         - ``content`` -- a table row from the TNS results page
-         - ``TNSId`` -- the tns id of the transient
+        - ``header`` -- dictionary of raw values read from the report header
+        - ``phot`` -- list of dictionaries of raw values read from the photometry rows of the report
+        - ``relatedFiles`` -- the related files listed in the AT reports of the transient
+        - ``TNSId`` -- the tns id of the transient
 
+        **Return**
+
+        - ``photData`` -- a list of dictionaries of the photometry data
+        - ``relatedFilesTable`` -- a list of dictionaries of transient photometry related files
+        """
+        photData = []
+        relatedFilesTable = []
+        header = dict(header)
+
+        header["TNSId"] = TNSId
+
+        del header["reporters"]
+        del header["surveyGroup"]
+        del header["hostName"]
+        del header["hostRedshift"]
+        del header["mag"]
+        del header["magFilter"]
+        del header["obsDate"]
+        del header["ra"]
+        del header["dec"]
+
+        if not self.comments:
+            del header['sourceComment']
+        else:
+            theseComments = header[
+                "sourceComment"].split("\n")
+            header["sourceComment"] = ""
+            for c in theseComments:
+                header["sourceComment"] += " " + c.strip()
+            header["sourceComment"] = header[
+                "sourceComment"].strip()[0:750]
+
+        filesAppended = False
+        for p in phot:
+            p = dict(p)
+            del p["observer"]
+
+            if "date" in p["obsdate"]:
+                continue
+
+            if p["limitingMag"] and not p["mag"]:
+                p["mag"] = p["limitingMag"]
+                p["limitingMag"] = 1
+                p["remarks"] = p["remarks"].replace(
+                    "[Last non detection]", "")
+            else:
+                p["limitingMag"] = 0
+
+            if not self.comments:
+                del p["remarks"]
+
+            p.update(header)
+
+            if p["relatedFiles"] and filesAppended == False:
+                filesAppended = True
+                for f in relatedFiles:
+                    # ORDER THE DICTIONARY FOR THIS ROW OF
+                    # RESULTS
+                    thisFile = {}
+                    thisFile["TNSId"] = TNSId
+                    thisFile["filename"] = f[
+                        "filepath"].split("/")[-1]
+                    thisFile["url"] = f["filepath"]
+                    if self.comments:
+                        thisFile["comment"] = f[
+                            "fileComment"].replace("\n", " ")[0:750]
+                    thisFile["dateObs"] = p["obsdate"]
+                    thisFile["spec1phot2"] = 2
+                    relatedFilesTable.append(thisFile)
+
+            if not p["survey"] and not p["objectName"]:
+                p["survey"] = p["sender"]
+
+            del p["relatedFiles"]
+            del p["sender"]
+
+            photData.append(_ordered(p, _photKeyOrder))
+
+        return photData, relatedFilesTable
+
+    def _spectral_rows(
+            self,
+            header,
+            spec,
+            relatedFiles,
+            TNSId):
+        """*clean the header and spectra rows of one classification report read from the TNS results page*
+
+        **Key Arguments**
+
+        - ``header`` -- dictionary of raw values read from the report header
+        - ``spec`` -- list of dictionaries of raw values read from the spectra rows of the report
+        - ``relatedFiles`` -- the related files listed in the classification reports of the transient
+        - ``TNSId`` -- the tns id of the transient
 
         **Return**
 
         - ``specData`` -- a list of dictionaries of the spectral data
-        - ``relatedFilesTable`` -- a list of dictionaries of transient spectrum related files 
-
+        - ``relatedFilesTable`` -- a list of dictionaries of transient spectrum related files
         """
-        self.log.debug('starting the ``_parse_spectral_data`` method')
-
         specData = []
         relatedFilesTable = []
+        header = dict(header)
 
-        # CLASSIFICATION BLOCK
-        classBlock = re.search(
-            r"""<div class=[^\n]*?Classification reports.*$""",
-            content,
-            flags=re.S  # re.S
-        )
-
-        if classBlock:
+        header["TNSId"] = TNSId
 
-            classBlock = classBlock.group()
+        del header["reporters"]
+        del header["surveyGroup"]
+        del header["survey"]
 
-            reports = re.finditer(
-                r"""<tr class=\"row-[^\"]*\">\s*<td class=\"cell-id\">.*?</tbody>\s*</table>""",
-                classBlock,
-                flags=re.S  #
-            )
+        if not self.comments:
+            del header['sourceComment']
+        else:
+            theseComments = header[
+                "sourceComment"].split("\n")
+            header["sourceComment"] = ""
+            for c in theseComments:
+                header["sourceComment"] += " " + c.strip()
+            header["sourceComment"] = header[
+                "sourceComment"]
+
+        filesAppended = False
+        for s in spec:
+
+            s = dict(s)
+            del s["sender"]
+            del s["surveyGroup"]
+            del s["reducer"]
+
+            if not self.comments:
+                del s["remarks"]
+            else:
+                s["remarks"] = s["remarks"].replace('"', "'")[0:750]
+
+            s.update(header)
+
+            if s["relatedFiles"] and filesAppended == False:
+                filesAppended = True
+                for f in relatedFiles:
+                    # ORDER THE DICTIONARY FOR THIS ROW OF
+                    # RESULTS
+                    thisFile = {}
+                    thisFile["TNSId"] = TNSId
+                    thisFile["filename"] = f[
+                        "filepath"].split("/")[-1]
+                    thisFile["url"] = f["filepath"]
+                    if self.comments:
+                        thisFile["comment"] = f[
+                            "fileComment"].replace("\n", " ").strip()
+                    thisFile["dateObs"] = s["obsdate"]
+                    thisFile["spec1phot2"] = 1
+                    relatedFilesTable.append(thisFile)
+
+            for ffile in [s["filepath"], s["fitsFilepath"]]:
+                if ffile:
+                    # ORDER THE DICTIONARY FOR THIS ROW OF
+                    # RESULTS
+                    thisFile = {}
+                    thisFile["TNSId"] = TNSId
+                    thisFile["filename"] = ffile.split(
+                        "/")[-1]
+                    thisFile["url"] = ffile
+                    if self.comments:
+                        thisFile["comment"] = ""
+                    thisFile["dateObs"] = s["obsdate"]
+                    thisFile["spec1phot2"] = 1
+                    relatedFilesTable.append(thisFile)
+
+            del s["filepath"]
+            del s["fitsFilepath"]
+            del s["relatedFiles"]
+
+            specData.append(_ordered(s, _specKeyOrder))
 
-            relatedFiles = self._parse_related_files(classBlock)
+        return specData, relatedFilesTable
 
-            for r in reports:
 
-                header = re.search(
-                    r"""<tr class=\"row.*?time_received\">(?P<reportAddedDate>[^<]*).*?user_name\">(?P<TNSuser>[^<]*).*?classifier_name\">(?P<reporters>[^<]*).*?source_group_name\">(?P<survey>[^<]*).*?-type\">(?P<specType>[^<]*).*?-redshift\">(?P<transRedshift>[^<]*).*?-related_files\">(?P<relatedFiles>[^<]*).*?-groups\">(?P<surveyGroup>[^<]*).*?-remarks\">(?P<sourceComment>[^<]*)</td>""",
-                    r.group(),
-                    flags=re.S  # re.S
-                )
-                if not header:
-                    continue
-
-                header = header.groupdict()
-                header["TNSId"] = TNSId
-
-                del header["reporters"]
-                del header["surveyGroup"]
-                del header["survey"]
-
-                if not self.comments:
-                    del header['sourceComment']
-                else:
-                    theseComments = header[
-                        "sourceComment"].split("\n")
-                    header["sourceComment"] = ""
-                    for c in theseComments:
-                        header["sourceComment"] += " " + c.strip()
-                    header["sourceComment"] = header[
-                        "sourceComment"]
-
-                spec = re.finditer(
-                    r"""<td class=\"cell-obsdate\">(?P<obsdate>[^<]*).*?-tel_inst\">(?P<telescope>[^<]*).*?-exptime\">(?P<exptime>[^<]*).*?-observer\">(?P<sender>[^<]*).*?-reducer\">(?P<reducer>[^<]*).*?-source_group_name\">(?P<survey>[^<]*).*?-asciifile\">(.*?<a href=\"(?P<filepath>[^\"]*)\".*?</a>)?.*?-fitsfile\">(.*?<a href=\"(?P<fitsFilepath>[^\"]*)\".*?</a>)?.*?-groups\">(?P<surveyGroup>[^<]*).*?-remarks\">(?P<remarks>[^<]*)""",
-                    r.group(),
-                    flags=re.S  # re.S
-                )
-                filesAppended = False
-                for s in spec:
-
-                    s = s.groupdict()
-                    del s["sender"]
-                    del s["surveyGroup"]
-                    del s["reducer"]
-
-                    if not self.comments:
-                        del s["remarks"]
-                    else:
-                        s["remarks"] = s["remarks"].replace('"', "'")[0:750]
-
-                    s.update(header)
-
-                    if s["relatedFiles"] and filesAppended == False:
-                        filesAppended = True
-                        for f in relatedFiles:
-                            # ORDER THE DICTIONARY FOR THIS ROW OF
-                            # RESULTS
-                            thisFile = collections.OrderedDict()
-                            thisFile["TNSId"] = TNSId
-                            thisFile["filename"] = f[
-                                "filepath"].split("/")[-1]
-                            thisFile["url"] = f["filepath"]
-                            if self.comments:
-                                thisFile["comment"] = f[
-                                    "fileComment"].replace("\n", " ").strip()
-                            thisFile["dateObs"] = s["obsdate"]
-                            thisFile["spec1phot2"] = 1
-                            relatedFilesTable.append(thisFile)
-
-                    for ffile in [s["filepath"], s["fitsFilepath"]]:
-                        if ffile:
-                            # ORDER THE DICTIONARY FOR THIS ROW OF
-                            # RESULTS
-                            thisFile = collections.OrderedDict()
-                            thisFile["TNSId"] = TNSId
-                            thisFile["filename"] = ffile.split(
-                                "/")[-1]
-                            thisFile["url"] = ffile
-                            if self.comments:
-                                thisFile["comment"] = ""
-                            thisFile["dateObs"] = s["obsdate"]
-                            thisFile["spec1phot2"] = 1
-                            relatedFilesTable.append(thisFile)
-
-                    del s["filepath"]
-                    del s["fitsFilepath"]
-                    del s["relatedFiles"]
-
-                    # ORDER THE DICTIONARY FOR THIS ROW OF RESULTS
-                    orow = collections.OrderedDict()
-                    keyOrder = ["TNSId", "survey", "obsdate", "specType", "transRedshift",
-                                "telescope", "exptime", "reportAddedDate", "TNSuser"]
-                    for k, v in list(s.items()):
-                        if k not in keyOrder:
-                            keyOrder.append(k)
-                    for k in keyOrder:
-                        try:
-                            orow[k] = s[k]
-                        except:
-                            self.log.info(
-                                "`%(k)s` not found in the source data for %(TNSId)s" % locals())
-                            pass
-
-                    specData.append(orow)
-
-        self.log.debug('completed the ``_parse_spectral_data`` method')
-        return specData, relatedFilesTable
+# THE LEADING COLUMNS OF THE PHOTOMETRY AND SPECTRA ROWS (ANY OTHER COLUMNS
+# FOLLOW IN THE ORDER THEY WERE READ)
+_photKeyOrder = ("TNSId", "survey", "obsdate", "filter", "limitingMag", "mag", "magErr",
+                 "magUnit", "suggestedType", "telescope", "exptime", "reportAddedDate")
+_specKeyOrder = ("TNSId", "survey", "obsdate", "specType", "transRedshift",
+                 "telescope", "exptime", "reportAddedDate", "TNSuser")
+
+
+def _ordered(
+        row,
+        keyOrder):
+    """*a copy of a row with the keys in ``keyOrder`` first*"""
+    orow = {k: row[k] for k in keyOrder if k in row}
+    for k, v in row.items():
+        if k not in orow:
+            orow[k] = v
+    return orow
+
+
+def _with_separations(
+        source,
+        angularSeparation,
+        north,
+        east):
+    """*a copy of a transient's discovery data with its separations from a search position, placed where the TNS parser puts them (straight after the decimal coordinates)*"""
+    row = {}
+    for k, v in source.items():
+        if k in ("separationArcsec", "separationNorthArcsec", "separationEastArcsec"):
+            continue
+        row[k] = v
+        if k == "decDeg":
+            row["separationArcsec"] = angularSeparation
+            row["separationNorthArcsec"] = north
+            row["separationEastArcsec"] = east
+    return row
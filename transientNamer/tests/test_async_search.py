@@ -0,0 +1,317 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+from transientNamer.tests.tns_stand_in import stand_in_tns, stand_in_settings
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# THE TEST SETTINGS, POINTED AT THE STAND-IN TNS (UNCACHED AND UNTHROTTLED)
+localSettings = stand_in_settings(settings, pathToInputDir)
+localSettings["astronote-cache"] = pathToOutputDir + "/astronote-cache"
+
+
+@unittest.skipIf(aiohttp is None, "the asyncio client needs the optional `aiohttp` package")
+class test_async_search(unittest.TestCase):
+
+    def setUp(self):
+        stand_in_tns.reset()
+
+    def test_async_search_function(self):
+        from transientNamer import search, async_search
+        for kwargs in [{"name": "2016asf"}, {"ra": "06:50:36.74", "dec": "+31:06:44.7", "radiusArcsec": 5.0, "comments": True}]:
+            tns = search(
+                log=log,
+                settings=localSettings,
+                **kwargs
+            )
+            for concurrentPages in [False, 3]:
+                atns = async_search(
+                    log=log,
+                    settings=localSettings,
+                    concurrentPages=concurrentPages,
+                    **kwargs
+                )
+                asyncio.run(atns.run())
+                self.assertEqual(atns.sources, tns.sources)
+                self.assertEqual(atns.photometry, tns.photometry)
+                self.assertEqual(atns.spectra, tns.spectra)
+                self.assertEqual(atns.files, tns.files)
+                self.assertEqual(atns.url, tns.url)
+                self.assertEqual(atns.resumeToken, None)
+                # AWAITED REQUESTS RECORD WALL-CLOCK TIME ONLY
+                self.assertGreater(atns.stats.stages["http"]["wall"], 0.)
+                self.assertEqual(atns.stats.stages["http"]["cpu"], 0.)
+
+    def test_async_search_iter_sources_function(self):
+        from transientNamer import search, async_search
+        tns = search(
+            log=log,
+            settings=localSettings,
+            discInLastDays=3
+        )
+        atns = async_search(
+            log=log,
+            settings=localSettings,
+            discInLastDays=3
+        )
+
+        async def stream():
+            return [row async for row in atns.iter_sources()]
+        rows = asyncio.run(stream())
+        self.assertEqual([r[0] for r in rows], tns.sources)
+        self.assertEqual(sum([r[1] for r in rows], []), tns.photometry)
+
+    def test_async_search_cancel_function(self):
+        from transientNamer import async_search
+        atns = async_search(
+            log=log,
+            settings=localSettings,
+            discInLastDays=3,
+            concurrentPages=4
+        )
+
+        # EVERY PAGE IS FULL, SO THE SEARCH WOULD NEVER END
+        async def cancel():
+            task = asyncio.ensure_future(atns.run())
+            await asyncio.sleep(0.5)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            sent = len(stand_in_tns.requests)
+            await asyncio.sleep(0.5)
+            return sent, len(stand_in_tns.requests)
+
+        stand_in_tns.delay = 0.2
+        original = dict(stand_in_tns.pages)
+        stand_in_tns.pages = {p: stand_in_tns.pages[0] for p in range(1000)}
+        try:
+            sent, later = asyncio.run(cancel())
+        finally:
+            stand_in_tns.delay = 0.
+            stand_in_tns.pages = original
+        self.assertEqual(sent, later)
+
+    def test_async_search_function_exception(self):
+        from transientNamer import async_search
+        atns = async_search(
+            log=log,
+            settings=localSettings,
+            name="2016asf"
+        )
+        try:
+            atns.sources
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+    def test_async_astronotes_download_function(self):
+        from transientNamer import async_astronotes
+        stand_in_tns.notes = {str(n): {"id": n} for n in range(75)}
+        an = async_astronotes(
+            log=log,
+            settings=localSettings
+        )
+        downloadCount = asyncio.run(an.download(
+            cache_dir=localSettings["astronote-cache"]))
+        self.assertEqual(downloadCount, 75)
+        self.assertEqual(
+            len(os.listdir(localSettings["astronote-cache"])), 150)
+
+    def test_async_astronotes_cache_off_loop_function(self):
+        # THE ASTRONOTE CACHE IS READ AND WRITTEN OFF THE EVENT LOOP THREAD
+        from transientNamer import async_astronotes
+        import copy
+        import threading
+        stand_in_tns.notes = {str(n): {"id": n} for n in range(3)}
+        cacheSettings = copy.deepcopy(localSettings)
+        cacheSettings["astronote-cache"] = pathToOutputDir + "/astronote-off-loop"
+        an = async_astronotes(
+            log=log,
+            settings=cacheSettings
+        )
+        threads = []
+        for method in ("_cache_json_notes", "_uncached_html_notes", "_cache_html_note"):
+            def recorded(*args, _method=getattr(an, method), **kwargs):
+                threads.append(threading.get_ident())
+                return _method(*args, **kwargs)
+            setattr(an, method, recorded)
+
+        async def download():
+            downloadCount = await an.download(
+                cache_dir=cacheSettings["astronote-cache"])
+            return downloadCount, threading.get_ident()
+        downloadCount, loopThread = asyncio.run(download())
+        self.assertEqual(downloadCount, 3)
+        self.assertEqual(len(threads), 5)
+        self.assertNotIn(loopThread, threads)
+
+    def test_async_astronotes_download_retry_function(self):
+        from transientNamer import async_astronotes
+        import copy
+        stand_in_tns.notes = {str(n): {"id": n} for n in range(5)}
+        cacheSettings = copy.deepcopy(localSettings)
+
+        # THE LISTING IS RETRIED, AND THE ERROR PAGES ARE NEVER READ AS NOTES
+        cacheSettings["astronote-cache"] = pathToOutputDir + "/astronote-retry"
+        stand_in_tns.failures = [503, 429, None, 503]
+        an = async_astronotes(
+            log=log,
+            settings=cacheSettings
+        )
+        downloadCount = asyncio.run(an.download(
+            cache_dir=cacheSettings["astronote-cache"], concurrentNotes=1))
+        self.assertEqual(downloadCount, 5)
+        self.assertEqual(an.stats.counters["retries"], 3)
+        cached = os.listdir(cacheSettings["astronote-cache"])
+        self.assertEqual(len(cached), 10)
+        for f in cached:
+            with open(cacheSettings["astronote-cache"] + "/" + f) as content:
+                self.assertNotIn("Service Unavailable", content.read())
+
+        # A NOTE THAT NEVER DOWNLOADS IS LEFT UNCACHED
+        cacheSettings["astronote-cache"] = pathToOutputDir + "/astronote-give-up"
+        stand_in_tns.failures = [None] + [503] * 4
+        an = async_astronotes(
+            log=log,
+            settings=cacheSettings
+        )
+        downloadCount = asyncio.run(an.download(
+            cache_dir=cacheSettings["astronote-cache"], concurrentNotes=1))
+        self.assertEqual(downloadCount, 5)
+        cached = os.listdir(cacheSettings["astronote-cache"])
+        self.assertNotIn("0.html", cached)
+        self.assertEqual(len(cached), 9)
+
+        # A LISTING THAT NEVER DOWNLOADS CACHES NOTHING
+        cacheSettings["astronote-cache"] = pathToOutputDir + "/astronote-no-listing"
+        stand_in_tns.failures = [503] * 4
+        an = async_astronotes(
+            log=log,
+            settings=cacheSettings
+        )
+        downloadCount = asyncio.run(an.download(
+            cache_dir=cacheSettings["astronote-cache"]))
+        self.assertEqual(downloadCount, 0)
+        self.assertEqual(os.listdir(cacheSettings["astronote-cache"]), [])
+
+    def test_async_search_cache_off_loop_function(self):
+        # THE RESPONSE CACHE IS READ AND WRITTEN OFF THE EVENT LOOP THREAD
+        from transientNamer import search, async_search
+        import copy
+        import threading
+        cacheSettings = copy.deepcopy(localSettings)
+        cacheSettings["tns cache"] = {
+            "directory": pathToOutputDir + "/async_cache"}
+        expected = search(
+            log=log,
+            settings=localSettings,
+            name="2016asf"
+        ).sources
+
+        for attempt in range(2):
+            atns = async_search(
+                log=log,
+                settings=cacheSettings,
+                name="2016asf"
+            )
+            threads = []
+            for method in ("get", "put", "get_negative", "put_negative"):
+                def recorded(*args, _method=getattr(atns._cache, method), **kwargs):
+                    threads.append(threading.get_ident())
+                    return _method(*args, **kwargs)
+                setattr(atns._cache, method, recorded)
+
+            async def run():
+                await atns.run()
+                return threading.get_ident()
+            loopThread = asyncio.run(run())
+            self.assertEqual(atns.sources, expected)
+            self.assertTrue(threads)
+            self.assertNotIn(loopThread, threads)
+        # THE SECOND SEARCH WAS ANSWERED FROM THE CACHE
+        self.assertEqual(atns.stats.counters["cache hits"], 2)
+
+        # SO ARE THE NEGATIVE ENTRIES A PAGE OF RECENT DISCOVERIES INVALIDATES
+        atns = async_search(
+            log=log,
+            settings=cacheSettings,
+            discInLastDays=3
+        )
+        threads = []
+        invalidate = atns._cache.invalidate_negative
+
+        def recorded(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return invalidate(*args, **kwargs)
+        atns._cache.invalidate_negative = recorded
+        loopThread = asyncio.run(run())
+        self.assertEqual(len(threads), 1)
+        self.assertNotIn(loopThread, threads)
+
+    def test_async_search_unrun_streaming_function(self):
+        # AN UNRUN async_search NEVER FALLS BACK TO BLOCKING HTTP
+        from transientNamer import async_search
+        from unittest import mock
+        import requests
+
+        async def stream(method, *args):
+            atns = async_search(
+                log=log,
+                settings=localSettings,
+                discInLastDays=3
+            )
+            getattr(atns, method)(*args)
+
+        with mock.patch.object(requests.Session, "send") as send:
+            for method, args in (("records", ()), ("columns", ()), ("to_files", (pathToOutputDir + "/async_unrun",)), ("ndjson", (pathToOutputDir + "/async_unrun",))):
+                with self.assertRaises(RuntimeError):
+                    asyncio.run(stream(method, *args))
+            self.assertFalse(send.called)
+        self.assertEqual(stand_in_tns.requests, [])
+        self.assertFalse(os.path.exists(pathToOutputDir + "/async_unrun"))
+
+    # x-class-to-test-named-worker-function
@@ -0,0 +1,216 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+class test_batch_conesearch(unittest.TestCase):
+
+    def test_batch_conesearch_function(self):
+        import time
+        time.sleep(15)
+        # THE FIRST TWO POSITIONS ARE DUPLICATES, THE THIRD OVERLAPS THEM
+        from transientNamer import batch_conesearch
+        bc = batch_conesearch(
+            log=log,
+            ra=["06:50:36.74", "06:50:36.74", 102.6532, "17:29:02.80"],
+            dec=["+31:06:44.7", "+31:06:44.7", 31.1124, "+08:08:37.4"],
+            radiusArcsec=5.0,
+            settings=settings
+        )
+        matches = bc.get()
+        for m in matches:
+            print(m["inputIndex"], m["TNSId"], m["separationArcsec"])
+        print(bc.photometry)
+        print(bc.spectra)
+        print(bc.files)
+
+    def test_batch_conesearch_csv_function(self):
+        import time
+        time.sleep(15)
+        csvPath = pathToOutputDir + "/batch_conesearch.csv"
+        with open(csvPath, "w") as f:
+            f.write("ra,dec,radiusArcsec\n06:50:36.74,+31:06:44.7,5\n")
+        from transientNamer import batch_conesearch
+        bc = batch_conesearch(
+            log=log,
+            csvPath=csvPath,
+            settings=settings
+        )
+        matches = bc.get()
+        print(matches)
+
+    def test_batch_conesearch_merge_cones_function(self):
+
+        from transientNamer import batch_conesearch
+        from transientNamer.batch_conesearch import _enclosing_cone, _angular_separation
+        import numpy as np
+        # TWO DUPLICATES, A CONE OVERLAPPING THEM AND A DISTANT CONE
+        bc = batch_conesearch(
+            log=log,
+            ra=[102.6532, 102.6532, 102.6534, 200.],
+            dec=[31.1124, 31.1124, 31.1124, -10.],
+            radiusArcsec=5.0,
+            settings=settings
+        )
+        cones, members = bc._merge_cones()
+        self.assertEqual(len(cones), 2)
+        self.assertEqual(members, [[0, 1, 2], [3]])
+        raC, decC, radius = cones[0]
+        self.assertAlmostEqual(raC, 102.6533, places=5)
+        # THE MERGED CONE ENCLOSES EVERY INPUT CONE
+        for r in [102.6532, 102.6534]:
+            self.assertLessEqual(_angular_separation(
+                raC, decC, r, 31.1124) + 5., radius)
+        self.assertEqual(tuple(cones[1]), (200., -10., 5.))
+
+        # CONES EITHER SIDE OF RA=0 ARE MERGED AROUND RA=0, NOT RA=180
+        bc = batch_conesearch(
+            log=log,
+            ra=[359.9995, 0.0005],
+            dec=[20., 20.],
+            radiusArcsec=5.0,
+            settings=settings
+        )
+        cones, members = bc._merge_cones()
+        self.assertEqual(members, [[0, 1]])
+        raC, decC, radius = cones[0]
+        self.assertLess(min(raC, 360. - raC), 1e-6)
+        self.assertAlmostEqual(decC, 20., places=5)
+        self.assertLess(radius, 10.)
+
+        # CONES TOO FAR APART TO MERGE ARE SEARCHED INDIVIDUALLY
+        bc = batch_conesearch(
+            log=log,
+            ra=[10., 10.02],
+            dec=[0., 0.],
+            radiusArcsec=5.0,
+            maxMergedRadiusArcsec=60,
+            settings=settings
+        )
+        cones, members = bc._merge_cones()
+        self.assertEqual(members, [[0], [1]])
+
+        raC, decC, radius = _enclosing_cone(
+            np.array([0., 0.]), np.array([-1. / 3600., 1. / 3600.]), np.array([2., 2.]))
+        self.assertEqual(raC, 0.)
+        self.assertAlmostEqual(decC, 0., places=7)
+        self.assertGreaterEqual(radius, 3.)
+
+    def test_batch_conesearch_ra_zero_function(self):
+
+        from transientNamer.tests.tns_stand_in import stand_in_tns, stand_in_settings
+        from transientNamer import batch_conesearch, search
+        localSettings = stand_in_settings(settings, pathToInputDir)
+        stand_in_tns.reset()
+        # A CONE AT RA=0 IS A CONESEARCH, NOT A SEARCH FOR RECENT TRANSIENTS
+        tns = search(
+            log=log,
+            ra=0.,
+            dec=10.,
+            radiusArcsec=5.,
+            settings=localSettings
+        )
+        self.assertEqual(tns.queryType, "cone")
+        self.assertEqual(tns._search_constraints()["raDeg"], 0.)
+        # A SEXAGESIMAL CENTRE IS CONVERTED AS ASTROCALC CONVERTS IT
+        from astrocalc.coords import unit_conversion
+        converter = unit_conversion(log=log)
+        constraints = search(
+            log=log,
+            ra="06:50:36.74",
+            dec="-01:06:44.7",
+            radiusArcsec=5.,
+            settings=localSettings
+        )._search_constraints()
+        self.assertEqual((constraints["raDeg"], constraints["decDeg"]), (converter.ra_sexegesimal_to_decimal(
+            ra="06:50:36.74"), converter.dec_sexegesimal_to_decimal(dec="-01:06:44.7")))
+        bc = batch_conesearch(
+            log=log,
+            ra=[0.],
+            dec=[10.],
+            radiusArcsec=5.0,
+            settings=localSettings
+        )
+        bc._conesearch(bc._merge_cones()[0][0])
+        self.assertTrue(stand_in_tns.requests)
+        for r in stand_in_tns.requests:
+            self.assertIn("ra=0.0", r)
+            self.assertIn("radius=5.0", r)
+
+    def test_batch_conesearch_repeat_and_failure_function(self):
+
+        from transientNamer.tests.tns_stand_in import stand_in_tns, stand_in_settings
+        from transientNamer import batch_conesearch, search
+        localSettings = stand_in_settings(settings, pathToInputDir)
+        stand_in_tns.reset()
+        # A POSITION ON THE RECORDED RESULTS PAGE, AND ONE FAR FROM IT
+        source = search(
+            log=log,
+            discInLastDays=3,
+            settings=localSettings
+        ).sources[0]
+        bc = batch_conesearch(
+            log=log,
+            ra=[source["raDeg"], 10.],
+            dec=[source["decDeg"], -10.],
+            radiusArcsec=5.0,
+            settings=localSettings
+        )
+        matches = bc.get()
+        self.assertTrue(matches)
+        self.assertEqual(bc.incompleteInputIndexes, [])
+
+        # A SECOND `get` DOES NOT REPEAT THE MATCHES
+        self.assertEqual(bc.get(), matches)
+        self.assertEqual(sum(len(m) for m in bc.matches.values()), len(matches))
+
+        # THE POSITIONS OF A CONE THAT NEVER DOWNLOADS ARE REPORTED
+        stand_in_tns.reset()
+        stand_in_tns.failures = [503] * 4
+        bc = batch_conesearch(
+            log=log,
+            ra=[source["raDeg"], source["raDeg"]],
+            dec=[source["decDeg"], source["decDeg"]],
+            radiusArcsec=5.0,
+            settings=localSettings
+        )
+        self.assertEqual(bc.get(), [])
+        self.assertEqual(bc.incompleteInputIndexes, [0, 1])
+
+    # x-class-to-test-named-worker-function
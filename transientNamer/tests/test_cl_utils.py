@@ -41,6 +41,43 @@ shutil.copytree(pathToInputDir, pathToOutputDir)
 if not os.path.exists(pathToOutputDir):
     os.makedirs(pathToOutputDir)
 
+from transientNamer.tests.tns_stand_in import stand_in_tns, stand_in_settings
+
+
+def _stand_in_settings_file(
+        name,
+        database=False):
+    """*write the test settings, pointed at the stand-in TNS (with a mirror in the output directory), to a settings file for the command-line. Without ``database`` no database connection is opened*"""
+    localSettings = stand_in_settings(settings, pathToInputDir)
+    localSettings["tns mirror"] = {"path": pathToOutputDir + "/cl_mirror.db"}
+    if not database:
+        localSettings.pop("database settings", None)
+    filepath = pathToOutputDir + "/" + name
+    with open(filepath, "w") as f:
+        yaml.dump(localSettings, f)
+    return filepath
+
+
+def _run(command):
+    """*run a command-line command and return what it printed to stdout and stderr*"""
+    import io
+    from contextlib import redirect_stdout, redirect_stderr
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    args = docopt(doc, command.split(" ")[1:])
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        cl_utils.main(args)
+    return stdout.getvalue(), stderr.getvalue()
+
+
+def _catalogue(name):
+    """*write a small catalogue of positions: the first transient on the recorded results page (2016hsr), 2016asf (only in the mirror) and a blank patch of sky*"""
+    filepath = pathToOutputDir + "/" + name
+    with open(filepath, "w") as f:
+        f.write(
+            "name,ra,dec\nhsr,04:23:54.95,-80:37:03.9\nasf,06:50:36.74,+31:06:44.7\nblank,10.0,-10.0\n")
+    return filepath
+
 # transientNamer [-c] cone <ra> <dec> <arcsecRadius> [<render> | mysql <tableNamePrefix>] [-o directory]
 # transientNamer [-c] search <name> [<render> | mysql <tableNamePrefix>] [-o directory]
 # transientNamer [-c] new <discInLastDays> [<render> | mysql
@@ -119,6 +156,16 @@ class test_cl_utils(unittest.TestCase):
         cl_utils.main(args)
         return
 
+    def test_cone_search_parquet_to_file(self):
+        import time
+        time.sleep(15)
+        # TEST CL-OPTIONS
+        thisDir = pathToOutputDir
+        command = f"transientNamer cone 06:45:03.36 +35:44:29.8 5. parquet -o {thisDir}/cl_output/ -s {settingsFile}"
+        args = docopt(doc, command.split(" ")[1:])
+        cl_utils.main(args)
+        return
+
     def test_name_search(self):
         import time
         time.sleep(15)
@@ -220,4 +267,90 @@ class test_cl_utils(unittest.TestCase):
         args = docopt(doc, command.split(" ")[1:])
         cl_utils.main(args)
 
+    def test_stand_in_new_ndjson(self):
+        settingsFile = _stand_in_settings_file("cl_stand_in.yaml")
+        stand_in_tns.reset()
+        command = f"transientNamer new 3 ndjson -s {settingsFile}"
+        stdout, stderr = _run(command)
+        self.assertIn("50 transients found", stdout)
+        self.assertIn('"TNSId":"2016hsr"', stdout)
+
+    def test_stand_in_new_ndjson_gzip_to_file(self):
+        import glob
+        import gzip
+        settingsFile = _stand_in_settings_file("cl_stand_in.yaml")
+        stand_in_tns.reset()
+        thisDir = pathToOutputDir + "/cl_gzip"
+        command = f"transientNamer new 3 ndjson -o {thisDir} -z -s {settingsFile}"
+        stdout, stderr = _run(command)
+        self.assertIn("50 transients found", stdout)
+        sourcesFile = glob.glob(thisDir + "/*sources.ndjson.gz")
+        self.assertEqual(len(sourcesFile), 1)
+        with gzip.open(sourcesFile[0], "rt") as f:
+            self.assertEqual(len(f.read().splitlines()), 50)
+
+    def test_stand_in_new_stats(self):
+        settingsFile = _stand_in_settings_file("cl_stand_in.yaml")
+        stand_in_tns.reset()
+        command = f"transientNamer new 3 csv --stats -s {settingsFile}"
+        stdout, stderr = _run(command)
+        self.assertIn("50 transients found", stdout)
+        for stage in ("http", "extract", "render", "requests"):
+            self.assertIn(stage, stderr)
+
+    def test_stand_in_new_mysql_database(self):
+        settingsFile = _stand_in_settings_file(
+            "cl_stand_in_database.yaml", database=True)
+        stand_in_tns.reset()
+        command = f"transientNamer new 3 mysql test_stand_in -d -s {settingsFile}"
+        stdout, stderr = _run(command)
+        self.assertIn("written to the `test_stand_in_*` database tables", stdout)
+
+    def test_stand_in_crossmatch(self):
+        import csv
+        settingsFile = _stand_in_settings_file("cl_stand_in.yaml")
+        stand_in_tns.reset()
+        pathToCatalogue = _catalogue("cl_catalogue.csv")
+        thisDir = pathToOutputDir + "/cl_crossmatch"
+        command = f"transientNamer crossmatch {pathToCatalogue} 5 -o {thisDir} --stats -s {settingsFile}"
+        stdout, stderr = _run(command)
+        self.assertIn("3 catalogue rows cross-matched", stdout)
+        self.assertNotIn("WARNING", stdout)
+        for stage in ("match", "http", "catalogue rows"):
+            self.assertIn(stage, stderr)
+        with open(thisDir + "/cl_catalogue_tns_crossmatch.csv") as f:
+            matches = list(csv.DictReader(f))
+        self.assertEqual([(m["name"], m["TNSId"])
+                          for m in matches], [("hsr", "2016hsr")])
+
+        # CONESEARCHES THAT NEVER COMPLETE ARE WARNED ABOUT
+        stand_in_tns.reset()
+        stand_in_tns.failures = [503] * 50
+        stdout, stderr = _run(command)
+        self.assertIn("WARNING", stdout)
+
+    def test_stand_in_crossmatch_mirror(self):
+        import csv
+        from transientNamer import mirror
+        settingsFile = _stand_in_settings_file("cl_stand_in.yaml")
+        stand_in_tns.reset()
+        tnsMirror = mirror(
+            log=log,
+            path=pathToOutputDir + "/cl_mirror.db"
+        )
+        tnsMirror.upsert([
+            ({"TNSId": "2016asf", "TNSName": "SN2016asf", "raDeg": 102.65308, "decDeg": 31.11242}, [], [], [])
+        ])
+        pathToCatalogue = _catalogue("cl_mirror_catalogue.csv")
+        thisDir = pathToOutputDir + "/cl_crossmatch"
+        command = f"transientNamer -m crossmatch {pathToCatalogue} 5 -o {thisDir} -s {settingsFile}"
+        stdout, stderr = _run(command)
+        self.assertIn("3 catalogue rows cross-matched", stdout)
+        with open(thisDir + "/cl_mirror_catalogue_tns_crossmatch.csv") as f:
+            matches = list(csv.DictReader(f))
+        self.assertEqual([(m["name"], m["TNSId"])
+                          for m in matches], [("asf", "2016asf")])
+        # THE TNS IS NEVER CONTACTED
+        self.assertEqual(stand_in_tns.requests, [])
+
     # x-class-to-test-named-worker-function
@@ -0,0 +1,82 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+class test_columnar(unittest.TestCase):
+
+    def test_to_arrow_table_function(self):
+
+        from transientNamer.commonutils.columnar import to_arrow_table, write_arrow_table
+        import pyarrow
+        import pyarrow.parquet as pq
+        rows = [{"TNSId": "2016asf", "obsdate": "2016-03-06 08:09:36.000", "mag": "17.1", "magErr": "", "limitingMag": 0, "remarks": ""},
+                {"TNSId": "2016asf", "obsdate": "2016-03-07 01:00:00", "mag": "> 19", "magErr": "0.05", "limitingMag": 1, "remarks": "det"}]
+        table = to_arrow_table(log=log, rows=rows)
+        self.assertEqual(table.column_names, [
+                         "TNSId", "obsdate", "mag", "magErr", "limitingMag", "remarks"])
+        self.assertEqual(str(table.schema.field("mag").type), "double")
+        self.assertEqual(str(table.schema.field(
+            "obsdate").type), "timestamp[ms]")
+        self.assertEqual(table.column("mag").to_pylist(), [17.1, None])
+        self.assertEqual(table.column("magErr").to_pylist(), [None, 0.05])
+        # STRINGS ARE KEPT AS THEY ARE
+        self.assertEqual(table.column("remarks").to_pylist(), ["", "det"])
+
+        write_arrow_table(table, pathToOutputDir + "/phot.parquet")
+        self.assertTrue(pq.read_table(
+            pathToOutputDir + "/phot.parquet").equals(table))
+        write_arrow_table(table, pathToOutputDir + "/phot.arrow")
+        with pyarrow.memory_map(pathToOutputDir + "/phot.arrow") as source:
+            self.assertTrue(pyarrow.ipc.open_file(
+                source).read_all().equals(table))
+
+    def test_to_arrow_table_function_exception(self):
+
+        from transientNamer.commonutils.columnar import write_arrow_table
+        try:
+            write_arrow_table([{"TNSId": "2016asf"}],
+                              pathToOutputDir + "/phot.parquet")
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+        # x-class-to-test-named-worker-function
@@ -0,0 +1,110 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+_photometry = [
+    {"TNSId": "2016asf", "obsdate": "2016-03-06 08:09:36.000", "filter": "V",
+        "limitingMag": 0, "mag": "17.10", "magErr": "0.05"},
+    {"TNSId": "2016asf", "obsdate": "2016-03-01 00:00:00.000", "filter": "V",
+        "limitingMag": 1, "mag": "18.50", "magErr": ""},
+    {"TNSId": "2016fbz", "obsdate": "2016-08-30 12:00:00.000", "filter": "g",
+        "limitingMag": 0, "mag": "16.20", "magErr": "0.02"},
+    {"TNSId": "2016fbz", "obsdate": "", "filter": None,
+        "limitingMag": 0, "mag": "16.90", "magErr": "0.03"}
+]
+
+
+class test_columnstore(unittest.TestCase):
+
+    def test_column_store_function(self):
+
+        from transientNamer.commonutils.columnstore import column_store
+        from datetime import datetime
+        store = column_store(log, _photometry)
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.keys(), list(_photometry[0]))
+        self.assertEqual(store.categories("filter"), ["V", "g"])
+        self.assertEqual(list(store["mag"]), [17.1, 18.5, 16.2, 16.9])
+
+        detections = store.where(limitingMag=0, filter=["V", "g"])
+        self.assertEqual(list(detections["TNSId"]), ["2016asf", "2016fbz"])
+        march = store.where(obsdate=("2016-03-01", datetime(2016, 3, 31)))
+        self.assertEqual(len(march), 2)
+        self.assertEqual(len(store.where(obsdate=None)), 1)
+        self.assertEqual(len(store.where(mag=(None, 17.0))), 2)
+        self.assertEqual(len(store.where(TNSId="2016xyz")), 0)
+
+        # ROWS ARE ONLY BUILT WHEN THE STORE IS ITERATED
+        rows = list(store.where(magErr=None))
+        self.assertEqual(rows, [{"TNSId": "2016asf", "obsdate": datetime(
+            2016, 3, 1), "filter": "V", "limitingMag": 1, "mag": 18.5, "magErr": None}])
+
+    def test_column_builder_function(self):
+
+        from transientNamer.commonutils.columnstore import column_store, column_builder
+        # A COLUMN FIRST SEEN IN A LATER BATCH IS MISSING FROM THE EARLIER ROWS
+        rows = [dict(r) for r in _photometry]
+        rows[3]["telescope"] = "ATLAS"
+        builder = column_builder(log)
+        builder.add(rows[:2])
+        builder.add([])
+        builder.add(rows[2:])
+        store = builder.store()
+        expected = column_store(log, rows)
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.keys(), expected.keys())
+        self.assertEqual(store.categories("filter"), ["V", "g"])
+        self.assertEqual(list(store), list(expected))
+        self.assertEqual(list(store["telescope"]), [None, None, None, "ATLAS"])
+        self.assertEqual(len(column_builder(log).store()), 0)
+
+    def test_column_store_function_exception(self):
+
+        from transientNamer.commonutils.columnstore import column_store
+        store = column_store(log, _photometry)
+        try:
+            store.where(filter=("V", "g"))
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+        # x-class-to-test-named-worker-function
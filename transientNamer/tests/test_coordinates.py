@@ -0,0 +1,154 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+def _random_positions(
+        count,
+        seed=1):
+    import random
+    random.seed(seed)
+    ra = []
+    dec = []
+    for i in range(count):
+        seconds = random.choice(["%04.1f", "%05.2f", "%06.3f"])
+        ra.append("%02d:%02d:" % (random.randint(0, 23), random.randint(
+            0, 59)) + seconds % (random.random() * 59.9))
+        dec.append("%s%02d:%02d:" % (random.choice("+-"), random.randint(0, 89),
+                                     random.randint(0, 59)) + seconds % (random.random() * 59.9))
+    # DECIMAL DEGREES AND OTHER SEPARATORS
+    ra += ["123.4567", 12.5, "1 02 3.4s"]
+    dec += ["-12.345", -0.5, "-0 30 00.5"]
+    return ra, dec
+
+
+class test_coordinates(unittest.TestCase):
+
+    def test_sexagesimal_to_decimal_parity_function(self):
+        # THE BATCH CONVERSION MUST MATCH ASTROCALC VALUE FOR VALUE
+        from astrocalc.coords import unit_conversion
+        from transientNamer.commonutils.coordinates import sexagesimal_to_decimal
+        converter = unit_conversion(
+            log=log
+        )
+        ra, dec = _random_positions(5000)
+        raDeg, decDeg = sexagesimal_to_decimal(
+            log=log,
+            ra=ra,
+            dec=dec
+        )
+        self.assertEqual(raDeg, [converter.ra_sexegesimal_to_decimal(
+            ra=r) for r in ra])
+        self.assertEqual(decDeg, [converter.dec_sexegesimal_to_decimal(
+            dec=d) for d in dec])
+
+    def test_separations_parity_function(self):
+        # THE BATCH SEPARATIONS MUST MATCH ASTROCALC STRING FOR STRING (SAME
+        # VALUES AND PRECISION)
+        from astrocalc.coords import separations as astrocalc_separations
+        from transientNamer.commonutils.coordinates import sexagesimal_to_decimal, separations
+        import random
+        random.seed(2)
+        ra, dec = _random_positions(1000)
+        raDeg, decDeg = sexagesimal_to_decimal(
+            log=log,
+            ra=ra,
+            dec=dec
+        )
+        # INCLUDE SMALL SEPARATIONS, AS RETURNED BY A CONESEARCH
+        raDeg += [round(102.65309 + random.gauss(0, 0.001), random.randint(3, 7))
+                  for i in range(1000)]
+        decDeg += [round(31.11241 + random.gauss(0, 0.001), random.randint(3, 7))
+                   for i in range(1000)]
+        for ra1, dec1 in [("06:50:36.74", "+31:06:44.7"), (102.65309, 31.11241), ("00:00:01.00", "-89:59:59.9")]:
+            angularSeparation, north, east = separations(
+                log=log,
+                ra1=ra1,
+                dec1=dec1,
+                ra2=raDeg,
+                dec2=decDeg
+            )
+            expected = [astrocalc_separations(
+                log=log,
+                ra1=ra1,
+                dec1=dec1,
+                ra2=r,
+                dec2=d
+            ).get() for r, d in zip(raDeg, decDeg)]
+            self.assertEqual(list(zip(angularSeparation, north, east)), expected)
+
+    def test_decimal_to_sexagesimal_function(self):
+        from transientNamer.commonutils.coordinates import decimal_to_sexagesimal, sexagesimal_to_decimal
+        raSex, decSex = decimal_to_sexagesimal(
+            log=log,
+            raDeg=[65.9789583, 359.99999999, 102.6530417, -0.001],
+            decDeg=[-80.61775, -0.00001, 31.11241667, 89.99999999]
+        )
+        # ROUNDED (CARRYING INTO THE NEXT MINUTE, HOUR OR DEGREE), NEVER
+        # TRUNCATED
+        self.assertEqual(raSex, ["04:23:54.95", "00:00:00.00",
+                                 "06:50:36.73", "23:59:59.76"])
+        self.assertEqual(decSex, ["-80:37:03.9", "+00:00:00.0",
+                                  "+31:06:44.7", "+90:00:00.0"])
+
+        # A ROUND TRIP IS GOOD TO THE PRECISION OF THE SEXAGESIMAL STRINGS
+        ra, dec = _random_positions(1000)
+        raDeg, decDeg = sexagesimal_to_decimal(log=log, ra=ra, dec=dec)
+        raSex, decSex = decimal_to_sexagesimal(
+            log=log, raDeg=raDeg, decDeg=decDeg)
+        raDeg2, decDeg2 = sexagesimal_to_decimal(
+            log=log, ra=raSex, dec=decSex)
+        for a, b in zip(raDeg + decDeg, raDeg2 + decDeg2):
+            self.assertTrue(abs(a - b) < 0.0001)
+
+    def test_sexagesimal_to_decimal_function_exception(self):
+        from transientNamer.commonutils.coordinates import sexagesimal_to_decimal
+        try:
+            sexagesimal_to_decimal(
+                log=log,
+                ra=["06:50:36.74", "not a coordinate"],
+                dec=["+31:06:44.7", "+31:06:44.7"]
+            )
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+    # x-class-to-test-named-worker-function
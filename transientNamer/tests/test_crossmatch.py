@@ -0,0 +1,157 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+import csv
+
+
+def _tns_mirror():
+    """*a small mirror of two transients*"""
+    from transientNamer import mirror
+    tnsMirror = mirror(
+        log=log,
+        path=pathToOutputDir + "/crossmatch-mirror.db"
+    )
+    tnsMirror.upsert([
+        ({"TNSId": "2016asf", "TNSName": "SN2016asf", "raDeg": 102.65308, "decDeg": 31.11242}, [], [], []),
+        ({"TNSId": "2020abc", "TNSName": "AT2020abc", "raDeg": 359.99990, "decDeg": -10.5}, [], [], [])
+    ])
+    return tnsMirror
+
+
+class test_crossmatch(unittest.TestCase):
+
+    def test_crossmatch_function(self):
+        from transientNamer import crossmatch
+        pathToCatalogue = pathToOutputDir + "/catalogue.csv"
+        with open(pathToCatalogue, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "ra", "dec", "radiusArcsec"])
+            writer.writerow(["a", "06:50:36.74", "+31:06:44.7", ""])
+            writer.writerow(["b", "10.0", "10.0", ""])
+            writer.writerow(["c", "0.0001", "-10.5", "2"])
+            writer.writerow(["d", "0.0001", "-10.5", "0.1"])
+
+        progress = []
+        xm = crossmatch(
+            log=log,
+            pathToCatalogue=pathToCatalogue,
+            radiusArcsec=5,
+            mirror=_tns_mirror(),
+            batchSize=2,
+            progressCallback=lambda rows, matches, rate: progress.append(
+                (rows, matches))
+        )
+        # PROGRESS GOES TO THE CALLBACK (AND THE LOG), NOT STDOUT
+        import io
+        from contextlib import redirect_stdout
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            rowCount, matchCount = xm.to_csv(
+                pathToOutputDir + "/catalogue_tns_crossmatch.csv")
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertEqual((rowCount, matchCount), (4, 2))
+        self.assertEqual(progress, [(2, 1), (4, 2)])
+        self.assertEqual(xm.stats.counters, {
+                         "catalogue rows": 4, "matches": 2})
+        self.assertEqual(xm.stats.stages["match"]["calls"], 2)
+        self.assertEqual(xm.incompleteRows, [])
+        self.assertEqual([(m["inputIndex"], m["TNSId"]) for row, m in xm.iter_matches()], [
+                         (0, "2016asf"), (2, "2020abc")])
+
+        with open(pathToOutputDir + "/catalogue_tns_crossmatch.csv") as f:
+            matches = list(csv.DictReader(f))
+        self.assertEqual([(m["name"], m["inputIndex"], m["TNSId"])
+                          for m in matches], [("a", "0", "2016asf"), ("c", "2", "2020abc")])
+        self.assertTrue(float(matches[1]["separationArcsec"]) < 2)
+
+    def test_crossmatch_incomplete_function(self):
+        # ROWS WHOSE TNS CONESEARCHES NEVER COMPLETE ARE REPORTED, AND THE
+        # CONESEARCHES' OWN STATS ARE ADDED TO THE CROSS-MATCH'S
+        from transientNamer.tests.tns_stand_in import stand_in_tns, stand_in_settings
+        from transientNamer import crossmatch, search
+        localSettings = stand_in_settings(settings, pathToInputDir)
+        stand_in_tns.reset()
+        source = search(
+            log=log,
+            discInLastDays=3,
+            settings=localSettings
+        ).sources[0]
+        pathToCatalogue = pathToOutputDir + "/incomplete_catalogue.csv"
+        with open(pathToCatalogue, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["ra", "dec"])
+            writer.writerow([source["raDeg"], source["decDeg"]])
+            writer.writerow([source["raDeg"], source["decDeg"]])
+            writer.writerow(["10.0", "-10.0"])
+
+        stand_in_tns.reset()
+        stand_in_tns.failures = [503] * 4
+        xm = crossmatch(
+            log=log,
+            pathToCatalogue=pathToCatalogue,
+            settings=localSettings,
+            concurrentCones=1
+        )
+        rowCount, matchCount = xm.to_csv(
+            pathToOutputDir + "/incomplete_catalogue_tns_crossmatch.csv")
+        self.assertEqual((rowCount, matchCount), (3, 0))
+        self.assertEqual(xm.incompleteRows, [0, 1])
+        self.assertEqual(xm.stats.counters["retries"], 3)
+        self.assertGreaterEqual(xm.stats.stages["http"]["calls"], 5)
+
+    def test_crossmatch_function_exception(self):
+        from transientNamer import crossmatch
+        pathToCatalogue = pathToOutputDir + "/no_positions.csv"
+        with open(pathToCatalogue, "w") as f:
+            f.write("name,mag\na,17.2\n")
+        try:
+            crossmatch(
+                log=log,
+                pathToCatalogue=pathToCatalogue,
+                mirror=_tns_mirror()
+            ).to_csv(pathToOutputDir + "/no_positions_tns_crossmatch.csv")
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+        # x-class-to-test-named-worker-function
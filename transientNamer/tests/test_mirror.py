@@ -0,0 +1,208 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+from transientNamer.tests.tns_stand_in import stand_in_tns, stand_in_settings
+import copy
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+# THE TEST SETTINGS, POINTED AT THE STAND-IN TNS (UNCACHED AND UNTHROTTLED)
+# AND A MIRROR IN THE OUTPUT DIRECTORY
+localSettings = stand_in_settings(settings, pathToInputDir)
+localSettings["tns mirror"] = {"path": pathToOutputDir + "/tns-mirror.db"}
+
+
+class test_mirror(unittest.TestCase):
+
+    def setUp(self):
+        stand_in_tns.reset()
+
+    def test_mirror_sync_function(self):
+        from transientNamer import mirror
+        tnsMirror = mirror(
+            log=log,
+            settings=localSettings
+        )
+        count, resumeToken = tnsMirror.sync()
+        self.assertEqual(resumeToken, None)
+        self.assertTrue(count > 0)
+        self.assertTrue(tnsMirror.lastSync is not None)
+
+        # A SECOND SYNC ONLY PULLS THE DAYS SINCE THE FIRST
+        stand_in_tns.requests = []
+        tnsMirror.sync()
+        self.assertTrue(
+            "discovered_period_value=2&" in stand_in_tns.requests[0])
+
+    def test_mirror_resumed_bootstrap_function(self):
+        # A RESUMED BOOTSTRAP ONLY BRINGS THE MIRROR UP TO THE TIME THE
+        # INTERRUPTED BOOTSTRAP STARTED
+        import time
+        from datetime import datetime
+        from transientNamer import mirror
+        tnsMirror = mirror(
+            log=log,
+            settings=localSettings,
+            path=pathToOutputDir + "/tns-mirror-resumed.db"
+        )
+        started = datetime.utcnow().replace(microsecond=0)
+        # PAGE 0 DOWNLOADS, PAGE 1 FAILS EVERY RETRY
+        stand_in_tns.failures = [None] + [503] * 4
+        count, resumeToken = tnsMirror.bootstrap(concurrentPages=1)
+        self.assertEqual(resumeToken, 1)
+        self.assertEqual(count, 50)
+        self.assertIsNone(tnsMirror.lastSync)
+
+        time.sleep(1.1)
+        resumed = datetime.utcnow().replace(microsecond=0)
+        count, resumeToken = tnsMirror.bootstrap(
+            concurrentPages=1, resumeToken=resumeToken)
+        self.assertIsNone(resumeToken)
+        self.assertTrue(started <= tnsMirror.lastSync < resumed)
+        self.assertIsNone(tnsMirror._interrupted_pull_start(1))
+
+        # A RESUME THE MIRROR HAS NO RECORD OF LEAVES THE LAST SYNC ALONE
+        lastSync = tnsMirror.lastSync
+        time.sleep(1.1)
+        tnsMirror.bootstrap(concurrentPages=1, resumeToken=1)
+        self.assertEqual(tnsMirror.lastSync, lastSync)
+
+    def test_mirror_search_function(self):
+        from transientNamer import mirror, search
+        mirror(
+            log=log,
+            settings=localSettings
+        ).bootstrap()
+
+        for comments in [False, True]:
+            live = search(
+                log=log,
+                settings=localSettings,
+                discInLastDays=3,
+                comments=comments
+            )
+            source = live.sources[0]
+            stand_in_tns.requests = []
+            for kwargs in [{"name": source["TNSName"]}, {"name": source["discoveryName"].split(",")[0]}]:
+                tns = search(
+                    log=log,
+                    settings=localSettings,
+                    comments=comments,
+                    mirror=True,
+                    **kwargs
+                )
+                self.assertEqual(tns.sources, [source])
+                self.assertEqual(tns.photometry, [
+                                 p for p in live.photometry if p["TNSId"] == source["TNSId"]])
+                self.assertEqual(tns.spectra, [
+                                 s for s in live.spectra if s["TNSId"] == source["TNSId"]])
+                self.assertEqual(tns.files, [
+                                 f for f in live.files if f["TNSId"] == source["TNSId"]])
+            self.assertEqual(stand_in_tns.requests, [])
+
+        # CONESEARCHES MATCH THE TNS RESULTS WITHIN THE RADIUS
+        kwargs = {"ra": source["raSex"],
+                  "dec": source["decSex"], "radiusArcsec": 3600}
+        live = search(
+            log=log,
+            settings=localSettings,
+            **kwargs
+        )
+        tns = search(
+            log=log,
+            settings=localSettings,
+            mirror=True,
+            **kwargs
+        )
+        self.assertEqual(tns.sources, [s for s in live.sources if float(
+            s["separationArcsec"]) <= 3600])
+
+    def test_mirror_batch_conesearch_function(self):
+        from transientNamer import mirror, search, batch_conesearch
+        mirror(
+            log=log,
+            settings=localSettings
+        ).bootstrap()
+        sources = search(
+            log=log,
+            settings=localSettings,
+            discInLastDays=3
+        ).sources
+
+        # POSITIONS NEAR EACH TRANSIENT PLUS ONE FAR FROM ALL OF THEM
+        ra = [s["raDeg"] + 0.0003 for s in sources] + [0.]
+        dec = [s["decDeg"] for s in sources] + [-89.]
+        live = batch_conesearch(
+            log=log,
+            ra=ra,
+            dec=dec,
+            radiusArcsec=5,
+            settings=localSettings
+        )
+        local = batch_conesearch(
+            log=log,
+            ra=ra,
+            dec=dec,
+            radiusArcsec=5,
+            settings=localSettings,
+            mirror=True
+        )
+        matches = live.get()
+        stand_in_tns.requests = []
+        self.assertEqual(local.get(), matches)
+        self.assertEqual(sorted(local.files, key=str),
+                         sorted(live.files, key=str))
+        self.assertEqual(stand_in_tns.requests, [])
+        self.assertTrue(len(local.sourceResultsList) >= len(sources))
+
+    def test_mirror_function_exception(self):
+        from transientNamer import mirror
+        noMirror = copy.deepcopy(localSettings)
+        noMirror.pop("tns mirror")
+        try:
+            mirror(
+                log=log,
+                settings=noMirror
+            )
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+        # x-class-to-test-named-worker-function
@@ -0,0 +1,105 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+class test_mysqlwriter(unittest.TestCase):
+
+    def test_mysqlwriter_function(self):
+
+        from fundamentals.mysql import writequery, readquery
+        for flavour in ["sources", "photometry", "spectra", "files"]:
+            try:
+                writequery(
+                    log=log,
+                    sqlQuery=f"DROP TABLE test_writer_{flavour}",
+                    dbConn=dbConn
+                )
+            except:
+                pass
+
+        from transientNamer.commonutils.mysqlwriter import mysql_writer
+        writer = mysql_writer(
+            log=log,
+            dbConn=dbConn,
+            tableNamePrefix="test_writer",
+            batchSize=2
+        )
+        writer.create_tables()
+        sources = [{"TNSId": "2016asf", "TNSName": "SN2016asf", "raDeg": 102.653041667, "decDeg": 31.1126, "separationArcsec": "0.66"},
+                   {"TNSId": "2016fbz", "TNSName": "SN2016fbz"}, {"TNSId": "2020abc", "TNSName": "AT2020abc"}]
+        files = [{"TNSId": "2016asf", "url": "https://www.wis-tns.org/a.fits"}]
+        counts = writer.write(sources=sources, files=files)
+        self.assertEqual(counts, (3, 0, 0, 1))
+
+        # WRITING AGAIN UPDATES THE ROWS IN PLACE
+        sources[2]["TNSName"] = "SN2020abc"
+        writer.write(sources=sources, files=files)
+        rows = readquery(
+            log=log,
+            sqlQuery="select TNSId, TNSName, updated from test_writer_sources order by TNSId",
+            dbConn=dbConn
+        )
+        self.assertEqual([r["TNSName"] for r in rows], [
+                         "SN2016asf", "SN2016fbz", "SN2020abc"])
+        self.assertEqual(set(r["updated"] for r in rows), set([1]))
+        rows = readquery(
+            log=log,
+            sqlQuery="select count(*) as count from test_writer_files",
+            dbConn=dbConn
+        )
+        self.assertEqual(rows[0]["count"], 1)
+
+    def test_mysqlwriter_function_exception(self):
+
+        from transientNamer.commonutils.mysqlwriter import mysql_writer
+        writer = mysql_writer(
+            log=log,
+            dbConn=dbConn,
+            tableNamePrefix="test_writer_missing"
+        )
+        try:
+            writer.write(sources=[{"TNSId": "2016asf"}])
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+        # x-class-to-test-named-worker-function
@@ -0,0 +1,143 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+from transientNamer.tests.tns_stand_in import stand_in_tns, stand_in_settings
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# THE TEST SETTINGS, POINTED AT THE STAND-IN TNS (UNCACHED AND UNTHROTTLED)
+localSettings = stand_in_settings(settings, pathToInputDir)
+
+
+def _name_pages():
+    """*single-transient result pages for names of the first two transients on the recorded page (2016hsr, discovered as ATLAS16hsr, and Gaia17gwp)*"""
+    import re
+    recorded = stand_in_tns.recordedPage
+    rows = [m.group() for m in re.finditer(
+        r"""\n([^\n]*?<td class=\"cell-id\" column=\"id\">.*?)(?=\n[^\n]*?<td class=\"cell-id\" column=\"id\">|<nav class=\"pager\")""", recorded, flags=re.S)]
+    start = recorded.index(rows[0])
+    end = recorded.index(rows[-1]) + len(rows[-1])
+    return {
+        "2016hsr": {0: recorded[:start] + rows[0] + recorded[end:]},
+        "ATLAS16hsr": {0: recorded[:start] + rows[0] + recorded[end:]},
+        "Gaia17gwp": {0: recorded[:start] + rows[1] + recorded[end:]}
+    }
+
+
+class test_name_resolver(unittest.TestCase):
+
+    def setUp(self):
+        # ONLY THE NAMED SEARCHES FIND ANYTHING
+        stand_in_tns.reset(pages={})
+        stand_in_tns.names = _name_pages()
+
+    def test_name_resolver_function(self):
+        from transientNamer import name_resolver
+        names = ["2016hsr", "SN 2016hsr", "AT2016hsr",
+                 "ATLAS16hsr", "Gaia17gwp", "Unknown99abc"]
+        expected = {"2016hsr": "2016hsr", "SN 2016hsr": "2016hsr", "AT2016hsr": "2016hsr",
+                    "ATLAS16hsr": "2016hsr", "Gaia17gwp": "2017gwp", "Unknown99abc": None}
+        for concurrentNames in [1, 4]:
+            stand_in_tns.requests = []
+            resolver = name_resolver(
+                log=log,
+                names=names,
+                settings=localSettings,
+                concurrentNames=concurrentNames
+            )
+            results = list(resolver.get())
+            self.assertEqual(len(results), len(names))
+            self.assertEqual(dict(results), expected)
+            # ONE LOOKUP PER NORMALISED NAME AT MOST
+            self.assertLessEqual(len(stand_in_tns.requests), 4)
+        # LOOKED UP ONE AT A TIME, ATLAS16hsr IS RESOLVED BY THE 2016hsr
+        # RESULTS AND NEVER LOOKED UP ITSELF
+        resolver = name_resolver(
+            log=log,
+            names=["2016hsr", "ATLAS16hsr"],
+            settings=localSettings,
+            concurrentNames=1
+        )
+        stand_in_tns.requests = []
+        self.assertEqual(dict(resolver.get()), {
+                         "2016hsr": "2016hsr", "ATLAS16hsr": "2016hsr"})
+        self.assertEqual(len(stand_in_tns.requests), 1)
+
+    def test_name_resolver_cache_function(self):
+        # A SECOND RESOLVER IS ANSWERED FROM THE CACHE WITHOUT CONTACTING THE TNS
+        from transientNamer import name_resolver
+        import copy
+        cachedSettings = copy.deepcopy(localSettings)
+        cachedSettings["tns cache"] = {
+            "directory": pathToOutputDir + "/name_resolver_cache"}
+        names = ["SN 2016hsr", "Gaia17gwp", "Unknown99abc"]
+        first = dict(name_resolver(
+            log=log,
+            names=names,
+            settings=cachedSettings
+        ).get())
+        self.assertTrue(stand_in_tns.requests)
+        stand_in_tns.requests = []
+        second = dict(name_resolver(
+            log=log,
+            names=names,
+            settings=cachedSettings
+        ).get())
+        self.assertEqual(second, first)
+        self.assertEqual(stand_in_tns.requests, [])
+
+    def test_name_resolver_unreachable_function(self):
+        # A NAME THE TNS NEVER ANSWERS FOR IS RETURNED UNRESOLVED
+        from transientNamer import name_resolver
+        stand_in_tns.failures = [503] * 4
+        resolver = name_resolver(
+            log=log,
+            names=["2016hsr"],
+            settings=localSettings
+        )
+        self.assertEqual(list(resolver.get()), [("2016hsr", None)])
+
+    def test_normalise_name_function(self):
+        from transientNamer.name_resolver import normalise_name
+        self.assertEqual(normalise_name("SN 2016asf"), "2016asf")
+        self.assertEqual(normalise_name("AT2016asf"), "2016asf")
+        self.assertEqual(normalise_name(" 2016asf "), "2016asf")
+        self.assertEqual(normalise_name("ATLAS20xyz"), "atlas20xyz")
+        self.assertEqual(normalise_name("Gaia16bbi"), "gaia16bbi")
+
+    # x-class-to-test-named-worker-function
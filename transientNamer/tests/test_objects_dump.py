@@ -0,0 +1,119 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+import csv
+import zipfile
+
+_columns = ["objid", "name_prefix", "name", "ra", "declination", "redshift", "typeid", "type", "reporting_groupid", "reporting_group", "source_groupid", "source_group",
+            "discoverydate", "discoverymag", "discmagfilter", "filter", "reporters", "time_received", "internal_names", "Discovery_ADS_bibcode", "Class_ADS_bibcodes", "creationdate", "lastmodified"]
+
+
+def _write_dump(
+        pathToDump):
+    """*a zipped dump of two objects, in the layout the TNS publishes*"""
+    pathToCsv = pathToOutputDir + "/tns_public_objects.csv"
+    with open(pathToCsv, "w", newline="") as f:
+        f.write('"2026-10-01 00:00:00"\n')
+        writer = csv.DictWriter(f, fieldnames=_columns,
+                                quoting=csv.QUOTE_ALL, restval="")
+        writer.writeheader()
+        writer.writerow({"objid": 1, "name_prefix": "SN", "name": "2016asf", "ra": "102.6530417", "declination": "31.11241667", "redshift": "0.021", "type": "SN Ia", "reporting_group": "ASAS-SN",
+                         "source_group": "ASAS-SN", "discoverydate": "2016-03-06 08:09:36", "discoverymag": "17.1", "filter": "V-Johnson", "reporters": "A. Astronomer", "internal_names": "ASASSN-16cs"})
+        writer.writerow({"objid": 2, "name_prefix": "AT", "name": "2020abc", "ra": "359.99999999", "declination": "-0.00001",
+                         "discoverydate": "2020-01-01 00:00:00.000", "reporters": "B. Observer"})
+    with zipfile.ZipFile(pathToDump, "w") as archive:
+        archive.write(pathToCsv, "tns_public_objects.csv")
+
+
+class test_objects_dump(unittest.TestCase):
+
+    def test_objects_dump_iter_sources_function(self):
+        from transientNamer import objects_dump
+        _write_dump(pathToOutputDir + "/tns_public_objects.csv.zip")
+        dump = objects_dump(
+            log=log,
+            pathToDump=pathToOutputDir + "/tns_public_objects.csv.zip"
+        )
+        sources = [s for batch in dump.iter_sources(batchSize=1)
+                   for s in batch]
+        self.assertEqual(sources[0], {
+            "objectUrl": "https://www.wis-tns.org/object/2016asf", "TNSName": "SN2016asf", "raSex": "06:50:36.73", "decSex": "+31:06:44.7", "specType": "SN Ia", "transRedshift": "0.021", "hostName": None, "hostRedshift": None, "reportingSurvey": "ASAS-SN", "discSurvey": "ASAS-SN", "discoveryName": "ASASSN-16cs", "discMag": "17.1", "discMagFilter": "V-Johnson", "discDate": "2016-03-06 08:09:36", "raDeg": 102.6530417, "decDeg": 31.11241667, "TNSId": "2016asf", "survey": None})
+        self.assertEqual((sources[1]["TNSId"], sources[1]["raSex"], sources[1]["decSex"], sources[1]["survey"]),
+                         ("2020abc", "00:00:00.00", "+00:00:00.0", "B. Observer"))
+        self.assertEqual(str(dump.dumpDate), "2026-10-01 00:00:00")
+
+    def test_objects_dump_to_mirror_function(self):
+        from transientNamer import objects_dump, mirror
+        _write_dump(pathToOutputDir + "/tns_public_objects.csv.zip")
+        tnsMirror = mirror(
+            log=log,
+            path=pathToOutputDir + "/dump-mirror.db"
+        )
+        # HOST INFORMATION AND REPORTS ALREADY HELD ARE KEPT
+        tnsMirror.upsert([({"TNSId": "2016asf", "TNSName": "SN2016asf", "raDeg": 102.65, "decDeg": 31.11,
+                            "hostName": "KUG 0647+311"}, [{"TNSId": "2016asf", "mag": "17.1"}], [], [])])
+        count = objects_dump(
+            log=log,
+            pathToDump=pathToOutputDir + "/tns_public_objects.csv.zip"
+        ).to_mirror(mirror=tnsMirror)
+        self.assertEqual(count, 2)
+        self.assertEqual(tnsMirror.lookup_name("ASASSN-16cs")[0]["hostName"], "KUG 0647+311")
+        self.assertEqual(tnsMirror.reports(["2016asf"])[0], [{"TNSId": "2016asf", "mag": "17.1"}])
+        self.assertEqual(len(tnsMirror.conesearch(0., 0., 1)), 1)
+        self.assertEqual(str(tnsMirror.lastSync), "2026-10-01 00:00:00")
+
+    def test_objects_dump_function_exception(self):
+        from transientNamer import objects_dump
+        with zipfile.ZipFile(pathToOutputDir + "/empty.zip", "w") as archive:
+            archive.writestr("readme.txt", "no objects here")
+        try:
+            for sources in objects_dump(
+                log=log,
+                pathToDump=pathToOutputDir + "/empty.zip"
+            ).iter_sources():
+                pass
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+        # x-class-to-test-named-worker-function
@@ -0,0 +1,79 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+class test_records(unittest.TestCase):
+
+    def test_records_function(self):
+
+        from transientNamer.commonutils.records import photometry, source
+        from datetime import datetime
+        row = {"TNSId": "2016asf", "survey": "ASAS-SN", "obsdate": "2016-03-06 08:09:36.000", "filter": "V",
+               "limitingMag": 0, "mag": "17.10", "magErr": "", "remarks": ""}
+        record = photometry.from_dict(log, row)
+        self.assertEqual(record.mag, 17.1)
+        self.assertEqual(record.magErr, None)
+        self.assertEqual(record.obsdate, datetime(2016, 3, 6, 8, 9, 36))
+        self.assertEqual(record.remarks, "")
+
+        # THE RECORD CAN BE READ LIKE THE DICTIONARY IT WAS MADE FROM
+        self.assertEqual(list(record), list(row))
+        self.assertEqual(record["filter"], "V")
+        self.assertEqual(record.get("sourceComment", "none"), "none")
+        self.assertFalse("sourceComment" in record)
+        self.assertEqual(dict(record)["limitingMag"], 0)
+
+        # A COMPACT RECORD HAS NO PER-INSTANCE DICTIONARY
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual(source(TNSId="2016asf", raDeg=102.65)[
+                         "raDeg"], 102.65)
+
+    def test_records_function_exception(self):
+
+        from transientNamer.commonutils.records import related_file
+        try:
+            related_file.from_dict(log, {"TNSId": "2016asf", "notAColumn": 1})
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+        # x-class-to-test-named-worker-function
@@ -0,0 +1,189 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+import time
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+
+def _cache_settings(name, **cacheSettings):
+    """*the test settings with a `tns cache` in its own output directory*"""
+    import copy
+    cacheSettings["directory"] = pathToOutputDir + "/" + name
+    localSettings = copy.deepcopy(settings)
+    localSettings["tns cache"] = cacheSettings
+    return localSettings
+
+
+class test_responsecache(unittest.TestCase):
+
+    def test_response_cache_get_put_function(self):
+
+        from transientNamer.commonutils.responsecache import response_cache
+        cache = response_cache(log=log, settings=_cache_settings("getput"))
+        params = {"name": "2016asf", "page": 0}
+        self.assertIsNone(cache.get(params, "name"))
+        cache.put(params, "name", content="<html>2016asf</html>",
+                  url="https://www.wis-tns.org/search?name=2016asf")
+        entry = cache.get(params, "name")
+        self.assertEqual(entry["content"], "<html>2016asf</html>")
+        self.assertEqual(
+            entry["url"], "https://www.wis-tns.org/search?name=2016asf")
+
+        # THE KEY IS THE FULL SET OF PARAMETERS, IN ANY ORDER
+        self.assertIsNone(cache.get({"name": "2016asf", "page": 1}, "name"))
+        self.assertIsNotNone(cache.get({"page": 0, "name": "2016asf"}, "name"))
+
+        # A CACHE WITHOUT SETTINGS IS DISABLED
+        disabled = response_cache(log=log, settings={})
+        self.assertFalse(disabled.enabled)
+        self.assertIsNone(disabled.get(params, "name"))
+
+    def test_response_cache_ttl_function(self):
+
+        from transientNamer.commonutils.responsecache import response_cache
+        localSettings = _cache_settings(
+            "ttl", **{"ttl seconds": {"recent": 0, "name": 3600}})
+        cache = response_cache(log=log, settings=localSettings)
+        cache.put({"page": 0}, "recent", content="recent", url="u")
+        cache.put({"page": 1}, "name", content="name", url="u")
+        time.sleep(0.01)
+
+        # EXPIRED ENTRIES ARE MISSES (AND ARE REMOVED), OTHERS ARE HITS
+        self.assertIsNone(cache.get({"page": 0}, "recent"))
+        self.assertFalse(os.path.exists(cache._path(cache.key({"page": 0}))))
+        self.assertIsNotNone(cache.get({"page": 1}, "name"))
+
+        # OFFLINE, A STALE PAGE IS SERVED
+        cache.put({"page": 0}, "recent", content="recent", url="u")
+        time.sleep(0.01)
+        localSettings["tns cache"]["offline"] = True
+        offline = response_cache(log=log, settings=localSettings)
+        self.assertEqual(offline.get({"page": 0}, "recent")[
+                         "content"], "recent")
+
+    def test_response_cache_lru_eviction_function(self):
+
+        from transientNamer.commonutils import responsecache
+        cache = responsecache.response_cache(
+            log=log, settings=_cache_settings("lru", **{"max size mb": 0.025}))
+
+        # PAGES OF ~7KB (GZIPPED) - THREE FIT IN THE 25KB CACHE
+        def put(n):
+            cache.put({"page": n}, "name", content=os.urandom(
+                6000).hex(), url="u")
+            return cache._path(cache.key({"page": n}))
+        paths = [put(n) for n in range(3)]
+        for i, path in enumerate(paths):
+            os.utime(path, (1000 + i, 1000 + i))
+
+        # READING PAGE 0 MAKES PAGE 1 THE LEAST RECENTLY USED
+        self.assertIsNotNone(cache.get({"page": 0}, "name"))
+        paths.append(put(3))
+        self.assertTrue(os.path.exists(paths[0]))
+        self.assertFalse(os.path.exists(paths[1]))
+        self.assertTrue(os.path.exists(paths[3]))
+
+        # THE RUNNING TOTAL MATCHES THE CACHE ON DISK
+        onDisk = sum(e[1] for e in cache._entries())
+        self.assertEqual(cache._size(), onDisk)
+        self.assertLessEqual(onDisk, cache.maxBytes)
+        cache.get({"page": 3}, "name")
+        cache.put({"page": 3}, "name", content="small", url="u")
+        self.assertEqual(cache._size(), sum(e[1] for e in cache._entries()))
+
+        cache.clear()
+        self.assertEqual(cache._entries(), [])
+        self.assertEqual(cache._size(), 0)
+
+    def test_response_cache_negative_function(self):
+
+        from transientNamer.commonutils.responsecache import response_cache
+        cache = response_cache(log=log, settings=_cache_settings("negative"))
+        cone = {"ra": "10.0", "dec": "20.0", "page": 0}
+        name = {"name": "2016asf", "page": 0}
+        cache.put_negative(cone, url="cone", constraints={
+                           "raDeg": 10.0, "decDeg": 20.0, "radiusArcsec": 5.0})
+        cache.put_negative(name, url="name", constraints={"name": "2016asf"})
+        self.assertEqual(cache.get_negative(name)["url"], "name")
+
+        # NEGATIVE ENTRIES COUNT TOWARDS THE SIZE OF THE CACHE
+        self.assertEqual(len(cache._entries()), 2)
+        self.assertEqual(cache._size(), sum(e[1] for e in cache._entries()))
+
+        # INVALIDATION READS THE INDEX, NOT THE ENTRIES
+        for path, size, used in cache._entries():
+            with open(path, "w") as f:
+                f.write("not json")
+        self.assertEqual(cache.invalidate_negative(
+            [{"TNSId": "2016fbz", "raDeg": 50.0, "decDeg": 20.0}]), 0)
+        self.assertEqual(cache.invalidate_negative(
+            [{"TNSId": "2016fbz", "raDeg": 10.0005, "decDeg": 20.0}]), 1)
+        self.assertEqual(cache.invalidate_negative(
+            [{"TNSId": "2016asf"}]), 1)
+        self.assertEqual(cache._entries(), [])
+        with open(cache._negativeIndex) as f:
+            self.assertEqual(f.read(), "")
+
+        # EXPIRED ENTRIES ARE DROPPED FROM THE INDEX ON THE NEXT INVALIDATION
+        cache.put_negative(name, url="name", constraints={"name": "2016asf"})
+        cache.negativeTtl = -1
+        self.assertIsNone(cache.get_negative(name))
+        cache.invalidate_negative([])
+        with open(cache._negativeIndex) as f:
+            self.assertEqual(f.read(), "")
+
+    def test_response_cache_function_exception(self):
+
+        from transientNamer.commonutils.responsecache import response_cache
+        cache = response_cache(log=log, settings=_cache_settings("corrupt"))
+        cache.put({"page": 0}, "name", content="page", url="u")
+
+        # A CORRUPT ENTRY IS A MISS, NOT AN ERROR
+        with open(cache._path(cache.key({"page": 0})), "wb") as f:
+            f.write(b"not gzip")
+        self.assertIsNone(cache.get({"page": 0}, "name"))
+        try:
+            cache.put({"page": 1}, None, content=object(), url="u")
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+        # x-class-to-test-named-worker-function
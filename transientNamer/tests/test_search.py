@@ -2,11 +2,14 @@ from __future__ import print_function
 from builtins import str
 import os
 import unittest
+import pytest
+import re
 import shutil
 import yaml
 from transientNamer.utKit import utKit
 from fundamentals import tools
 from os.path import expanduser
+from transientNamer.tests.tns_stand_in import stand_in_tns, stand_in_settings
 home = expanduser("~")
 
 packageDirectory = utKit("").get_project_root()
@@ -38,6 +41,168 @@ shutil.copytree(pathToInputDir, pathToOutputDir)
 if not os.path.exists(pathToOutputDir):
     os.makedirs(pathToOutputDir)
 
+# THE TEST SETTINGS, POINTED AT THE STAND-IN TNS (UNCACHED AND UNTHROTTLED)
+localSettings = stand_in_settings(settings, pathToInputDir)
+
+
+def _cached_settings(name, **cacheSettings):
+    """*the stand-in settings with a `tns cache` in its own output directory*"""
+    import copy
+    cacheSettings["directory"] = pathToOutputDir + "/" + name
+    cachedSettings = copy.deepcopy(localSettings)
+    cachedSettings["tns cache"] = cacheSettings
+    return cachedSettings
+
+
+# THE LEGACY REGEX PARSER, KEPT HERE AS THE REFERENCE THE SINGLE-PASS PARSER IN
+# `commonutils.resultsparser` IS CHECKED AGAINST. EACH FUNCTION TAKES THE
+# `search` OBJECT WHOSE ROW-CLEANING METHODS IT SHARES
+_regexForRow = r"""\n([^\n]*?<td class=\"cell-id\" column=\"id\">.*?)(?=\n[^\n]*?<td class=\"cell-id\" column=\"id\">|<nav class=\"pager\")"""
+
+
+def _parse_results_page_regex(tns, content):
+    """*parse all transient rows from one page of TNS search results with the legacy regex parser*"""
+    sourceTable = []
+    photoTable = []
+    specTable = []
+    relatedFilesTable = []
+    for transientRow in re.finditer(_regexForRow, content, flags=re.S):
+        # TOP LEVEL DISCOVERY CONTENT
+        sourceContent = transientRow.group()
+        discInfo, TNSId = _parse_discovery_information(tns, sourceContent)
+        if 'survey' not in discInfo:
+            discInfo['survey'] = None
+        sourceTable.append(discInfo)
+
+        # PHOTOMETERY
+        phot, relatedFiles = _parse_photometry_data(
+            tns, sourceContent, TNSId)
+        photoTable += phot
+        relatedFilesTable += relatedFiles
+
+        # SPECTRA
+        spec, relatedFiles = _parse_spectral_data(tns, sourceContent, TNSId)
+        specTable += spec
+        relatedFilesTable += relatedFiles
+    return sourceTable, photoTable, specTable, relatedFilesTable
+
+
+def _count_transient_rows(content):
+    """*count the transient rows on a results page with the legacy row regex*"""
+    return len(re.findall(_regexForRow, content, flags=re.S))
+
+
+def _parse_discovery_information(tns, content):
+    """*parse discovery information from one row on the TNS results page, converting its coordinates alone*"""
+    from astrocalc.coords import unit_conversion, separations
+    converter = unit_conversion(log=tns.log)
+    match = re.search(
+        r"""<td class=\"cell-id\" column=.*?>(?P<tnsId>\d*?)</td>\s*<td class=\"cell-name\"><a href=\"(?P<objectUrl>.*?)\">(?P<TNSName>.*?)</a></td>\s*?<td class=\"cell-.*?<td class=\"cell-ra\" column=.*?>(?P<raSex>.*?)</td>\s*<td class=\"cell-decl\" column=.*?>(?P<decSex>.*?)</td>\s*<td class=\"cell-objtype_name\" column=.*?>(?P<specType>.*?)</td>\s*<td class=\"cell-redshift\">(?P<transRedshift>.*?)</td>\s*<td class=\"cell-hostname\" column=.*?>(?P<hostName>.*?)</td>\s*<td class=\"cell-host_redshift\" column=.*?>(?P<hostRedshift>.*?)</td>\s*<td class=\"cell-reporting_group_name\" column=.*?>(?P<reportingSurvey>.*?)</td>\s*<td class=\"cell-source_group_name\" column=.*?>(?P<discSurvey>.*?)</td>.*?<td class=\"cell-internal_name\" column=.*?>(<a.*?>)?(?P<discoveryName>.*?)(</a>)?</td>.*?<td class=\"cell-discoverymag\" column=.*?>(?P<discMag>.*?)</td>\s*<td class=\"cell-disc_filter_name\" column=.*?>(?P<discMagFilter>.*?)</td>\s*<td class=\"cell-discoverydate\" column=.*?>(?P<discDate>.*?)</td>\s*<td class=\"cell-discoverer\" column=.*?>(?P<sender>.*?)</td>.*?</tr>""",
+        content,
+        flags=re.S
+    )
+    row = {k: v for k, v in match.groupdict().items()}
+    coordinates = {
+        "raDeg": converter.ra_sexegesimal_to_decimal(ra=row["raSex"].strip()),
+        "decDeg": converter.dec_sexegesimal_to_decimal(dec=row["decSex"].strip())
+    }
+    if tns.queryType == "cone":
+        angularSeparation, north, east = separations(
+            log=tns.log,
+            ra1=tns.ra,
+            dec1=tns.dec,
+            ra2=coordinates["raDeg"],
+            dec2=coordinates["decDeg"],
+        ).get()
+        coordinates["separationArcsec"] = angularSeparation
+        coordinates["separationNorthArcsec"] = north
+        coordinates["separationEastArcsec"] = east
+    row = tns._discovery_row(row, coordinates)
+    return row, row["TNSId"]
+
+
+def _parse_photometry_data(tns, content, TNSId):
+    """*parse photometry data from a row in the tns results content*"""
+    photData = []
+    relatedFilesTable = []
+
+    # AT REPORT BLOCK
+    ATBlock = re.search(
+        r"""<td class=[^\n]*?AT reports.*?(?=<td class=[^\n]*?Classification reports|$)""",
+        content,
+        flags=re.S
+    )
+    if not ATBlock:
+        return photData, relatedFilesTable
+    ATBlock = ATBlock.group()
+    relatedFiles = _parse_related_files(ATBlock)
+    for r in re.finditer(
+            r"""(<tbody>|</tr>)\s*<tr class=\"row-[^\"]*\">\s*<td class=\"cell-id\">.*?</tbody>""",
+            ATBlock,
+            flags=re.S):
+        header = re.search(
+            r"""<tr class=\"row[^\"]*\".*?time_received\">(?P<reportAddedDate>[^<]*).*?user_name\">(?P<sender>[^<]*).*?reporter_name\"( title=\".*?\")?>(?P<reporters>[^<]*).*?reporting_group_name\">(?P<reportingGroup>[^<]*).*?source_group_name\">(?P<surveyGroup>[^<]*).*?ra\">(?P<ra>[^<]*).*?decl\">(?P<dec>[^<]*).*?discovery_date\">(?P<obsDate>[^<]*).*?flux\">(?P<mag>[^<]*).*?filter_name\">(?P<magFilter>[^<]*).*?related_files\">(?P<relatedFiles>[^<]*).*?type_name\">(?P<suggestedType>[^<]*).*?hostName\">(?P<hostName>[^<]*).*?(host_redshift\">(?P<hostRedshift>[^<]*))?.*?internal_name\">(?P<objectName>[^<]*).*?groups\">(?P<survey>[^<]*).*?remarks\">(?P<sourceComment>[^<]*)""",
+            r.group(),
+            flags=re.S
+        ).groupdict()
+        phot = [p.groupdict() for p in re.finditer(
+            r"""<tr class=\"row\-[^\"]*\".*?obsdate\">(?P<obsdate>[^<]*).*?flux\">(?P<mag>[^<]*).*?fluxerr\">(?P<magErr>[^<]*).*?limflux\">(?P<limitingMag>[^<]*).*?unit_name\">(?P<magUnit>[^<]*).*?filter_name\">(?P<filter>[^<]*).*?tel_inst\">(?P<telescope>[^<]*).*?exptime\">(?P<exptime>[^<]*).*?observer\">(?P<observer>[^<]*).*?-remarks\">(?P<remarks>[^<]*)""",
+            r.group(),
+            flags=re.S
+        )]
+        thesePhot, theseFiles = tns._photometry_rows(
+            header, phot, relatedFiles, TNSId)
+        photData += thesePhot
+        relatedFilesTable += theseFiles
+    return photData, relatedFilesTable
+
+
+def _parse_related_files(content):
+    """*parse the contents for related files URLs and comments*"""
+    return [f.groupdict() for f in re.finditer(
+        r"""<td class=\"cell-filename\">.*?href=\"(?P<filepath>[^\"]*).*?remarks\">(?P<fileComment>[^<]*)""",
+        content,
+        flags=re.S
+    )]
+
+
+def _parse_spectral_data(tns, content, TNSId):
+    """*parse spectra data from a row in the tns results content*"""
+    specData = []
+    relatedFilesTable = []
+
+    # CLASSIFICATION BLOCK
+    classBlock = re.search(
+        r"""<div class=[^\n]*?Classification reports.*$""",
+        content,
+        flags=re.S
+    )
+    if not classBlock:
+        return specData, relatedFilesTable
+    classBlock = classBlock.group()
+    relatedFiles = _parse_related_files(classBlock)
+    for r in re.finditer(
+            r"""<tr class=\"row-[^\"]*\">\s*<td class=\"cell-id\">.*?</tbody>\s*</table>""",
+            classBlock,
+            flags=re.S):
+        header = re.search(
+            r"""<tr class=\"row.*?time_received\">(?P<reportAddedDate>[^<]*).*?user_name\">(?P<TNSuser>[^<]*).*?classifier_name\">(?P<reporters>[^<]*).*?source_group_name\">(?P<survey>[^<]*).*?-type\">(?P<specType>[^<]*).*?-redshift\">(?P<transRedshift>[^<]*).*?-related_files\">(?P<relatedFiles>[^<]*).*?-groups\">(?P<surveyGroup>[^<]*).*?-remarks\">(?P<sourceComment>[^<]*)</td>""",
+            r.group(),
+            flags=re.S
+        )
+        if not header:
+            continue
+        spec = [m.groupdict() for m in re.finditer(
+            r"""<td class=\"cell-obsdate\">(?P<obsdate>[^<]*).*?-tel_inst\">(?P<telescope>[^<]*).*?-exptime\">(?P<exptime>[^<]*).*?-observer\">(?P<sender>[^<]*).*?-reducer\">(?P<reducer>[^<]*).*?-source_group_name\">(?P<survey>[^<]*).*?-asciifile\">(.*?<a href=\"(?P<filepath>[^\"]*)\".*?</a>)?.*?-fitsfile\">(.*?<a href=\"(?P<fitsFilepath>[^\"]*)\".*?</a>)?.*?-groups\">(?P<surveyGroup>[^<]*).*?-remarks\">(?P<remarks>[^<]*)""",
+            r.group(),
+            flags=re.S
+        )]
+        theseSpec, theseFiles = tns._spectral_rows(
+            header.groupdict(), spec, relatedFiles, TNSId)
+        specData += theseSpec
+        relatedFilesTable += theseFiles
+    return specData, relatedFilesTable
+
 
 class test_search(unittest.TestCase):
 
@@ -164,4 +329,376 @@ class test_search(unittest.TestCase):
 
         # x-print-testpage-for-pessto-marshall-web-object
 
+    def test_search_concurrent_pages_function(self):
+        # CONCURRENT PAGE DOWNLOADS MUST GIVE IDENTICAL RESULTS TO SEQUENTIAL,
+        # IN PAGE ORDER. EACH FULL PAGE LISTS THE RECORDED ROWS IN A DIFFERENT
+        # ORDER, SO PAGES JOINED OUT OF ORDER WOULD SHOW
+        from transientNamer import search
+        recorded = stand_in_tns.recordedPage
+        rows = [m.group()
+                for m in re.finditer(_regexForRow, recorded, flags=re.S)]
+        start = recorded.index(rows[0])
+        end = recorded.index(rows[-1]) + len(rows[-1])
+        pages = {p: recorded[:start] + "".join(rows[p * 7:] + rows[:p * 7]) + recorded[end:]
+                 for p in range(5)}
+
+        results = []
+        for concurrentPages in [False, 3]:
+            stand_in_tns.reset(pages=pages)
+            # SLOW RESPONSES KEEP SEVERAL DOWNLOADS IN FLIGHT AT ONCE
+            stand_in_tns.delay = 0.02
+            tns = search(
+                log=log,
+                settings=localSettings,
+                discInLastDays=10,
+                concurrentPages=concurrentPages
+            )
+            results.append((tns.sources, tns.photometry,
+                            tns.spectra, tns.files, tns.csv()))
+        sequential, concurrent = results
+
+        self.assertEqual(len(sequential[0]), 250)
+        ids = [s["TNSId"] for s in _parse_results_page_regex(
+            search(log=log, settings=localSettings), recorded)[0]]
+        self.assertEqual([s["TNSId"] for s in sequential[0]], [
+                         i for p in range(5) for i in ids[p * 7:] + ids[:p * 7]])
+        for a, b in zip(sequential, concurrent):
+            self.assertEqual(a, b)
+
+    def test_search_iter_sources_function(self):
+        import time
+        time.sleep(15)
+        # STREAMED RESULTS MUST MATCH THE RESULTS HELD IN MEMORY
+        kwargs = {}
+        kwargs["log"] = log
+        kwargs["settings"] = settings
+        kwargs["discInLastDays"] = 3
+
+        from transientNamer import search
+        tns = search(**kwargs)
+        sources, photometry, spectra, files = [], [], [], []
+        for source, phot, spec, relatedFiles in tns.iter_sources():
+            sources.append(source)
+            photometry += phot
+            spectra += spec
+            files += relatedFiles
+
+        self.assertEqual(sources, tns.sources)
+        self.assertEqual(photometry, tns.photometry)
+        self.assertEqual(spectra, tns.spectra)
+        self.assertEqual(files, tns.files)
+
+    def test_search_parser_compatibility_function(self):
+        # THE SINGLE-PASS PARSER MUST GIVE IDENTICAL RESULTS TO THE LEGACY
+        # REGEX PARSER ON A RECORDED RESULTS PAGE
+        with open(pathToInputDir + "/tns_search_results_page.html") as f:
+            content = f.read()
+
+        from transientNamer import search
+        for comments in [False, True]:
+            for kwargs in [{"name": "2016asf"}, {"ra": "06:50:36.74", "dec": "+31:06:44.7", "radiusArcsec": 5.0}]:
+                tns = search(
+                    log=log,
+                    settings=settings,
+                    comments=comments,
+                    cacheOnly=True,
+                    **kwargs
+                )
+                singlePass = tns._parse_results_page(content)
+                legacy = _parse_results_page_regex(tns, content)
+                self.assertEqual(len(singlePass[0]), 50)
+                for new, old in zip(singlePass, legacy):
+                    self.assertEqual(new, old)
+                    self.assertEqual([list(r.keys()) for r in new], [
+                                     list(r.keys()) for r in old])
+
+    def test_search_parser_markup_variations_function(self):
+        # THE SINGLE-PASS PARSER DOES NOT DEPEND ON THE EXACT ATTRIBUTE ORDER
+        # OR QUOTING OF THE RECORDED PAGE
+        with open(pathToInputDir + "/tns_search_results_page.html") as f:
+            content = f.read()
+
+        def swapped(m):
+            # <td class="X" column="Y"> -> <td data-x=1 column='Y' class='X'>
+            return "<td data-x=1 column='%s' class='%s'>" % (m.group(2), m.group(1))
+        variations = [
+            re.sub(r'<td class="([^"]*)" column="([^"]*)">', swapped, content),
+            re.sub(r'<td class="([^"]*)">', r"<td class='\1' >", content),
+            re.sub(r'<a href="([^"]*)"', r"<a target=\"_blank\" href='\1'", content),
+            content.replace('column="id"', 'column=id')
+        ]
+
+        from transientNamer import search
+        for kwargs in [{"name": "2016asf"}, {"ra": "06:50:36.74", "dec": "+31:06:44.7", "radiusArcsec": 5.0}]:
+            tns = search(
+                log=log,
+                settings=settings,
+                comments=True,
+                cacheOnly=True,
+                **kwargs
+            )
+            expected = tns._parse_results_page(content)
+            self.assertEqual(len(expected[0]), 50)
+            self.assertTrue(expected[1] and expected[2] and expected[3])
+            for variation in variations:
+                self.assertNotEqual(variation, content)
+                self.assertEqual(tns._parse_results_page(variation), expected)
+
+    @pytest.mark.slow
+    def test_search_page_parse_benchmark_function(self):
+        # MICROBENCHMARK: EXTRACTING THE TRANSIENT ROWS ONCE PER PAGE AND
+        # REUSING THEM FOR BOTH THE PAGINATION COUNT AND THE PARSING VERSUS
+        # COUNTING THE ROWS WITH A SEPARATE REGEX PASS FIRST
+        import timeit
+        with open(pathToInputDir + "/tns_search_results_page.html") as f:
+            content = f.read()
+
+        from transientNamer import search
+        from transientNamer.commonutils.resultsparser import parse_results_page
+        tns = search(
+            log=log,
+            settings=settings,
+            name="2016asf",
+            cacheOnly=True
+        )
+
+        def twoPasses():
+            count = _count_transient_rows(content)
+            return count, tns._parse_results_page(content)
+
+        def onePass():
+            transients = parse_results_page(content)
+            return len(transients), tns._parse_results_page(content, transients)
+
+        self.assertEqual(twoPasses(), onePass())
+        before = min(timeit.repeat(twoPasses, number=5, repeat=5)) / 5
+        after = min(timeit.repeat(onePass, number=5, repeat=5)) / 5
+        print(
+            f"50-row page: {before * 1000:0.1f} ms with a separate row count, {after * 1000:0.1f} ms extracting rows once")
+
+    def test_search_lazy_execution_function(self):
+        # THE SEARCH ONLY RUNS WHEN THE RESULTS ARE FIRST ASKED FOR
+        from transientNamer import search
+        tns = search(
+            log=log,
+            settings=settings,
+            name="2016asf",
+            cacheOnly=True
+        )
+        self.assertIsNone(tns._sourceResultsList)
+        print(tns.url)
+        self.assertIsNone(tns._sourceResultsList)
+        print(tns.sources)
+        self.assertIsNotNone(tns._sourceResultsList)
+        tns.run()
+
+    def test_search_lazy_reports_function(self):
+        # THE REPORTS PARSED ON DEMAND MATCH THOSE PARSED WITH THE SOURCES
+        with open(pathToInputDir + "/tns_search_results_page.html") as f:
+            content = f.read()
+
+        from transientNamer import search
+        from transientNamer.commonutils.resultsparser import parse_results_page
+        tns = search(
+            log=log,
+            settings=settings,
+            name="2016asf",
+            cacheOnly=True
+        )
+        transients = parse_results_page(content, reports=False)
+        self.assertNotIn("atReports", transients[0])
+        sources, transients = tns._source_rows(transients)
+        phot, spec, files = tns._report_rows(content, transients)
+        self.assertEqual((sources, phot, spec, files),
+                         tns._parse_results_page(content))
+
+    def test_search_result_pages_memory_function(self):
+        # ONLY THE RAW PAGES (AND THE IDS READ FROM THEM) ARE HELD UNTIL THE
+        # REPORTS ARE ASKED FOR, AND NOTHING AFTER
+        with open(pathToInputDir + "/tns_search_results_page.html") as f:
+            content = f.read()
+
+        from transientNamer import search
+        stand_in_tns.reset()
+        tns = search(
+            log=log,
+            settings=localSettings,
+            name="2016asf"
+        )
+        tns.run()
+        self.assertEqual(len(tns._resultPages), 1)
+        page, TNSIds = tns._resultPages[0]
+        self.assertEqual(page, content)
+        self.assertEqual(TNSIds, [s["TNSId"] for s in tns.sources])
+
+        sources, phot, spec, files = tns._parse_results_page(content)
+        self.assertEqual(tns.photometry, phot)
+        self.assertEqual(tns.spectra, spec)
+        self.assertEqual(tns.files, files)
+        self.assertIsNone(tns._resultPages)
+
+    def test_search_ndjson_single_crawl_function(self):
+        # WRITING NDJSON FILES AND RETURNING THE ROWS SENDS THE SEARCH ONCE
+        import json
+        from transientNamer import search
+        stand_in_tns.reset()
+        expected = search(
+            log=log,
+            settings=localSettings,
+            name="2016asf"
+        ).ndjson()
+        requestsPerSearch = len(stand_in_tns.requests)
+        self.assertEqual(requestsPerSearch, 2)
+
+        stand_in_tns.reset()
+        tns = search(
+            log=log,
+            settings=localSettings,
+            name="2016asf"
+        )
+        os.makedirs(pathToOutputDir + "/ndjson_single_crawl", exist_ok=True)
+        rendered = tns.ndjson(dirPath=pathToOutputDir + "/ndjson_single_crawl")
+        self.assertEqual(len(stand_in_tns.requests), requestsPerSearch)
+        self.assertEqual(rendered, expected)
+        self.assertEqual(len(rendered[0].split("\n")), 50)
+
+        # THE FILES HOLD THE SAME ROWS, AND THE RESULTS NEED NO NEW REQUESTS
+        paths = sorted(os.listdir(pathToOutputDir + "/ndjson_single_crawl"))
+        sourcesPath = [p for p in paths if p.endswith("sources.ndjson")][0]
+        with open(pathToOutputDir + "/ndjson_single_crawl/" + sourcesPath) as f:
+            self.assertEqual([json.loads(l) for l in f], [
+                             json.loads(l) for l in rendered[0].split("\n")])
+        self.assertEqual(len(tns.sources), 50)
+        self.assertIsNone(tns.resumeToken)
+        self.assertEqual(len(stand_in_tns.requests), requestsPerSearch)
+
+    def test_search_to_mysql_batches_function(self):
+        # A STREAMED SEARCH IS WRITTEN WHENEVER ANY TABLE HAS `batchSize` ROWS
+        # WAITING, NOT EVERY `batchSize` TRANSIENTS
+        from transientNamer import search
+        from unittest import mock
+        written = []
+
+        class recording_writer(object):
+            def __init__(self, **kwargs):
+                pass
+
+            def create_tables(self):
+                pass
+
+            def write(self, *tables):
+                written.append([len(rows) for rows in tables])
+                return tuple(len(rows) for rows in tables)
+
+        stand_in_tns.reset(
+            pages={0: stand_in_tns.recordedPage, 1: stand_in_tns.recordedPage})
+        expected = search(
+            log=log,
+            settings=localSettings,
+            discInLastDays=3
+        )
+        expectedCounts = (len(expected.sources), len(expected.photometry), len(
+            expected.spectra), len(expected.files))
+        # THE MOST ROWS A SINGLE TRANSIENT ADDS TO ANY TABLE
+        mostRows = max(len([r for r in rows if r["TNSId"] == t["TNSId"]]) for t in expected.sources for rows in (
+            expected.photometry, expected.spectra, expected.files))
+        batchSize = 20
+        tns = search(
+            log=log,
+            settings=localSettings,
+            discInLastDays=3
+        )
+        with mock.patch("transientNamer.commonutils.mysqlwriter.mysql_writer", recording_writer):
+            counts = tns.to_mysql(batchSize=batchSize)
+        self.assertEqual(counts, expectedCounts)
+        self.assertEqual(tuple(sum(w[i] for w in written)
+                               for i in range(4)), expectedCounts)
+        for w in written:
+            self.assertLess(max(w), batchSize + mostRows)
+        # EVERY BATCH BUT THE LAST WAS WRITTEN AS SOON AS IT WAS FULL
+        for w in written[:-1]:
+            self.assertGreaterEqual(max(w), batchSize)
+
+    def test_search_records_columns_streamed_function(self):
+        # RECORDS AND COLUMNS ARE BUILT PAGE BY PAGE FROM AN UNRUN SEARCH,
+        # WITHOUT HOLDING THE DICTIONARIES, AND MATCH THOSE OF A RUN SEARCH
+        from transientNamer import search
+        from transientNamer.commonutils import records
+        pages = {0: stand_in_tns.recordedPage, 1: stand_in_tns.recordedPage}
+        for kwargs in [{"discInLastDays": 3}, {"ra": "06:50:36.74", "dec": "+31:06:44.7", "radiusArcsec": 5.0}]:
+            stand_in_tns.reset(pages=pages)
+            expected = search(
+                log=log,
+                settings=localSettings,
+                **kwargs
+            )
+            expected.run()
+            self.assertEqual(len(expected.sources), 100)
+
+            tns = search(
+                log=log,
+                settings=localSettings,
+                **kwargs
+            )
+            streamed = tns.records()
+            self.assertIsNone(tns._sourceResultsList)
+            for rows, recordClass, expectedRows in zip(streamed, (records.source, records.photometry, records.spectrum, records.related_file), (expected.sources, expected.photometry, expected.spectra, expected.files)):
+                self.assertEqual(
+                    rows, [recordClass.from_dict(log, r) for r in expectedRows])
+
+            tns = search(
+                log=log,
+                settings=localSettings,
+                **kwargs
+            )
+            streamed = tns.columns()
+            self.assertIsNone(tns._sourceResultsList)
+            for store, heldStore in zip(streamed, expected.columns()):
+                self.assertEqual(len(store), len(heldStore))
+                self.assertEqual(list(store), list(heldStore))
+
+    def test_search_negative_cache_recrawl_function(self):
+        # THE EMPTY PAGE THAT ENDS A CRAWL (OR IS DOWNLOADED AHEAD OF IT) IS NOT
+        # A NEGATIVE RESULT - A LATER CRAWL MUST NOT STOP AT THE OLD LAST PAGE
+        from transientNamer import search
+        for concurrentPages in [False, 3]:
+            cachedSettings = _cached_settings(
+                f"recrawl{concurrentPages}", **{"ttl seconds": {"recent": 0}})
+            stand_in_tns.reset(
+                pages={0: stand_in_tns.recordedPage, 1: stand_in_tns.recordedPage})
+            first = search(log=log, settings=cachedSettings,
+                           discInLastDays=3, concurrentPages=concurrentPages)
+            self.assertEqual(len(first.sources), 100)
+            self.assertFalse(os.path.exists(
+                cachedSettings["tns cache"]["directory"] + "/negative"))
+
+            # A THIRD PAGE IS REPORTED
+            stand_in_tns.pages[2] = stand_in_tns.recordedPage
+            again = search(log=log, settings=cachedSettings,
+                           discInLastDays=3, concurrentPages=concurrentPages)
+            self.assertEqual(len(again.sources), 150)
+
+    def test_search_negative_cache_name_function(self):
+        # A NAME SEARCH THAT FINDS NOTHING IS A NEGATIVE RESULT UNTIL A CRAWL
+        # REPORTS THE TRANSIENT
+        from transientNamer import search
+        cachedSettings = _cached_settings("negativename")
+        stand_in_tns.reset(pages={})
+        for i in range(2):
+            tns = search(log=log, settings=cachedSettings, name="2016asf")
+            self.assertEqual(tns.sources, [])
+        self.assertEqual(len(stand_in_tns.requests), 1)
+
+        stand_in_tns.reset()
+        crawl = search(log=log, settings=cachedSettings, discInLastDays=3)
+        name = crawl.sources[0]["TNSId"]
+        stand_in_tns.reset(pages={})
+        search(log=log, settings=cachedSettings, name=name).sources
+        stand_in_tns.reset()
+        search(log=log, settings=cachedSettings, discInLastDays=3).sources
+        stand_in_tns.requests = []
+        tns = search(log=log, settings=cachedSettings, name=name)
+        self.assertTrue(len(tns.sources) > 0)
+        self.assertTrue(len(stand_in_tns.requests) > 0)
+
     # x-class-to-test-named-worker-function
@@ -0,0 +1,113 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+
+class test_stats(unittest.TestCase):
+
+    def test_run_stats_function(self):
+
+        from transientNamer.commonutils.stats import run_stats
+        events = []
+        stats = run_stats(log=log, callback=lambda *a: events.append(a))
+        for i in range(2):
+            with stats.timer("extract"):
+                sum(range(10000))
+        stats.count("pages")
+        stats.count("bytes", 1024)
+        stats.count("bytes", 1024)
+
+        self.assertEqual(stats.stages["extract"]["calls"], 2)
+        self.assertTrue(stats.stages["extract"]["wall"] > 0)
+        self.assertEqual(stats.counters, {"pages": 1, "bytes": 2048})
+        self.assertEqual([e[:2] for e in events], [("extract", "time"), (
+            "extract", "time"), ("pages", "count"), ("bytes", "count"), ("bytes", "count")])
+        summary = stats.summary()
+        print(summary)
+        self.assertIn("extract", summary)
+        self.assertIn("2,048", summary)
+
+        # THE COPY IS NOT CHANGED BY LATER COUNTS
+        copy = stats.as_dict()
+        stats.count("pages")
+        self.assertEqual(copy["counters"]["pages"], 1)
+
+        # ANOTHER RUN'S TIMINGS AND COUNTERS ARE ADDED TO THESE
+        other = run_stats(log=log)
+        with other.timer("extract"):
+            pass
+        with other.timer("http"):
+            pass
+        other.count("bytes", 1)
+        stats.merge(other)
+        self.assertEqual(stats.stages["extract"]["calls"], 3)
+        self.assertEqual(stats.stages["http"], other.stages["http"])
+        self.assertEqual(stats.counters["bytes"], 2049)
+        self.assertEqual(events[-1], ("bytes", "count", 1))
+
+        stats.reset()
+        self.assertEqual(stats.as_dict(), {"stages": {}, "counters": {}})
+
+    def test_run_stats_function_exception(self):
+
+        from transientNamer.commonutils.stats import run_stats
+
+        # A FAILING CALLBACK DOES NOT STOP THE COUNTING
+        def callback(name, kind, value):
+            raise RuntimeError("the metrics server is down")
+        stats = run_stats(log=log, callback=callback)
+        stats.count("retries")
+        with stats.timer("http"):
+            pass
+        self.assertEqual(stats.counters["retries"], 1)
+        self.assertEqual(stats.stages["http"]["calls"], 1)
+
+        # AN EXCEPTION IN A TIMED STAGE IS STILL TIMED, AND RAISED
+        try:
+            with stats.timer("http"):
+                raise ValueError("timeout")
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+        self.assertEqual(stats.stages["http"]["calls"], 2)
+
+        # x-class-to-test-named-worker-function
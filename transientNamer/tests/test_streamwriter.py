@@ -0,0 +1,102 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import yaml
+from transientNamer.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+_rows = [{"TNSId": "2016asf", "TNSName": "SN2016asf", "raDeg": 102.653041667, "specType": "SN Ia", "hostName": "KUG 0647+311, a galaxy"},
+         {"TNSId": "2016fbz", "TNSName": "SN2016fbz", "raDeg": 5.1, "specType": None, "hostName": None}]
+
+
+class test_streamwriter(unittest.TestCase):
+
+    def test_stream_writer_function(self):
+
+        from transientNamer.commonutils.streamwriter import stream_writer
+        from fundamentals.renderer import list_of_dictionaries
+        import gzip
+        rendered = list_of_dictionaries(log=log, listOfDictionaries=_rows)
+        for render in ["csv", "json", "yaml"]:
+            for compress in [False, True]:
+                with stream_writer(pathToOutputDir + "/sources." + render, render=render, compress=compress) as writer:
+                    for row in _rows:
+                        writer.write(row)
+                self.assertEqual(writer.rowCount, 2)
+                if compress:
+                    self.assertTrue(writer.filepath.endswith(".gz"))
+                    content = gzip.open(writer.filepath, "rt").read()
+                else:
+                    content = open(writer.filepath).read()
+                # THE SAME CONTENT AS THE RENDERERS WRITE
+                self.assertEqual(content.strip(), getattr(
+                    rendered, render)().strip())
+
+        # NO FILE IS WRITTEN WITHOUT ROWS
+        with stream_writer(pathToOutputDir + "/empty.csv") as writer:
+            pass
+        self.assertFalse(os.path.exists(pathToOutputDir + "/empty.csv"))
+
+    def test_stream_writer_ndjson_function(self):
+
+        from transientNamer.commonutils.streamwriter import stream_writer
+        import json
+        with stream_writer(pathToOutputDir + "/sources.ndjson", render="ndjson") as writer:
+            writer.write(_rows[0])
+            writer.flush()
+            # THE FIRST ROW IS ON DISK BEFORE THE FILE IS CLOSED
+            self.assertEqual(
+                open(writer.filepath).read().count("\n"), 1)
+            writer.write(_rows[1])
+        lines = open(writer.filepath).read().split("\n")
+        self.assertEqual(lines[-1], "")
+        self.assertEqual([json.loads(l) for l in lines[:-1]], _rows)
+        # KEYS KEEP THE ORDER OF THE ROW
+        self.assertEqual(list(json.loads(lines[0])), list(_rows[0]))
+
+    def test_stream_writer_function_exception(self):
+
+        from transientNamer.commonutils.streamwriter import stream_writer
+        try:
+            stream_writer(pathToOutputDir + "/sources.md", render="markdown")
+            assert False
+        except Exception as e:
+            assert True
+            print(str(e))
+
+        # x-class-to-test-named-worker-function
@@ -0,0 +1,108 @@
+"""
+*A local stand-in for the TNS web endpoints, shared by the unit tests that must not contact the real TNS*
+"""
+import copy
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class stand_in_tns(BaseHTTPRequestHandler):
+    """*a local stand-in for the TNS: search result pages by page number (`No results found` past the last), astronote listings and astronote pages*
+
+    The class attributes are the state of the stand-in: tests set `pages` and `notes` (and `names`, the result pages of searches for particular TNS or survey names, served instead of `pages`), read the `requests` sent, add a `delay` to every response or queue HTTP `failures` (status codes, or `None` to answer a request normally) to answer the next requests with.
+    """
+    pages = {}
+    names = {}
+    notes = {}
+    delay = 0.
+    requests = []
+    failures = []
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        stand_in_tns.requests.append(self.path)
+        time.sleep(stand_in_tns.delay)
+        status = 200
+        failure = stand_in_tns.failures.pop(0) if stand_in_tns.failures else None
+        if failure:
+            status = failure
+            body = "<html><body>Service Unavailable</body></html>"
+        elif url.path == "/search":
+            page = int(query["page"][0])
+            name = (query.get("name") or query.get("internal_name") or [""])[0]
+            pages = stand_in_tns.names.get(name, stand_in_tns.pages)
+            body = pages.get(
+                page, "<html><body>No results found</body></html>")
+        elif url.path == "/astronotes":
+            page = int(query["page"][0])
+            num = int(query["num_page"][0])
+            keys = sorted(stand_in_tns.notes)[page * num:(page + 1) * num]
+            body = json.dumps({k: stand_in_tns.notes[k] for k in keys})
+        else:
+            body = "<html>%s</html>" % url.path.split("/")[-1]
+        body = body.encode()
+        try:
+            self.send_response(status)
+            if status != 200:
+                self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    @classmethod
+    def reset(
+            cls,
+            pages=None):
+        """*forget the requests, names, notes, delay and failures and serve the given results pages (default: the recorded page as page 0 only)*"""
+        cls.pages = dict(pages) if pages is not None else {
+            0: cls.recordedPage}
+        cls.names = {}
+        cls.notes = {}
+        cls.delay = 0.
+        cls.requests = []
+        cls.failures = []
+
+
+_server = None
+
+
+def stand_in_settings(
+        settings,
+        pathToInputDir):
+    """*start the stand-in TNS (once per process) and return a copy of the settings pointed at it*
+
+    **Key Arguments**
+
+    - ``settings`` -- the test settings dictionary
+    - ``pathToInputDir`` -- the test input directory, holding the recorded results page served as page 0
+
+    **Return**
+
+    - ``localSettings`` -- a copy of the settings with the `tns http` base URL set to the stand-in, an unthrottled `tns rate limit`, fast `tns retries` and no `tns cache`
+    """
+    global _server
+    if _server is None:
+        with open(pathToInputDir + "/tns_search_results_page.html") as f:
+            stand_in_tns.recordedPage = f.read()
+        stand_in_tns.reset()
+        _server = ThreadingHTTPServer(("127.0.0.1", 0), stand_in_tns)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+    localSettings = copy.deepcopy(settings)
+    localSettings["tns http"]["base url"] = "http://127.0.0.1:%s" % _server.server_port
+    localSettings["tns rate limit"] = {"requests per second": 1000, "burst": 1}
+    localSettings["tns retries"] = {"max retries": 3,
+                                    "backoff initial": 0.01, "backoff max": 0.05, "jitter": False}
+    localSettings.pop("tns cache", None)
+    return localSettings